@@ -1,5 +1,17 @@
+from .admin import router as admin_router
+from .images import router as images_router
+from .jobs import router as jobs_router
 from .search import router as search_router
+from .sync import router as sync_router
 from .tags import router as tags_router
 from .works import router as works_router
 
-__all__ = ["works_router", "tags_router", "search_router"]
+__all__ = [
+    "works_router",
+    "tags_router",
+    "search_router",
+    "sync_router",
+    "admin_router",
+    "images_router",
+    "jobs_router",
+]
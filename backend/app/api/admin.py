@@ -0,0 +1,125 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..db.tenancy import get_tenant_engines, tenancy_enabled, validate_tenant_id
+from ..services.enrichment import EnrichmentService
+from ..services.jobs import (
+    ACTIVE_STATUSES,
+    STATUS_SUCCEEDED,
+    JobService,
+    cancel_job,
+    job_to_dict,
+    submit_job,
+)
+from ..services.reminder_service import get_reminder_scheduler
+from ..utils.admin_auth import require_admin
+from ..utils.slow_query import get_slow_query_log
+
+router = APIRouter(
+    prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+
+
+@router.get("/slow-queries")
+async def get_slow_queries():
+    """取得最近的慢查詢紀錄"""
+    log = get_slow_query_log()
+    if log is None:
+        return {"enabled": False, "threshold_ms": None, "size": 0, "entries": []}
+
+    return {
+        "enabled": True,
+        "threshold_ms": log.threshold_ms,
+        "size": log.size,
+        "entries": log.entries(),
+    }
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    """清除慢查詢紀錄"""
+    log = get_slow_query_log()
+    if log is not None:
+        log.clear()
+    return {"message": "慢查詢紀錄已清除"}
+
+
+def _require_tenancy() -> None:
+    if not tenancy_enabled():
+        raise HTTPException(status_code=404, detail="Tenancy is not enabled")
+
+
+@router.get("/tenants")
+def list_tenants():
+    """列出所有租戶資料庫與是否已開啟"""
+    _require_tenancy()
+    tenants = get_tenant_engines()
+    return {"capacity": tenants.capacity, "tenants": tenants.describe()}
+
+
+@router.post("/tenants/maintenance")
+def maintain_all_tenants(vacuum: bool = False):
+    """依序整理所有租戶資料庫"""
+    _require_tenancy()
+    return {"results": list(get_tenant_engines().maintain_all(vacuum=vacuum))}
+
+
+@router.post("/tenants/{tenant_id}/maintenance")
+def maintain_tenant(tenant_id: str, vacuum: bool = False):
+    """整理單一租戶資料庫（checkpoint、更新統計，可選 VACUUM）"""
+    _require_tenancy()
+    return get_tenant_engines().maintain(validate_tenant_id(tenant_id), vacuum=vacuum)
+
+
+@router.post("/reminders/run")
+def run_reminders():
+    """立即處理一次到期的提醒"""
+    return {"sent": get_reminder_scheduler().run_once()}
+
+
+@router.post("/duplicates/scan", status_code=202)
+def scan_duplicates(db: Session = Depends(get_db)):
+    """在背景重新計算正規化標題並找出重複作品群組（工作 duplicates.scan）"""
+    job, started = submit_job(db, "duplicates.scan", unique=True)
+    return {"started": started, **job_to_dict(job)}
+
+
+@router.get("/duplicates")
+def get_duplicates(db: Session = Depends(get_db)):
+    """取得最近一次完成的重複作品掃描結果"""
+    job = JobService(db).latest("duplicates.scan", STATUS_SUCCEEDED)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No duplicate scan has been run")
+    return {**job_to_dict(job), **job.result}
+
+
+@router.post("/enrichment", status_code=202)
+def run_enrichment(
+    limit: Optional[int] = Query(None, ge=1, description="本次最多處理的作品數"),
+    db: Session = Depends(get_db),
+):
+    """在背景從 AniList 補充作品的封面、類型與集數（工作 works.enrich）"""
+    job, started = submit_job(db, "works.enrich", {"limit": limit}, unique=True)
+    return {"started": started, **job_to_dict(job)}
+
+
+@router.get("/enrichment")
+def get_enrichment(db: Session = Depends(get_db)):
+    """取得最近一次資料補充工作與尚待處理的作品數"""
+    job = JobService(db).latest("works.enrich")
+    pending = EnrichmentService(db).pending_count()
+    if job is None:
+        return {"status": "idle", "pending": pending}
+    return {**job_to_dict(job), "pending": pending}
+
+
+@router.delete("/enrichment")
+def cancel_enrichment(db: Session = Depends(get_db)):
+    """停止進行中的資料補充（已送出的請求仍會寫入）"""
+    job = JobService(db).latest("works.enrich", *ACTIVE_STATUSES)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No enrichment is running")
+    return job_to_dict(cancel_job(db, job.id))
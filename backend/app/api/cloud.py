@@ -1,12 +1,15 @@
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from ..db.database import get_db
 from ..models import CloudBackup
+from ..services.backup_service import BackupService, parse_backup_date
+from ..services.jobs import submit_job
 
 router = APIRouter()
 
@@ -31,38 +34,41 @@ async def health_check():
 
 
 @router.post("/backup")
-async def upload_backup(data: BackupData, db: Session = Depends(get_db)):
+async def upload_backup(
+    data: BackupData,
+    background: bool = Query(
+        False, description="在背景儲存，立即回傳工作 ID（以 GET /jobs/{id} 查詢）"
+    ),
+    db: Session = Depends(get_db),
+):
     """上傳備份數據"""
     try:
-        backup_date = datetime.fromisoformat(data.backupDate.replace("Z", "+00:00"))
+        backup_date = parse_backup_date(data.backupDate)
     except ValueError:
         raise HTTPException(status_code=400, detail="backupDate 格式無效")
 
-    try:
-        # 檢查是否已存在該設備的備份
-        existing_backup = (
-            db.query(CloudBackup).filter(CloudBackup.device_id == data.deviceId).first()
+    if background:
+        job, _ = submit_job(db, "backup.upload", data.model_dump())
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "message": "備份已排入背景處理",
+                "jobId": job.id,
+                "worksCount": len(data.works),
+                "tagsCount": len(data.tags),
+            },
         )
 
-        if existing_backup:
-            # 更新現有備份
-            existing_backup.works = data.works
-            existing_backup.tags = data.tags
-            existing_backup.backup_date = backup_date
-            existing_backup.version = data.version
-            existing_backup.last_updated = datetime.now()
-        else:
-            # 創建新備份
-            backup = CloudBackup(
-                device_id=data.deviceId,
-                works=data.works,
-                tags=data.tags,
-                backup_date=backup_date,
-                version=data.version,
-            )
-            db.add(backup)
-
-        db.commit()
+    try:
+        backup_service = BackupService(db)
+        backup_service.save_backup(
+            device_id=data.deviceId,
+            works=data.works,
+            tags=data.tags,
+            backup_date=backup_date,
+            version=data.version,
+        )
 
         return {
             "success": True,
@@ -118,6 +124,7 @@ async def delete_backup(device_id: str, db: Session = Depends(get_db)):
 
         if backup:
             db.delete(backup)
+            BackupService(db).delete_versions(device_id)
             db.commit()
             return {"success": True, "message": "備份刪除成功"}
         else:
@@ -145,3 +152,63 @@ async def list_backups(db: Session = Depends(get_db)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢失敗: {str(e)}")
+
+
+@router.get("/backup/versions")
+async def list_backup_versions(device_id: str, db: Session = Depends(get_db)):
+    """列出設備的備份版本"""
+    try:
+        backup_service = BackupService(db)
+        return {
+            "versions": [
+                {
+                    "id": backup_version.id,
+                    "backupDate": backup_version.backup_date.isoformat(),
+                    "version": backup_version.version,
+                    "worksCount": backup_version.works_count,
+                    "tagsCount": backup_version.tags_count,
+                    "createdAt": backup_version.created_at.isoformat(),
+                }
+                for backup_version in backup_service.list_versions(device_id)
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查詢失敗: {str(e)}")
+
+
+@router.get("/backup/versions/{version_id}")
+async def download_backup_version(
+    version_id: int, device_id: str, db: Session = Depends(get_db)
+):
+    """下載指定版本的備份數據"""
+    backup_service = BackupService(db)
+    backup_version = backup_service.get_version(device_id, version_id)
+    if not backup_version:
+        raise HTTPException(status_code=404, detail="找不到指定的備份版本")
+
+    try:
+        data = backup_service.load_version_data(backup_version)
+        return {
+            **data,
+            "backupDate": backup_version.backup_date.isoformat(),
+            "version": backup_version.version,
+            "versionId": backup_version.id,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"下載失敗: {str(e)}")
+
+
+@router.post("/backup/versions/{version_id}/restore")
+async def restore_backup_version(
+    version_id: int, device_id: str, db: Session = Depends(get_db)
+):
+    """將指定版本還原為設備的最新備份"""
+    try:
+        restored = BackupService(db).restore_version(device_id, version_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"還原失敗: {str(e)}")
+
+    if restored is None:
+        raise HTTPException(status_code=404, detail="找不到指定的備份版本")
+    return {**restored, "versionId": version_id}
@@ -0,0 +1,55 @@
+import os
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..db.database import get_engine
+from ..db.tenancy import get_tenant_database_dir, tenancy_enabled
+from ..utils.logger import logger
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health")
+async def health_check():
+    """健康檢查"""
+    return {"status": "healthy"}
+
+
+@router.get("/health/live")
+async def liveness():
+    """存活探針：行程可回應即可，不檢查外部依賴"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+def readiness(engine: Engine = Depends(get_engine)):
+    """就緒探針：確認主資料庫可連線；啟用租戶時確認租戶目錄可寫入（不需 X-Device-ID）"""
+    content = {"status": "ready", "database": "ok"}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        logger.warning("Readiness check failed: %s", e)
+        content.update(status="unavailable", database="unreachable")
+
+    if tenancy_enabled():
+        directory = get_tenant_database_dir()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            writable = os.access(directory, os.W_OK)
+        except OSError as e:
+            logger.warning("Tenant directory %s is unusable: %s", directory, e)
+            writable = False
+        content["tenants"] = "ok" if writable else "unwritable"
+        if not writable:
+            content["status"] = "unavailable"
+
+    if content["status"] != "ready":
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=content
+        )
+    return content
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..services.image_cache import (
+    CACHE_MAX_AGE,
+    CachedImage,
+    get_accel_prefix,
+    get_cover_cache,
+    resolve_cover_url,
+)
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def cover_response(request: Request, image: CachedImage) -> Response:
+    headers = {
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE}",
+        "ETag": image.etag,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, image.etag):
+        return Response(status_code=304, headers=headers)
+
+    # 由 nginx 以 sendfile 傳送檔案
+    accel_prefix = get_accel_prefix()
+    if accel_prefix:
+        headers["X-Accel-Redirect"] = accel_prefix + image.relative_path
+        return Response(headers=headers, media_type=image.media_type)
+    return FileResponse(image.path, headers=headers, media_type=image.media_type)
+
+
+@router.get("/cover/{anilist_id}")
+async def get_cover(
+    anilist_id: int,
+    request: Request,
+    size: str = Query("medium", description="small、medium 或 original"),
+    db: Session = Depends(get_db),
+):
+    """AniList 封面圖（首次請求時下載並快取於本地，依尺寸回傳 WebP 縮圖）"""
+    image = await get_cover_cache().get(
+        anilist_id, size, lambda: resolve_cover_url(db, anilist_id)
+    )
+    if image is None:
+        raise HTTPException(status_code=404, detail="Cover not found")
+    return cover_response(request, image)
@@ -0,0 +1,49 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..schemas.job import JobCreate, JobResponse
+from ..services.jobs import (
+    JobService,
+    cancel_job,
+    job_to_dict,
+    submit_job,
+    validate_public_job,
+)
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_job(job: JobCreate, db: Session = Depends(get_db)):
+    """建立背景工作，立即回傳工作 ID，再以 GET /jobs/{id} 查詢進度"""
+    params = validate_public_job(job.type, job.params)
+    created, _ = submit_job(db, job.type, params)
+    return job_to_dict(created)
+
+
+@router.get("/", response_model=List[JobResponse])
+def list_jobs(
+    type: Optional[str] = Query(None, description="工作類型"),
+    status: Optional[str] = Query(
+        None, description="queued、running、succeeded、failed、cancelled"
+    ),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """列出最近的背景工作"""
+    return [job_to_dict(job) for job in JobService(db).recent(type, status, limit)]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """取得工作狀態、進度與結果"""
+    return job_to_dict(JobService(db).get(job_id))
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel(job_id: str, db: Session = Depends(get_db)):
+    """取消工作：排隊中立即取消，執行中則在下一個檢查點停止"""
+    return job_to_dict(cancel_job(db, job_id))
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..schemas.sync import SyncChangeFeed
+from ..services.sync_service import SyncService
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("/changes", response_model=SyncChangeFeed)
+async def get_changes(
+    since: int = Query(0, ge=0, description="上次同步取得的 next_cursor"),
+    limit: int = Query(500, ge=1, le=1000, description="單批最多變更筆數"),
+    db: Session = Depends(get_db),
+):
+    """取得增量變更
+
+    游標為變更紀錄 ID，依提交順序遞增：以 next_cursor 續取不會漏掉之後才提交的變更。
+    """
+    sync_service = SyncService(db)
+    return sync_service.get_changes(since=since, limit=limit)
@@ -1,11 +1,22 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from ..db.database import get_db
-from ..schemas.tag import TagCreate, TagResponse, TagUpdate
+from ..schemas.tag import (
+    TagBulkResult,
+    TagCreate,
+    TagMerge,
+    TagRename,
+    TagResponse,
+    TagUpdate,
+    TagWorkIds,
+)
+from ..services.change_log import ENTITY_TAG, ENTITY_WORK
 from ..services.tag_service import TagService
+from ..utils.http_cache import conditional_get
+from ..utils.responses import models_response
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
@@ -17,13 +28,30 @@ async def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
     return tag_service.create_tag(tag)
 
 
-@router.get("/", response_model=List[TagResponse])
-async def get_tags(db: Session = Depends(get_db)):
+@router.get(
+    "/",
+    response_model=List[TagResponse],
+    # 使用次數隨作品異動，因此也依作品資料版本失效
+    dependencies=[Depends(conditional_get(ENTITY_TAG, ENTITY_WORK))],
+)
+async def get_tags(
+    with_counts: bool = Query(False, description="一併回傳 usage_count"),
+    db: Session = Depends(get_db),
+):
     """取得所有標籤"""
     tag_service = TagService(db)
+    if with_counts:
+        return models_response(tag_service.get_tags_with_counts())
     return tag_service.get_tags()
 
 
+@router.post("/merge", response_model=TagBulkResult)
+async def merge_tags(merge: TagMerge, db: Session = Depends(get_db)):
+    """合併標籤"""
+    tag_service = TagService(db)
+    return tag_service.merge_tags(merge.source_ids, merge.target_id)
+
+
 @router.get("/{tag_id}", response_model=TagResponse)
 async def get_tag(tag_id: int, db: Session = Depends(get_db)):
     """取得單一標籤"""
@@ -52,3 +80,24 @@ async def delete_tag(tag_id: int, db: Session = Depends(get_db)):
     if not success:
         raise HTTPException(status_code=404, detail="標籤不存在")
     return {"message": "標籤已刪除"}
+
+
+@router.post("/{tag_id}/rename", response_model=TagBulkResult)
+async def rename_tag(tag_id: int, rename: TagRename, db: Session = Depends(get_db)):
+    """重新命名標籤（名稱已存在時併入該標籤）"""
+    tag_service = TagService(db)
+    return tag_service.rename_tag(tag_id, rename.name)
+
+
+@router.post("/{tag_id}/works/apply", response_model=TagBulkResult)
+async def apply_tag(tag_id: int, works: TagWorkIds, db: Session = Depends(get_db)):
+    """為多個作品加上標籤"""
+    tag_service = TagService(db)
+    return tag_service.apply_tag(tag_id, works.work_ids)
+
+
+@router.post("/{tag_id}/works/remove", response_model=TagBulkResult)
+async def remove_tag(tag_id: int, works: TagWorkIds, db: Session = Depends(get_db)):
+    """從多個作品移除標籤"""
+    tag_service = TagService(db)
+    return tag_service.remove_tag(tag_id, works.work_ids)
@@ -1,23 +1,110 @@
+from datetime import date
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ..db.database import get_db
-from ..schemas.work import WorkCreate, WorkList, WorkResponse, WorkUpdate
+from ..schemas.job import JobResponse
+from ..schemas.work import (
+    ProgressIncrement,
+    ProgressSet,
+    SimilarWorks,
+    WorkCreate,
+    WorkList,
+    WorkProgressResponse,
+    WorkResponse,
+    WorkUpdate,
+)
+from ..services.change_log import ENTITY_TAG, ENTITY_WORK
+from ..services.columnar_export import (
+    FORMAT_PARQUET,
+    MEDIA_TYPES,
+    export_filename,
+    require_pyarrow,
+    stream_table,
+    validate_export_format,
+    validate_export_table,
+)
+from ..services.duplicates import ON_DUPLICATE_ERROR, validate_on_duplicate
+from ..services.importers import WorkImporter, save_upload, validate_import_format
+from ..services.jobs import job_to_dict, submit_job
+from ..services.stats_service import StatsService
+from ..services.watch_history import WatchHistoryService
 from ..services.work_service import WorkService
+from ..utils.http_cache import conditional_get
+from ..utils.responses import model_response
 
 router = APIRouter(prefix="/works", tags=["works"])
 
 
 @router.post("/", response_model=WorkResponse, status_code=status.HTTP_201_CREATED)
-async def create_work(work: WorkCreate, db: Session = Depends(get_db)):
+async def create_work(
+    work: WorkCreate,
+    on_duplicate: str = Query(
+        ON_DUPLICATE_ERROR, description="同名作品已存在時：error（409）、merge 或 allow"
+    ),
+    db: Session = Depends(get_db),
+):
     """建立新作品"""
     work_service = WorkService(db)
-    return work_service.create_work(work)
+    return model_response(
+        work_service.create_work(work, on_duplicate),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.post("/import")
+async def import_works(
+    file: UploadFile = File(
+        ..., description="MyAnimeList XML（可為 .xml.gz）或 AniList JSON 匯出檔"
+    ),
+    format: Optional[str] = Query(None, description="mal 或 anilist；省略時依內容判斷"),
+    on_duplicate: str = Query(
+        ON_DUPLICATE_ERROR,
+        description="同名作品已存在時：error（略過並列入報告）、merge 或 allow",
+    ),
+    background: bool = Query(
+        False, description="在背景匯入，立即回傳工作（以 GET /jobs/{id} 取得報告）"
+    ),
+    db: Session = Depends(get_db),
+):
+    """匯入 MyAnimeList 或 AniList 匯出檔，回傳匯入數量與每列的錯誤"""
+    validate_import_format(format)
+    validate_on_duplicate(on_duplicate)
+
+    if background:
+        upload_id = await run_in_threadpool(save_upload, file.file)
+        job, _ = submit_job(
+            db,
+            "works.import",
+            {"upload_id": upload_id, "format": format, "on_duplicate": on_duplicate},
+        )
+        return model_response(
+            JobResponse(**job_to_dict(job)), status_code=status.HTTP_202_ACCEPTED
+        )
+
+    importer = WorkImporter(db, on_duplicate)
+    report = await run_in_threadpool(importer.import_file, file.file, format)
+    return report.to_dict()
 
 
-@router.get("/", response_model=WorkList)
+@router.get(
+    "/",
+    response_model=WorkList,
+    dependencies=[Depends(conditional_get(ENTITY_WORK, ENTITY_TAG))],
+)
 async def get_works(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
@@ -30,31 +117,98 @@ async def get_works(
 ):
     """取得作品列表，支援篩選"""
     work_service = WorkService(db)
-    return work_service.get_works(
-        page=page,
-        size=size,
-        title=title,
-        type=type,
-        status=status,
-        year=year,
-        tag_ids=tag_ids,
+    return model_response(
+        work_service.get_works(
+            page=page,
+            size=size,
+            title=title,
+            type=type,
+            status=status,
+            year=year,
+            tag_ids=tag_ids,
+        )
     )
 
 
-@router.get("/stats", include_in_schema=False)
-@router.get("/stats/overview")
-async def get_stats(db: Session = Depends(get_db)):
+@router.get(
+    "/stats",
+    include_in_schema=False,
+    dependencies=[Depends(conditional_get(ENTITY_WORK, ENTITY_TAG))],
+)
+@router.get(
+    "/stats/overview",
+    dependencies=[Depends(conditional_get(ENTITY_WORK, ENTITY_TAG))],
+)
+async def get_stats(request: Request, db: Session = Depends(get_db)):
     """取得統計資訊"""
     work_service = WorkService(db)
-    return work_service.get_stats()
+    return work_service.get_stats(getattr(request.state, "data_versions", None))
+
+
+@router.get(
+    "/stats/extended",
+    dependencies=[Depends(conditional_get(ENTITY_WORK, ENTITY_TAG))],
+)
+async def get_extended_stats(request: Request, db: Session = Depends(get_db)):
+    """取得完整統計：評分分佈、各類型平均評分、標籤使用次數、完成率與待看數量"""
+    return StatsService(db).extended(getattr(request.state, "data_versions", None))
+
+
+@router.get("/stats/timeline", dependencies=[Depends(conditional_get(ENTITY_WORK))])
+async def get_timeline(
+    granularity: str = Query("day", description="day 或 month"),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """取得觀看時間軸（每日或每月的集數與分鐘數，讀取彙總表）"""
+    return WatchHistoryService(db).timeline(granularity, start, end)
+
+
+@router.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = Query(FORMAT_PARQUET, description="parquet 或 arrow（Arrow IPC 檔）"),
+    batch_size: Optional[int] = Query(None, ge=100, le=100000),
+    db: Session = Depends(get_db),
+):
+    """以 Parquet 或 Arrow 格式串流下載 works、tags 或 work_tags 資料表"""
+    require_pyarrow()
+    validate_export_table(table)
+    validate_export_format(format)
+    filename = export_filename(table, format)
+    return StreamingResponse(
+        stream_table(db, table, format, batch_size),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
-@router.get("/{work_id}", response_model=WorkResponse)
+@router.get(
+    "/{work_id}",
+    response_model=WorkResponse,
+    dependencies=[Depends(conditional_get(ENTITY_WORK, ENTITY_TAG))],
+)
 async def get_work(work_id: str, db: Session = Depends(get_db)):
     """取得單一作品"""
     work_service = WorkService(db)
     # WorkService.get_work now raises WorkNotFoundException if not found
-    return work_service.get_work(work_id)
+    return model_response(work_service.get_work(work_id))
+
+
+@router.get(
+    "/{work_id}/similar",
+    response_model=SimilarWorks,
+    dependencies=[Depends(conditional_get(ENTITY_WORK, ENTITY_TAG))],
+)
+async def get_similar_works(
+    work_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """取得相似作品（依標籤、類型與年份）"""
+    work_service = WorkService(db)
+    return model_response(work_service.get_similar_works(work_id, limit))
 
 
 @router.put("/{work_id}", response_model=WorkResponse)
@@ -64,7 +218,33 @@ async def update_work(work_id: str, work: WorkUpdate, db: Session = Depends(get_
     updated_work = work_service.update_work(work_id, work)
     if not updated_work:
         raise HTTPException(status_code=404, detail="作品不存在")
-    return updated_work
+    return model_response(updated_work)
+
+
+@router.post("/{work_id}/progress:increment", response_model=WorkProgressResponse)
+async def increment_progress(
+    work_id: str,
+    body: Optional[ProgressIncrement] = None,
+    db: Session = Depends(get_db),
+):
+    """看完下一集：集數 +1（或 +by），到最後一集自動轉為已完結"""
+    work_service = WorkService(db)
+    by = body.by if body else 1
+    return model_response(work_service.increment_progress(work_id, by))
+
+
+@router.post("/{work_id}/progress:set", response_model=WorkProgressResponse)
+async def set_progress(work_id: str, body: ProgressSet, db: Session = Depends(get_db)):
+    """設定目前集數"""
+    work_service = WorkService(db)
+    return model_response(work_service.set_progress(work_id, body.episode))
+
+
+@router.post("/{work_id}/progress:complete", response_model=WorkProgressResponse)
+async def complete_progress(work_id: str, db: Session = Depends(get_db)):
+    """標記為已看完"""
+    work_service = WorkService(db)
+    return model_response(work_service.complete_progress(work_id))
 
 
 @router.delete("/{work_id}")
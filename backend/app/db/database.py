@@ -1,6 +1,8 @@
 import os
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 
@@ -14,6 +16,28 @@ def get_connect_args(database_url: str) -> dict[str, bool]:
     return {}
 
 
+def get_sqlite_busy_timeout() -> int:
+    return int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """SQLite 檔案使用 WAL（讀寫互不阻塞），並在寫鎖衝突時等待而非立即失敗"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    busy_timeout = get_sqlite_busy_timeout()
+    file_based = engine.url.database not in (None, "", ":memory:")
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        if file_based:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+
 # 資料庫檔案路徑
 DATABASE_URL = get_database_url()
 SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
@@ -22,6 +46,7 @@ SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
 engine = create_engine(
     DATABASE_URL, connect_args=get_connect_args(DATABASE_URL), echo=SQL_ECHO
 )
+configure_sqlite(engine)
 
 # 建立 SessionLocal 類別
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -30,9 +55,26 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_engine() -> Engine:
+    """主資料庫 Engine；就緒探針直接檢查，不經過依 X-Device-ID 路由的 get_db"""
+    return engine
+
+
 # 依賴注入函數
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    # 每個裝置使用獨立的 SQLite 檔案（見 tenancy.py）
+    from .tenancy import (
+        TENANT_HEADER,
+        get_tenant_engines,
+        tenancy_enabled,
+        validate_tenant_id,
+    )
+
+    if tenancy_enabled():
+        tenant_id = validate_tenant_id(request.headers.get(TENANT_HEADER))
+        db = get_tenant_engines().session(tenant_id)
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
@@ -0,0 +1,135 @@
+"""Schema deploy step.
+
+Run once per deploy, before starting the API workers::
+
+    python -m app.db.migrate
+
+Creates missing tables and indexes, and adds columns that were introduced
+after a table was first created (``create_all`` never alters existing
+tables). Only additive changes are made; nothing is dropped or rewritten.
+With ``TENANCY_ENABLED=true`` every tenant database file is migrated too.
+"""
+
+import time
+from typing import Dict, List
+
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.schema import Column, CreateIndex
+
+from .. import models  # noqa: F401  註冊所有模型
+from .database import Base, engine
+
+
+def _column_ddl(engine: Engine, column: Column) -> str:
+    ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable and column.server_default is not None:
+        ddl += " NOT NULL"
+    return ddl
+
+
+def migrate(engine: Engine = engine) -> Dict[str, List[str]]:
+    """建立缺少的資料表、欄位與索引，回傳實際做了哪些變更"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    changes: Dict[str, List[str]] = {"tables": [], "columns": [], "indexes": []}
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                table.create(conn)
+                changes["tables"].append(table.name)
+                continue
+
+            existing_columns = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {table.name} "
+                            f"ADD COLUMN {_column_ddl(engine, column)}"
+                        )
+                    )
+                    changes["columns"].append(f"{table.name}.{column.name}")
+
+            existing_indexes = {
+                index["name"] for index in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    conn.execute(CreateIndex(index))
+                    changes["indexes"].append(index.name)
+
+    # 新增的計數欄位需依現有資料回填
+    if "tags.usage_count" in changes["columns"]:
+        from ..services.tag_service import TagService
+        from .database import SessionLocal
+
+        db = SessionLocal(bind=engine)
+        try:
+            TagService(db).recount_usage()
+        finally:
+            db.close()
+
+    # 既有的提醒設定需排入排程
+    if "works.next_reminder_at" in changes["columns"]:
+        from ..services.reminder_service import ReminderService
+        from .database import SessionLocal
+
+        db = SessionLocal(bind=engine)
+        try:
+            ReminderService(db).backfill()
+        finally:
+            db.close()
+
+    # 既有作品需計算正規化標題
+    if "works.title_key" in changes["columns"]:
+        from ..services.duplicates import DuplicateService
+        from .database import SessionLocal
+
+        db = SessionLocal(bind=engine)
+        try:
+            DuplicateService(db).rekey()
+        finally:
+            db.close()
+
+    return changes
+
+
+def main() -> None:
+    from ..utils.logger import logger, start_logging, stop_logging
+
+    start_logging()
+    try:
+        started = time.perf_counter()
+        changes = migrate()
+        logger.info(
+            "Schema migration finished in %.1f ms: %s",
+            (time.perf_counter() - started) * 1000,
+            {kind: names for kind, names in changes.items() if names} or "up to date",
+        )
+
+        from .tenancy import close_tenant_engines, get_tenant_engines, tenancy_enabled
+
+        if tenancy_enabled():
+            # 開啟租戶 Engine 時即會套用 migrate()
+            started = time.perf_counter()
+            tenants = get_tenant_engines()
+            tenant_ids = tenants.tenant_ids()
+            for tenant_id in tenant_ids:
+                tenants.get(tenant_id)
+            close_tenant_engines()
+            logger.info(
+                "Migrated %d tenant databases in %.1f ms",
+                len(tenant_ids),
+                (time.perf_counter() - started) * 1000,
+            )
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Optional per-device SQLite tenancy.
+
+By default every device shares ``DATABASE_URL``, so one heavy writer holds the
+single SQLite write lock for everyone. With ``TENANCY_ENABLED=true`` each
+device gets its own database file under ``TENANT_DATABASE_DIR`` and ``get_db``
+routes requests by the ``X-Device-ID`` header, so writes only serialize per
+device.
+
+Every new ``X-Device-ID`` creates a database file, so the number of tenants is
+capped by ``TENANT_MAX_COUNT`` (0 disables the cap); once it is reached,
+requests for unknown devices get 403 while existing devices keep working.
+
+Engines are kept in a bounded LRU (``TENANT_ENGINE_CACHE_SIZE``); evicted
+engines are disposed and their tag registry dropped. A tenant database is
+created and brought up to the current schema the first time it is opened;
+``python -m app.db.migrate`` also migrates every existing tenant file.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..exceptions import TenantLimitException, ValidationException
+from .database import SessionLocal, configure_sqlite, get_connect_args
+
+TENANT_HEADER = "X-Device-ID"
+
+_TENANT_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def tenancy_enabled() -> bool:
+    return os.getenv("TENANCY_ENABLED", "false").lower() == "true"
+
+
+def get_tenant_database_dir() -> Path:
+    return Path(os.getenv("TENANT_DATABASE_DIR", "./tenants"))
+
+
+def get_engine_cache_size() -> int:
+    return int(os.getenv("TENANT_ENGINE_CACHE_SIZE", "64"))
+
+
+def get_max_tenants() -> int:
+    return int(os.getenv("TENANT_MAX_COUNT", "1000"))
+
+
+def validate_tenant_id(tenant_id: Optional[str]) -> str:
+    """裝置 ID 直接作為檔名，只接受英數字、底線與連字號"""
+    if not tenant_id:
+        raise ValidationException(f"{TENANT_HEADER} header is required")
+    if not _TENANT_ID.match(tenant_id):
+        raise ValidationException(f"Invalid {TENANT_HEADER}: {tenant_id}")
+    return tenant_id
+
+
+class TenantEngines:
+    """以 LRU 保留最近使用的租戶 Engine"""
+
+    def __init__(self, database_dir: Path, capacity: int, max_tenants: int = 0):
+        self.database_dir = database_dir
+        self.capacity = capacity
+        self.max_tenants = max_tenants
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._session_factories: Dict[str, sessionmaker] = {}
+        self._lock = threading.Lock()
+        # 建立新租戶檔案時序列化，數量檢查與建立之間不會有其他租戶插入
+        self._create_lock = threading.Lock()
+
+    def database_path(self, tenant_id: str) -> Path:
+        return self.database_dir / f"{tenant_id}.db"
+
+    def database_url(self, tenant_id: str) -> str:
+        return f"sqlite:///{self.database_path(tenant_id)}"
+
+    def tenant_ids(self) -> List[str]:
+        """磁碟上所有的租戶資料庫"""
+        if not self.database_dir.exists():
+            return []
+        return sorted(
+            path.stem
+            for path in self.database_dir.glob("*.db")
+            if _TENANT_ID.match(path.stem)
+        )
+
+    def is_open(self, tenant_id: str) -> bool:
+        return tenant_id in self._engines
+
+    def get(self, tenant_id: str) -> Engine:
+        with self._lock:
+            engine = self._engines.get(tenant_id)
+            if engine is not None:
+                self._engines.move_to_end(tenant_id)
+                return engine
+
+        engine = self._open(tenant_id)
+        evicted = []
+        with self._lock:
+            existing = self._engines.get(tenant_id)
+            if existing is not None:
+                # 其他執行緒已先開啟
+                evicted.append(engine)
+                engine = existing
+            else:
+                self._engines[tenant_id] = engine
+                self._session_factories[tenant_id] = sessionmaker(
+                    autocommit=False, autoflush=False, bind=engine
+                )
+            self._engines.move_to_end(tenant_id)
+            while len(self._engines) > self.capacity:
+                old_tenant_id, old_engine = self._engines.popitem(last=False)
+                self._session_factories.pop(old_tenant_id, None)
+                evicted.append(old_engine)
+
+        for old_engine in evicted:
+            self._close(old_engine)
+        return engine
+
+    def session(self, tenant_id: str) -> Session:
+        engine = self.get(tenant_id)
+        factory = self._session_factories.get(tenant_id)
+        if factory is None:
+            return Session(bind=engine, autoflush=False)
+        return factory()
+
+    def close_all(self) -> None:
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+            self._session_factories.clear()
+        for engine in engines:
+            self._close(engine)
+
+    def _open(self, tenant_id: str) -> Engine:
+        if self.database_path(tenant_id).exists():
+            return self._connect(tenant_id)
+        with self._create_lock:
+            if not self.database_path(tenant_id).exists():
+                if 0 < self.max_tenants <= len(self.tenant_ids()):
+                    raise TenantLimitException(self.max_tenants)
+            return self._connect(tenant_id)
+
+    def _connect(self, tenant_id: str) -> Engine:
+        from .migrate import migrate
+
+        self.database_dir.mkdir(parents=True, exist_ok=True)
+        database_url = self.database_url(tenant_id)
+        engine = create_engine(
+            database_url, connect_args=get_connect_args(database_url)
+        )
+        configure_sqlite(engine)
+        migrate(engine)
+        return engine
+
+    @staticmethod
+    def _close(engine: Engine) -> None:
+        from ..services.similarity import drop_similarity_index
+        from ..services.tag_cache import drop_tag_registry
+
+        drop_tag_registry(str(engine.url))
+        drop_similarity_index(str(engine.url))
+        engine.dispose()
+
+    # 維護 ---------------------------------------------------------------
+
+    def maintain(self, tenant_id: str, vacuum: bool = False) -> Dict:
+        """整理單一租戶資料庫：WAL checkpoint、更新查詢統計，必要時 VACUUM"""
+        path = self.database_path(tenant_id)
+        if not path.exists():
+            raise ValidationException(f"Unknown tenant: {tenant_id}")
+
+        size_before = _database_size(path)
+        started = time.perf_counter()
+        engine = self.get(tenant_id)
+        with engine.connect() as conn:
+            integrity = conn.execute(text("PRAGMA quick_check")).scalar()
+            conn.execute(text("PRAGMA optimize"))
+            if vacuum:
+                conn.execute(text("VACUUM"))
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+        return {
+            "tenant_id": tenant_id,
+            "integrity": integrity,
+            "vacuumed": vacuum,
+            "size_before": size_before,
+            "size_after": _database_size(path),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def maintain_all(self, vacuum: bool = False) -> Iterator[Dict]:
+        for tenant_id in self.tenant_ids():
+            yield self.maintain(tenant_id, vacuum=vacuum)
+
+    def describe(self) -> List[Dict]:
+        return [
+            {
+                "tenant_id": tenant_id,
+                "size": _database_size(self.database_path(tenant_id)),
+                "open": self.is_open(tenant_id),
+            }
+            for tenant_id in self.tenant_ids()
+        ]
+
+
+def _database_size(path: Path) -> int:
+    """資料庫檔案與 WAL 的總大小（位元組）"""
+    total = 0
+    for candidate in (path, path.with_name(path.name + "-wal")):
+        if candidate.exists():
+            total += candidate.stat().st_size
+    return total
+
+
+_tenant_engines: Optional[TenantEngines] = None
+_tenant_engines_lock = threading.Lock()
+
+
+def get_tenant_engines() -> TenantEngines:
+    global _tenant_engines
+    if _tenant_engines is None:
+        with _tenant_engines_lock:
+            if _tenant_engines is None:
+                _tenant_engines = TenantEngines(
+                    get_tenant_database_dir(),
+                    get_engine_cache_size(),
+                    get_max_tenants(),
+                )
+    return _tenant_engines
+
+
+def close_tenant_engines() -> None:
+    global _tenant_engines
+    with _tenant_engines_lock:
+        if _tenant_engines is not None:
+            _tenant_engines.close_all()
+            _tenant_engines = None
+
+
+def session_factories() -> List[Callable[[], Session]]:
+    """主資料庫，或啟用租戶時每個裝置的資料庫（供背景排程逐一處理）"""
+    if not tenancy_enabled():
+        return [SessionLocal]
+    tenants = get_tenant_engines()
+    return [
+        lambda tenant_id=tenant_id: tenants.session(tenant_id)
+        for tenant_id in tenants.tenant_ids()
+    ]
@@ -47,3 +47,27 @@ class DuplicateWorkException(WatchedItException):
         super().__init__(
             message=f"Work with title '{title}' already exists", status_code=409
         )
+
+
+class JobNotFoundException(WatchedItException):
+    """Exception raised when a background job is not found."""
+
+    def __init__(self, job_id: str):
+        super().__init__(message=f"Job with ID '{job_id}' not found", status_code=404)
+
+
+class DependencyUnavailableException(WatchedItException):
+    """Exception raised when an optional package needed by a feature is missing."""
+
+    def __init__(self, message: str):
+        super().__init__(message=message, status_code=501)
+
+
+class TenantLimitException(WatchedItException):
+    """Exception raised when a new tenant would exceed TENANT_MAX_COUNT."""
+
+    def __init__(self, limit: int):
+        super().__init__(
+            message=f"Tenant limit reached ({limit}); new devices cannot be added",
+            status_code=403,
+        )
@@ -1,66 +1,143 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import os
 
-from .api import search_router, tags_router, works_router
+from .api import (
+    admin_router,
+    images_router,
+    jobs_router,
+    search_router,
+    sync_router,
+    tags_router,
+    works_router,
+)
 from .api.cloud import router as cloud_router
-from .db.database import Base, engine
+from .api.health import router as health_router
+from .db.database import engine
+from .db.tenancy import close_tenant_engines
 from .exceptions import WatchedItException
-from .utils.logger import logger
-
-# 建立資料表
-Base.metadata.create_all(bind=engine)
-
-# 建立 FastAPI 應用程式
-app = FastAPI(
-    title="WatchedIt API", description="看過了 - 作品記錄 Web App API", version="1.0.0"
+from .services.cache_bus import start_cache_bus, stop_cache_bus
+from .services.jobs import start_job_runner, stop_job_runner
+from .services.reminder_service import start_reminder_scheduler, stop_reminder_scheduler
+from .utils.http_cache import HTTPCacheMiddleware, NotModified, not_modified_handler
+from .utils.logger import RequestIdMiddleware, logger, start_logging, stop_logging
+from .utils.responses import SelectiveGZipMiddleware
+from .utils.metrics import (
+    MetricsMiddleware,
+    install_instrumentation,
+    metrics_enabled,
+    render_metrics,
 )
+from .utils.slow_query import install_slow_query_log, slow_query_log_enabled
 
 
 def parse_allowed_origins(value: str) -> list[str]:
     return [origin.strip() for origin in value.split(",") if origin.strip()]
 
 
-# 設定 CORS - 從環境變數讀取允許的來源
-ALLOWED_ORIGINS = parse_allowed_origins(
-    os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """啟動背景日誌、快取失效通知、提醒排程與背景工作；結構描述由部署步驟 python -m app.db.migrate 建立"""
+    start_logging()
+    start_cache_bus(engine)
+    start_reminder_scheduler()
+    start_job_runner()
+    logger.info("WatchedIt API started")
+    try:
+        yield
+    finally:
+        stop_job_runner()
+        stop_reminder_scheduler()
+        stop_cache_bus()
+        close_tenant_engines()
+        engine.dispose()
+        stop_logging()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS,  # 限制特定來源
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # 限制特定方法
-    allow_headers=["*"],
-    max_age=3600,  # 快取 preflight 請求
-)
 
+def create_app() -> FastAPI:
+    """建立 FastAPI 應用程式（匯入時不連線資料庫、不建立檔案）"""
+    app = FastAPI(
+        title="WatchedIt API",
+        description="看過了 - 作品記錄 Web App API",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # 設定 CORS - 從環境變數讀取允許的來源
+    allowed_origins = parse_allowed_origins(
+        os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
+    )
 
-# 全域異常處理器
-@app.exception_handler(WatchedItException)
-async def watchedit_exception_handler(request: Request, exc: WatchedItException):
-    """Handle custom WatchedIt exceptions."""
-    logger.error(f"WatchedIt exception: {exc.message}")
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={"detail": exc.message},
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allowed_origins,  # 限制特定來源
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # 限制特定方法
+        allow_headers=["*"],
+        expose_headers=[
+            "ETag",
+            "Server-Timing",
+            "X-Request-ID",
+        ],  # 讓前端可讀取 ETag（送出 If-None-Match）、Server-Timing 與請求 ID
+        max_age=3600,  # 快取 preflight 請求
+    )
+    app.add_middleware(HTTPCacheMiddleware)
+    # 大於 1KB 的回應以 gzip 壓縮（與 nginx 的 gzip_min_length 一致）；圖片已壓縮，略過
+    app.add_middleware(
+        SelectiveGZipMiddleware, minimum_size=1024, exclude_prefixes=("/images/",)
     )
 
-# 註冊路由
-app.include_router(works_router)
-app.include_router(tags_router)
-app.include_router(search_router)
-app.include_router(cloud_router, prefix="/cloud", tags=["cloud"])
+    # 效能指標（METRICS_ENABLED=true 時才安裝，停用時請求路徑不受影響）
+    if metrics_enabled():
+        install_instrumentation()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            """Prometheus 指標"""
+            return PlainTextResponse(
+                render_metrics(), media_type="text/plain; version=0.0.4"
+            )
+
+    # 慢查詢紀錄（設定 SLOW_QUERY_THRESHOLD_MS 時啟用，可由 /admin/slow-queries 查看）
+    if slow_query_log_enabled():
+        install_slow_query_log()
+
+    # 請求 ID（最外層，讓其他中介層與日誌都能取得）
+    app.add_middleware(RequestIdMiddleware)
+
+    # 全域異常處理器
+    @app.exception_handler(WatchedItException)
+    async def watchedit_exception_handler(request: Request, exc: WatchedItException):
+        """Handle custom WatchedIt exceptions."""
+        logger.error("WatchedIt exception: %s", exc.message)
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.message},
+        )
+
+    app.add_exception_handler(NotModified, not_modified_handler)
+
+    # 註冊路由
+    app.include_router(health_router)
+    app.include_router(works_router)
+    app.include_router(tags_router)
+    app.include_router(search_router)
+    app.include_router(sync_router)
+    app.include_router(admin_router)
+    app.include_router(images_router)
+    app.include_router(jobs_router)
+    app.include_router(cloud_router, prefix="/cloud", tags=["cloud"])
 
+    @app.get("/")
+    async def root():
+        """根路徑"""
+        return {"message": "WatchedIt API", "version": "1.0.0", "docs": "/docs"}
 
-@app.get("/")
-async def root():
-    """根路徑"""
-    return {"message": "WatchedIt API", "version": "1.0.0", "docs": "/docs"}
+    return app
 
 
-@app.get("/health")
-async def health_check():
-    """健康檢查"""
-    return {"status": "healthy"}
+app = create_app()
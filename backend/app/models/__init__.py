@@ -1,5 +1,21 @@
+from .backup_version import BackupChunk, BackupVersion, BackupVersionChunk
+from .change_log import ChangeLog
 from .cloud_backup import CloudBackup
+from .job import Job
 from .tag import Tag
+from .watch_event import WatchDaily, WatchEvent, WatchMonthly
 from .work import Work
 
-__all__ = ["Work", "Tag", "CloudBackup"]
+__all__ = [
+    "Work",
+    "Tag",
+    "CloudBackup",
+    "BackupChunk",
+    "BackupVersion",
+    "BackupVersionChunk",
+    "ChangeLog",
+    "WatchEvent",
+    "WatchDaily",
+    "WatchMonthly",
+    "Job",
+]
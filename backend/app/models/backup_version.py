@@ -0,0 +1,56 @@
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from ..db.database import Base
+
+
+class BackupChunk(Base):
+    """以內容雜湊定址的備份區塊，同一筆作品/標籤在各版本、各設備間共用"""
+
+    __tablename__ = "backup_chunks"
+
+    hash = Column(String(64), primary_key=True)  # 正規化 JSON 的 SHA-256
+    data = Column(JSON, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<BackupChunk(hash='{self.hash[:12]}', size={self.size})>"
+
+
+class BackupVersion(Base):
+    __tablename__ = "backup_versions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    device_id = Column(String, nullable=False)
+    backup_date = Column(DateTime(timezone=True), nullable=False)
+    version = Column(String, nullable=False, default="1.0.0")
+    works_count = Column(Integer, nullable=False, default=0)
+    tags_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_backup_versions_device_id_id", "device_id", "id"),)
+
+    def __repr__(self):
+        return f"<BackupVersion(id={self.id}, device_id='{self.device_id}')>"
+
+
+class BackupVersionChunk(Base):
+    """版本清單：記錄某版本依序引用了哪些區塊"""
+
+    __tablename__ = "backup_version_chunks"
+
+    version_id = Column(
+        Integer, ForeignKey("backup_versions.id", ondelete="CASCADE"), primary_key=True
+    )
+    kind = Column(String, primary_key=True)  # work / tag
+    position = Column(Integer, primary_key=True)
+    chunk_hash = Column(
+        String(64), ForeignKey("backup_chunks.hash"), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return (
+            f"<BackupVersionChunk(version_id={self.version_id}, kind='{self.kind}', "
+            f"position={self.position})>"
+        )
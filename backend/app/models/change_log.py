@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import func
+
+from ..db.database import Base
+
+
+class ChangeLog(Base):
+    """作品與標籤的變更紀錄，自增 ID 即為增量同步的游標（依提交順序遞增，見 services.change_log）"""
+
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # work / tag
+    entity_id = Column(String, nullable=False)
+    op = Column(String, nullable=False)  # upsert / delete
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_change_log_entity_id", "entity", "id"),)
+
+    def __repr__(self):
+        return (
+            f"<ChangeLog(id={self.id}, entity='{self.entity}', "
+            f"entity_id='{self.entity_id}', op='{self.op}')>"
+        )
@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import false, func
+
+from ..db.database import Base
+
+
+class Job(Base):
+    """背景工作；狀態存在資料庫，重新啟動後可繼續執行"""
+
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    type = Column(String, nullable=False)  # 已註冊的工作類型，如 backup.upload
+    # queued、running、succeeded、failed、cancelled
+    status = Column(String, nullable=False)
+    params = Column(JSON)
+    progress = Column(JSON)  # {"current", "total", "message"}
+    result = Column(JSON)
+    error = Column(String)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    cancel_requested = Column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
+    # 以 Python 產生時間（含微秒），同一秒內建立的工作也能依序排列
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+    )
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # 執行中的工作定期更新；過久未更新表示執行的行程已中止
+    heartbeat_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+        Index("ix_jobs_type_created", "type", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<Job(id='{self.id}', type='{self.type}', status='{self.status}')>"
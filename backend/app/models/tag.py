@@ -10,6 +10,7 @@ class Tag(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, nullable=False, index=True)
     color = Column(String, default="#3b82f6")  # 預設藍色
+    usage_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     # 關聯作品
     works = relationship("WorkTag", back_populates="tag")
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from ..db.database import Base
+
+
+class WatchEvent(Base):
+    """觀看紀錄（只新增不修改）；作品刪除後仍保留，歷史統計不受影響"""
+
+    __tablename__ = "watch_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    work_id = Column(String, nullable=False, index=True)
+    episodes = Column(Integer, nullable=False)  # 集數變化，撤銷時為負數
+    minutes = Column(Integer, nullable=False, default=0)  # episodes × 每集長度
+    watched_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), index=True
+    )
+
+    def __repr__(self):
+        return (
+            f"<WatchEvent(id={self.id}, work_id='{self.work_id}', "
+            f"episodes={self.episodes})>"
+        )
+
+
+class WatchDaily(Base):
+    """每日觀看彙總（UTC），隨事件寫入以 upsert 累加"""
+
+    __tablename__ = "watch_daily"
+
+    period = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    episodes = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+    events = Column(Integer, nullable=False, default=0)
+
+
+class WatchMonthly(Base):
+    """每月觀看彙總（UTC）"""
+
+    __tablename__ = "watch_monthly"
+
+    period = Column(String(7), primary_key=True)  # YYYY-MM
+    episodes = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+    events = Column(Integer, nullable=False, default=0)
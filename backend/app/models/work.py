@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, Float, Integer, String
+from sqlalchemy import JSON, Boolean, Column, DateTime, Float, Index, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,6 +12,8 @@ class Work(Base):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False, index=True)
+    # 正規化標題（見 utils.title_key），與 type 組成重複檢查用的索引
+    title_key = Column(String)
     type = Column(String, nullable=False)  # 動畫、小說、漫畫、電影、電視劇、自定義
     status = Column(String, nullable=False)  # 進行中、已完結、暫停、放棄
     year = Column(Integer)
@@ -24,9 +26,21 @@ class Work(Base):
     source = Column(String)  # 來源
     reminder_enabled = Column(Boolean, default=False)
     reminder_frequency = Column(String)  # daily, weekly, monthly
+    # 下一次提醒時間；未啟用提醒時為 NULL，排程器只掃描索引中已到期的範圍
+    next_reminder_at = Column(DateTime(timezone=True), index=True)
+    # AniList 中繼資料；enriched_at 為 NULL 表示尚未比對（比對不到時仍會寫入時間）
+    anilist_id = Column(Integer, index=True)
+    cover_image = Column(String)
+    genres = Column(JSON)
+    enriched_at = Column(DateTime(timezone=True), index=True)
 
     # 關聯標籤
     tags = relationship("WorkTag", back_populates="work")
 
+    # flush 時以 RETURNING（不支援時改用 SELECT）取回 date_added 等伺服器預設值
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (Index("ix_works_title_key_type", "title_key", "type"),)
+
     def __repr__(self):
         return f"<Work(id={self.id}, title='{self.title}', type='{self.type}')>"
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class JobCreate(BaseModel):
+    type: str = Field(
+        ...,
+        description="stats.refresh 或 works.export；其他類型由各自的端點送出",
+    )
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ExportJobParams(BaseModel):
+    """works.export 的參數"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    format: Literal["parquet", "arrow"] = "parquet"
+    tables: Optional[List[Literal["works", "tags", "work_tags"]]] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str = Field(..., description="queued、running、succeeded、failed、cancelled")
+    progress: Optional[Dict[str, Any]] = Field(
+        None, description="{current, total, message}"
+    )
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    cancel_requested: bool
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,17 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SyncChange(BaseModel):
+    cursor: int
+    entity: str = Field(..., description="work / tag")
+    id: str
+    op: str = Field(..., description="upsert / delete")
+    data: Optional[Dict[str, Any]] = Field(None, description="upsert 時的最新資料")
+
+
+class SyncChangeFeed(BaseModel):
+    changes: List[SyncChange]
+    next_cursor: int
+    has_more: bool
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -19,3 +19,25 @@ class TagResponse(BaseModel):
     id: int
     name: str
     color: str
+
+
+class TagWithCountResponse(TagResponse):
+    usage_count: int = Field(0, description="使用此標籤的作品數")
+
+
+class TagMerge(BaseModel):
+    source_ids: List[int] = Field(..., min_length=1, description="要併入的標籤ID")
+    target_id: int = Field(..., description="保留的標籤ID")
+
+
+class TagRename(BaseModel):
+    name: str = Field(..., min_length=1, max_length=50)
+
+
+class TagWorkIds(BaseModel):
+    work_ids: List[str] = Field(..., min_length=1, description="作品ID列表")
+
+
+class TagBulkResult(BaseModel):
+    tag: TagWithCountResponse
+    affected_works: int
@@ -3,6 +3,8 @@ from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator
 
+from .tag import TagResponse
+
 
 class WorkCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
@@ -81,14 +83,6 @@ class WorkUpdate(BaseModel):
     tag_ids: Optional[List[int]] = Field(None)
 
 
-class TagResponse(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-
-    id: int
-    name: str
-    color: str
-
-
 class WorkResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -106,9 +100,44 @@ class WorkResponse(BaseModel):
     source: Optional[str]
     reminder_enabled: bool
     reminder_frequency: Optional[str]
+    next_reminder_at: Optional[datetime] = None
+    anilist_id: Optional[int] = None
+    cover_image: Optional[str] = None
+    genres: Optional[List[str]] = None
+    enriched_at: Optional[datetime] = None
     tags: List[TagResponse] = Field(default_factory=list)
 
 
+class ProgressIncrement(BaseModel):
+    by: int = Field(1, ge=-1000, le=1000, description="增加的集數，負數可撤銷")
+
+
+class ProgressSet(BaseModel):
+    episode: int = Field(..., ge=0, description="目前集數")
+
+
+class WorkProgressResponse(BaseModel):
+    """進度更新的精簡回應，不含標籤等完整作品資料"""
+
+    id: str
+    progress: Optional[Dict[str, Any]]
+    status: str
+    date_updated: Optional[datetime]
+
+
+class SimilarWork(BaseModel):
+    id: str
+    title: str
+    type: str
+    year: Optional[int]
+    score: float = Field(..., description="cosine 相似度 0-1")
+
+
+class SimilarWorks(BaseModel):
+    work_id: str
+    similar: List[SimilarWork]
+
+
 class WorkList(BaseModel):
     works: List[WorkResponse]
     total: int
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, exists, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.backup_version import BackupChunk, BackupVersion, BackupVersionChunk
+from ..models.cloud_backup import CloudBackup
+from .jobs import JobContext, register_job_type
+
+# SQLite 單一語句的參數上限預設為 999，IN 查詢分批進行
+_IN_BATCH_SIZE = 500
+
+
+def get_backup_retention() -> int:
+    """每個設備保留的備份版本數量"""
+    return max(1, int(os.getenv("BACKUP_RETENTION", "10")))
+
+
+def chunk_hash(item: Dict[str, Any]) -> str:
+    """以正規化 JSON 計算內容雜湊，鍵順序不同的相同資料會得到相同雜湊"""
+    canonical = json.dumps(
+        item, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _batched(values: List[str]) -> Iterable[List[str]]:
+    for start in range(0, len(values), _IN_BATCH_SIZE):
+        yield values[start : start + _IN_BATCH_SIZE]
+
+
+def _existing_chunks(hashes: List[str]):
+    """已存在的區塊；以 FOR SHARE 鎖住到提交，其他設備的清理無法在連結前刪除它們"""
+    return (
+        select(BackupChunk.hash)
+        .where(BackupChunk.hash.in_(hashes))
+        .with_for_update(read=True)
+    )
+
+
+def _unreferenced_chunks(hashes: List[str]):
+    return and_(
+        BackupChunk.hash.in_(hashes),
+        ~exists().where(BackupVersionChunk.chunk_hash == BackupChunk.hash),
+    )
+
+
+class BackupService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save_backup(
+        self,
+        device_id: str,
+        works: List[Dict[str, Any]],
+        tags: List[Dict[str, Any]],
+        backup_date: datetime,
+        version: str,
+    ) -> BackupVersion:
+        """更新設備的最新備份，並新增一個去重儲存的歷史版本"""
+        head = (
+            self.db.query(CloudBackup)
+            .filter(CloudBackup.device_id == device_id)
+            .first()
+        )
+        if head:
+            head.works = works
+            head.tags = tags
+            head.backup_date = backup_date
+            head.version = version
+            head.last_updated = datetime.now()
+        else:
+            self.db.add(
+                CloudBackup(
+                    device_id=device_id,
+                    works=works,
+                    tags=tags,
+                    backup_date=backup_date,
+                    version=version,
+                )
+            )
+
+        backup_version = BackupVersion(
+            device_id=device_id,
+            backup_date=backup_date,
+            version=version,
+            works_count=len(works),
+            tags_count=len(tags),
+        )
+        self.db.add(backup_version)
+        self.db.flush()
+
+        hashes = self._store_chunks(works + tags)
+        work_hashes, tag_hashes = hashes[: len(works)], hashes[len(works) :]
+        self.db.add_all(
+            BackupVersionChunk(
+                version_id=backup_version.id,
+                kind=kind,
+                position=position,
+                chunk_hash=hash_,
+            )
+            for kind, kind_hashes in (("work", work_hashes), ("tag", tag_hashes))
+            for position, hash_ in enumerate(kind_hashes)
+        )
+        # 先寫入新版本的引用，避免清理舊版本時誤刪共用區塊
+        self.db.flush()
+
+        self.prune_versions(device_id)
+        self.db.commit()
+        return backup_version
+
+    def _store_chunks(self, items: List[Dict[str, Any]]) -> List[str]:
+        """寫入尚未存在的區塊，回傳依原順序排列的雜湊"""
+        hashes = [chunk_hash(item) for item in items]
+        pending = dict(zip(hashes, items))
+        if not pending:
+            return hashes
+
+        for batch in _batched(list(pending)):
+            for existing in self.db.scalars(_existing_chunks(batch)):
+                pending.pop(existing, None)
+
+        self._insert_chunks(
+            [
+                {
+                    "hash": hash_,
+                    "data": item,
+                    "size": len(json.dumps(item, ensure_ascii=False).encode("utf-8")),
+                }
+                for hash_, item in pending.items()
+            ]
+        )
+        return hashes
+
+    def _insert_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        """寫入新區塊；並行上傳剛寫入同一雜湊時略過（內容相同），不違反主鍵"""
+        if not rows:
+            return
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert_factory = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            self.db.execute(
+                insert_factory(BackupChunk).on_conflict_do_nothing(
+                    index_elements=[BackupChunk.hash]
+                ),
+                rows,
+            )
+            return
+
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(BackupChunk), [row])
+            except IntegrityError:
+                continue
+
+    def list_versions(self, device_id: str) -> List[BackupVersion]:
+        """列出設備的備份版本（新到舊）"""
+        return (
+            self.db.query(BackupVersion)
+            .filter(BackupVersion.device_id == device_id)
+            .order_by(BackupVersion.id.desc())
+            .all()
+        )
+
+    def get_version(self, device_id: str, version_id: int) -> Optional[BackupVersion]:
+        """取得設備的指定版本"""
+        return (
+            self.db.query(BackupVersion)
+            .filter(
+                BackupVersion.id == version_id, BackupVersion.device_id == device_id
+            )
+            .first()
+        )
+
+    def load_version_data(self, backup_version: BackupVersion) -> Dict[str, List]:
+        """依版本清單組回完整的作品與標籤資料"""
+        rows = (
+            self.db.query(BackupVersionChunk.kind, BackupChunk.data)
+            .join(BackupChunk, BackupChunk.hash == BackupVersionChunk.chunk_hash)
+            .filter(BackupVersionChunk.version_id == backup_version.id)
+            .order_by(BackupVersionChunk.kind, BackupVersionChunk.position)
+            .all()
+        )
+        data: Dict[str, List] = {"works": [], "tags": []}
+        for kind, item in rows:
+            data["works" if kind == "work" else "tags"].append(item)
+        return data
+
+    def restore_version(self, device_id: str, version_id: int) -> Optional[Dict]:
+        """將指定版本設為設備的最新備份"""
+        backup_version = self.get_version(device_id, version_id)
+        if not backup_version:
+            return None
+
+        data = self.load_version_data(backup_version)
+        head = (
+            self.db.query(CloudBackup)
+            .filter(CloudBackup.device_id == device_id)
+            .first()
+        )
+        if not head:
+            head = CloudBackup(device_id=device_id)
+            self.db.add(head)
+        head.works = data["works"]
+        head.tags = data["tags"]
+        head.backup_date = backup_version.backup_date
+        head.version = backup_version.version
+        head.last_updated = datetime.now()
+        self.db.commit()
+
+        return {
+            **data,
+            "backupDate": backup_version.backup_date.isoformat(),
+            "version": backup_version.version,
+        }
+
+    def prune_versions(self, device_id: str, keep: Optional[int] = None) -> int:
+        """依保留政策刪除舊版本，並清除不再被引用的區塊"""
+        keep = get_backup_retention() if keep is None else keep
+        stale_ids = [
+            version_id
+            for (version_id,) in self.db.query(BackupVersion.id)
+            .filter(BackupVersion.device_id == device_id)
+            .order_by(BackupVersion.id.desc())
+            .offset(keep)
+        ]
+        self._delete_versions(stale_ids)
+        return len(stale_ids)
+
+    def delete_versions(self, device_id: str) -> int:
+        """刪除設備的所有版本"""
+        version_ids = [
+            version_id
+            for (version_id,) in self.db.query(BackupVersion.id).filter(
+                BackupVersion.device_id == device_id
+            )
+        ]
+        self._delete_versions(version_ids)
+        return len(version_ids)
+
+    def _delete_versions(self, version_ids: List[int]) -> None:
+        if not version_ids:
+            return
+
+        candidate_hashes = {
+            hash_
+            for (hash_,) in self.db.query(BackupVersionChunk.chunk_hash)
+            .filter(BackupVersionChunk.version_id.in_(version_ids))
+            .distinct()
+        }
+        self.db.query(BackupVersionChunk).filter(
+            BackupVersionChunk.version_id.in_(version_ids)
+        ).delete(synchronize_session=False)
+        self.db.query(BackupVersion).filter(BackupVersion.id.in_(version_ids)).delete(
+            synchronize_session=False
+        )
+
+        # 只檢查被刪除版本引用過的區塊，其餘區塊必定仍被引用
+        for batch in _batched(list(candidate_hashes)):
+            self._delete_orphaned_chunks(batch)
+
+    def _delete_orphaned_chunks(self, hashes: List[str]) -> None:
+        """刪除已無版本引用的區塊
+
+        PostgreSQL 上先以 FOR UPDATE SKIP LOCKED 鎖定：其他設備上傳中、
+        已鎖定（FOR SHARE）或已連結但未提交的區塊會被略過，不會被刪除。
+        """
+        if self.db.get_bind().dialect.name == "postgresql":
+            hashes = list(
+                self.db.scalars(
+                    select(BackupChunk.hash)
+                    .where(_unreferenced_chunks(hashes))
+                    .with_for_update(skip_locked=True)
+                )
+            )
+            if not hashes:
+                return
+        self.db.execute(
+            delete(BackupChunk)
+            .where(_unreferenced_chunks(hashes))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def parse_backup_date(value: str) -> datetime:
+    """接受前端送出的 ISO 時間（結尾可為 Z）"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def upload_backup(db: Session, params: Dict[str, Any], context: JobContext):
+    """工作 backup.upload：儲存上傳的備份（params 為 BackupData）"""
+    context.progress(0, 1, force=True)
+    backup_version = BackupService(db).save_backup(
+        device_id=params["deviceId"],
+        works=params["works"],
+        tags=params["tags"],
+        backup_date=parse_backup_date(params["backupDate"]),
+        version=params["version"],
+    )
+    context.progress(1, 1, force=True)
+    return {
+        "versionId": backup_version.id,
+        "worksCount": len(params["works"]),
+        "tagsCount": len(params["tags"]),
+    }
+
+
+# 整份備份不需在工作結束後保留
+register_job_type("backup.upload", upload_backup, concurrency=2, keep_params=False)
@@ -0,0 +1,238 @@
+"""Cross-process cache invalidation bus for multi-worker deployments.
+
+With several uvicorn workers (``WEB_CONCURRENCY``/``--workers``), every
+process keeps its own in-memory caches (e.g. the tag registry). Writes are
+written through to the local process only, so the other workers have to learn
+that something changed. ``CACHE_BUS`` selects how:
+
+* ``none`` (default): no bus; caches re-check the data version on a short
+  interval, which is fine for a single worker.
+* ``sqlite``: a background thread polls ``PRAGMA data_version`` on its own
+  connection. The value changes whenever another connection commits, so
+  commits from any worker are noticed within ``CACHE_BUS_POLL_INTERVAL``
+  seconds without reading any table.
+* ``redis``: committed entity names are published on a Redis channel
+  (``REDIS_URL``) and every worker subscribes. Requires the optional
+  ``redis`` package. Works for any database, including Postgres.
+
+Subscribers receive the set of changed entities, or ``None`` when the backend
+cannot tell (SQLite), and should re-validate lazily rather than reload
+eagerly.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Callable, FrozenSet, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..utils.logger import logger
+
+PENDING_KEY = "watchedit_changed_entities"
+
+Listener = Callable[[Optional[FrozenSet[str]]], None]
+
+_listeners: List[Listener] = []
+_listeners_lock = threading.Lock()
+_bus: Optional["CacheBus"] = None
+
+
+def get_cache_bus_backend() -> str:
+    return os.getenv("CACHE_BUS", "none").lower()
+
+
+def get_poll_interval() -> float:
+    return float(os.getenv("CACHE_BUS_POLL_INTERVAL", "0.2"))
+
+
+def subscribe(listener: Listener) -> None:
+    with _listeners_lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def unsubscribe(listener: Listener) -> None:
+    with _listeners_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def notify(entities: Optional[FrozenSet[str]]) -> None:
+    """通知本行程內的所有快取"""
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(entities)
+        except Exception:
+            logger.exception("Cache invalidation listener failed")
+
+
+class CacheBus:
+    name = "none"
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def publish(self, entities: FrozenSet[str]) -> None:
+        """本行程已寫入快取，只需通知其他行程"""
+
+
+class SQLiteDataVersionBus(CacheBus):
+    name = "sqlite"
+
+    def __init__(self, database_path: str, interval: Optional[float] = None):
+        if not database_path or database_path == ":memory:":
+            raise ValueError("CACHE_BUS=sqlite requires a file-based SQLite database")
+        self.database_path = database_path
+        self.interval = get_poll_interval() if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._poll, name="watchedit-cache-bus", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _poll(self) -> None:
+        conn = sqlite3.connect(self.database_path, check_same_thread=False)
+        try:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            while not self._stop.wait(self.interval):
+                try:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                except sqlite3.Error as e:
+                    logger.warning("Cache bus poll failed: %s", e)
+                    continue
+                if current != version:
+                    version = current
+                    notify(None)
+        finally:
+            conn.close()
+
+
+class RedisBus(CacheBus):
+    name = "redis"
+    channel = "watchedit:cache-invalidation"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BUS=redis requires the 'redis' package (pip install redis)"
+            ) from e
+
+        self._client = redis.Redis.from_url(url)
+        self._origin = uuid.uuid4().hex
+        self._pubsub = None
+        self._thread = None
+
+    def start(self) -> None:
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: self._handle})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def publish(self, entities: FrozenSet[str]) -> None:
+        message = json.dumps({"origin": self._origin, "entities": sorted(entities)})
+        try:
+            self._client.publish(self.channel, message)
+        except Exception as e:
+            # 其他 worker 仍會在定期檢查資料版本時更新
+            logger.warning("Cache bus publish failed: %s", e)
+
+    def _handle(self, message) -> None:
+        payload = json.loads(message["data"])
+        if payload.get("origin") != self._origin:
+            notify(frozenset(payload.get("entities") or ()))
+
+
+# 提交後發布 ------------------------------------------------------------------
+
+
+def mark_changed(db: Session, entity: str) -> None:
+    """記下本交易變更的實體，提交後才發布（由 change_log 呼叫）"""
+    db.info.setdefault(PENDING_KEY, set()).add(entity)
+
+
+def _after_commit(session: Session) -> None:
+    entities = session.info.pop(PENDING_KEY, None)
+    if entities and _bus is not None:
+        _bus.publish(frozenset(entities))
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+def cache_bus_active() -> bool:
+    return _bus is not None
+
+
+def create_cache_bus(backend: str, engine: Engine) -> Optional[CacheBus]:
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        if engine.dialect.name != "sqlite":
+            raise ValueError("CACHE_BUS=sqlite requires a SQLite DATABASE_URL")
+        from ..db.tenancy import tenancy_enabled
+
+        if tenancy_enabled():
+            # 只會監看 DATABASE_URL，看不到各租戶檔案的寫入
+            raise ValueError("CACHE_BUS=sqlite cannot be used with TENANCY_ENABLED")
+        return SQLiteDataVersionBus(engine.url.database)
+    if backend == "redis":
+        return RedisBus(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown CACHE_BUS backend: {backend}")
+
+
+def start_cache_bus(
+    engine: Engine, backend: Optional[str] = None
+) -> Optional[CacheBus]:
+    """依 CACHE_BUS 啟動失效通知（lifespan 啟動時呼叫）"""
+    global _bus
+    stop_cache_bus()
+    bus = create_cache_bus(backend or get_cache_bus_backend(), engine)
+    if bus is None:
+        return None
+
+    bus.start()
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    _bus = bus
+    logger.info("Cache invalidation bus started: %s", bus.name)
+    return bus
+
+
+def stop_cache_bus() -> None:
+    global _bus
+    if _bus is None:
+        return
+    event.remove(Session, "after_commit", _after_commit)
+    event.remove(Session, "after_rollback", _after_rollback)
+    _bus.stop()
+    _bus = None
@@ -0,0 +1,78 @@
+"""Change log: one row per written work or tag, in the writing transaction.
+
+The autoincrement ``id`` is both the ``/sync/changes`` cursor and the data
+version behind ETags and the in-process caches, so ids must become visible in
+increasing order. SQLite serializes writers, so they do. PostgreSQL hands out
+ids at insert time, and two transactions can commit in the other order; a
+reader could then move past an id that is still uncommitted and never see it.
+On PostgreSQL every transaction that writes the change log therefore takes a
+transaction-level advisory lock first and holds it until it commits, so ids
+are assigned in commit order. Writers are only serialized from their
+change-log write to the commit, which the services do last.
+"""
+
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from ..models.change_log import ChangeLog
+from .cache_bus import mark_changed
+
+ENTITY_WORK = "work"
+ENTITY_TAG = "tag"
+
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+# PostgreSQL advisory lock 的鍵（任意固定值，只需與其他 advisory lock 不衝突）
+_CHANGE_LOG_LOCK = 0x57415443484C4F47
+
+
+def _lock_change_log(db: Session) -> None:
+    """PostgreSQL：持有鎖直到提交，讓變更紀錄的 ID 依提交順序遞增"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(_CHANGE_LOG_LOCK)))
+
+
+def record_change(
+    db: Session, entity: str, entity_id, op: str = OP_UPSERT
+) -> ChangeLog:
+    """在目前交易中加入一筆變更紀錄，與資料寫入一同提交；flush 後其 id 即為新的資料版本"""
+    _lock_change_log(db)
+    entry = ChangeLog(entity=entity, entity_id=str(entity_id), op=op)
+    db.add(entry)
+    mark_changed(db, entity)
+    return entry
+
+
+def record_changes(
+    db: Session, entity: str, entity_ids: Iterable, op: str = OP_UPSERT
+) -> None:
+    """批次寫入多筆變更紀錄（用於一次影響多個實體的操作）"""
+    rows = [
+        {"entity": entity, "entity_id": str(entity_id), "op": op}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        _lock_change_log(db)
+        db.execute(insert(ChangeLog), rows)
+        mark_changed(db, entity)
+
+
+def get_data_versions(
+    db: Session, entities, before: Optional[int] = None
+) -> Dict[str, int]:
+    """取得各實體的資料版本（最後一筆變更的游標），沒有變更時為 0
+
+    指定 before 時只看游標小於它的變更，即該筆變更之前的版本。
+    """
+    versions = dict.fromkeys(entities, 0)
+    query = db.query(ChangeLog.entity, func.max(ChangeLog.id)).filter(
+        ChangeLog.entity.in_(list(versions))
+    )
+    if before is not None:
+        query = query.filter(ChangeLog.id < before)
+    rows = query.group_by(ChangeLog.entity).all()
+    versions.update({entity: version for entity, version in rows})
+    return versions
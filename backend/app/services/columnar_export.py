@@ -0,0 +1,349 @@
+"""Columnar (Parquet / Arrow) export of the library for analytics.
+
+``works``, ``tags`` and the ``work_tags`` relation are exported one table per
+file, either as Parquet or as an Arrow IPC file (what ``pandas.read_feather``
+reads). Each table is read with a streaming cursor (``yield_per``): every
+partition of rows becomes one ``RecordBatch``, and Parquet writes it as its
+own row group. Rows go from cursor tuples to Arrow arrays column by column,
+without building a dict per row. Memory stays at one batch no matter how big
+the library is.
+
+The ``progress`` JSON is flattened in SQL (``ProgressSQL.field``) into the
+integer columns ``episode``, ``total_episode`` and ``duration``. ``genres``
+becomes ``list<string>``, and timestamps are UTC ``timestamp[us]``.
+
+``GET /works/export/{table}`` streams a single table as a download. The
+``works.export`` job (or ``python -m app.services.columnar_export DIR``)
+writes all three files to a directory.
+
+``pyarrow`` is optional. Without it, the endpoint and the job fail with 501.
+"""
+
+import argparse
+import io
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..exceptions import DependencyUnavailableException, ValidationException
+from ..models.tag import Tag, WorkTag
+from ..models.work import Work
+from ..schemas.job import ExportJobParams
+from ..utils.logger import logger
+from .jobs import JobContext, register_job_type
+from .work_service import ProgressSQL
+
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+EXPORT_FORMATS = (FORMAT_PARQUET, FORMAT_ARROW)
+EXPORT_TABLES = ("works", "tags", "work_tags")
+
+MEDIA_TYPES = {
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+    FORMAT_ARROW: "application/vnd.apache.arrow.file",
+}
+
+# progress JSON 中展開成整數欄位的鍵
+PROGRESS_FIELDS = ("episode", "total_episode", "duration")
+
+
+def get_export_batch_size() -> int:
+    return max(1, int(os.getenv("EXPORT_BATCH_SIZE", "10000")))
+
+
+def get_export_dir() -> Path:
+    return Path(os.getenv("EXPORT_DIR", "./exports"))
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def require_pyarrow() -> None:
+    if not pyarrow_available():
+        raise DependencyUnavailableException(
+            "Columnar export requires the 'pyarrow' package (pip install pyarrow)"
+        )
+
+
+def validate_export_format(export_format: str) -> str:
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationException(
+            f"Unknown export format '{export_format}'. "
+            f"Expected one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    return export_format
+
+
+def validate_export_table(table: str) -> str:
+    if table not in EXPORT_TABLES:
+        raise ValidationException(
+            f"Unknown export table '{table}'. "
+            f"Expected one of: {', '.join(EXPORT_TABLES)}"
+        )
+    return table
+
+
+def export_filename(table: str, export_format: str) -> str:
+    return f"{table}.{export_format}"
+
+
+def _table_spec(db: Session, table: str) -> Tuple[Any, Any]:
+    """回傳 (查詢, Arrow schema)；查詢欄位順序與 schema 一致"""
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    if table == "works":
+        progress = ProgressSQL(db.get_bind().dialect.name)
+        columns = [
+            (Work.id, pa.string()),
+            (Work.title, pa.string()),
+            (Work.type, pa.string()),
+            (Work.status, pa.string()),
+            (Work.year, pa.int32()),
+            *((progress.field(key).label(key), pa.int32()) for key in PROGRESS_FIELDS),
+            (Work.rating, pa.float64()),
+            (Work.review, pa.string()),
+            (Work.note, pa.string()),
+            (Work.source, pa.string()),
+            (Work.reminder_enabled, pa.bool_()),
+            (Work.reminder_frequency, pa.string()),
+            (Work.anilist_id, pa.int64()),
+            (Work.cover_image, pa.string()),
+            (Work.genres, pa.list_(pa.string())),
+            (Work.date_added, timestamp),
+            (Work.date_updated, timestamp),
+            (Work.enriched_at, timestamp),
+        ]
+        order_by = (Work.id,)
+    elif table == "tags":
+        columns = [
+            (Tag.id, pa.int64()),
+            (Tag.name, pa.string()),
+            (Tag.color, pa.string()),
+            (Tag.usage_count, pa.int64()),
+        ]
+        order_by = (Tag.id,)
+    else:
+        columns = [(WorkTag.work_id, pa.string()), (WorkTag.tag_id, pa.int64())]
+        order_by = (WorkTag.work_id, WorkTag.tag_id)
+
+    statement = select(*(column for column, _ in columns)).order_by(*order_by)
+    schema = pa.schema(
+        [pa.field(column.key, arrow_type) for column, arrow_type in columns]
+    )
+    return statement, schema
+
+
+def iter_record_batches(
+    db: Session, table: str, batch_size: Optional[int] = None
+) -> Tuple[Any, Iterator[Any]]:
+    """回傳 (schema, RecordBatch 迭代器)；每批對應游標的一個 partition"""
+    import pyarrow as pa
+
+    statement, schema = _table_spec(db, validate_export_table(table))
+
+    def batches() -> Iterator[Any]:
+        result = db.execute(
+            statement.execution_options(yield_per=batch_size or get_export_batch_size())
+        )
+        for rows in result.partitions():
+            yield pa.RecordBatch.from_arrays(
+                [
+                    pa.array(values, type=field.type)
+                    for values, field in zip(zip(*rows), schema)
+                ],
+                schema=schema,
+            )
+
+    return schema, batches()
+
+
+class _ChunkSink(io.RawIOBase):
+    """寫入端：收集 writer 輸出的位元組，由串流回應逐批取走"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _open_writer(sink, schema, export_format: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if export_format == FORMAT_PARQUET:
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_file(sink, schema)
+
+
+def write_table(
+    db: Session,
+    table: str,
+    sink,
+    export_format: str = FORMAT_PARQUET,
+    batch_size: Optional[int] = None,
+    on_batch=None,
+) -> int:
+    """把一個資料表寫入 sink（路徑或檔案物件），回傳列數"""
+    require_pyarrow()
+    validate_export_format(export_format)
+    schema, batches = iter_record_batches(db, table, batch_size)
+    rows = 0
+    writer = _open_writer(sink, schema, export_format)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            if on_batch is not None:
+                on_batch(batch.num_rows)
+    finally:
+        writer.close()
+    return rows
+
+
+def stream_table(
+    db: Session,
+    table: str,
+    export_format: str = FORMAT_PARQUET,
+    batch_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """逐批產生匯出檔的位元組，供 StreamingResponse 使用"""
+    require_pyarrow()
+    validate_export_format(export_format)
+    schema, batches = iter_record_batches(db, table, batch_size)
+    sink = _ChunkSink()
+    writer = _open_writer(sink, schema, export_format)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_to_directory(
+    db: Session,
+    directory,
+    export_format: str = FORMAT_PARQUET,
+    tables: Iterable[str] = EXPORT_TABLES,
+    batch_size: Optional[int] = None,
+    context: Optional[JobContext] = None,
+) -> Dict[str, Any]:
+    """把各資料表寫成目錄下的檔案；先寫暫存檔再改名，讀取端不會看到寫到一半的檔案"""
+    require_pyarrow()
+    validate_export_format(export_format)
+    tables = [validate_export_table(table) for table in tables]
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    exported: Dict[str, Any] = {}
+    written = 0
+
+    def on_batch(rows: int) -> None:
+        nonlocal written
+        written += rows
+        if context is not None:
+            context.progress(written, None, f"{table}: {written} rows")
+
+    for table in tables:
+        path = directory / export_filename(table, export_format)
+        partial = path.with_name(f".{path.name}.partial")
+        try:
+            rows = write_table(
+                db, table, str(partial), export_format, batch_size, on_batch
+            )
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        exported[table] = {"path": str(path.resolve()), "rows": rows}
+        if context is not None and context.cancelled:
+            break
+
+    logger.info(
+        "Columnar export written to %s: %s",
+        directory,
+        {table: info["rows"] for table, info in exported.items()},
+    )
+    return {
+        "format": export_format,
+        "directory": str(directory.resolve()),
+        "tables": exported,
+    }
+
+
+def export_tables(
+    db: Session, params: Dict[str, Any], context: JobContext
+) -> Dict[str, Any]:
+    """背景工作 works.export：寫到 EXPORT_DIR 下以時間命名的子目錄"""
+    export_format = params.get("format") or FORMAT_PARQUET
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return export_to_directory(
+        db,
+        get_export_dir() / stamp,
+        export_format,
+        params.get("tables") or EXPORT_TABLES,
+        context=context,
+    )
+
+
+register_job_type(
+    "works.export",
+    export_tables,
+    concurrency=1,
+    public=True,
+    params_model=ExportJobParams,
+)
+
+
+def main() -> None:
+    from ..db.database import SessionLocal
+
+    parser = argparse.ArgumentParser(
+        description="Export works, tags and work_tags as Parquet or Arrow files"
+    )
+    parser.add_argument("directory", help="output directory")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=FORMAT_PARQUET)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = export_to_directory(
+            db, args.directory, args.format, batch_size=args.batch_size
+        )
+    finally:
+        db.close()
+    for table, info in result["tables"].items():
+        print(f"{table}: {info['rows']} rows -> {info['path']}")
+
+
+if __name__ == "__main__":
+    main()
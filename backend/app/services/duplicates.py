@@ -0,0 +1,157 @@
+"""Duplicate works by normalized title.
+
+Every work stores ``title_key`` (see ``utils.title_key``); two works of the
+same type with the same key are duplicates. Creating a work checks the
+``(title_key, type)`` index with one lookup, and imports look up a whole
+batch with ``find_existing`` (one ``IN`` query per chunk), so the check is
+O(1) per item either way.
+
+There is deliberately no unique constraint: existing data may already hold
+duplicates, ``on_duplicate=allow`` can create one on purpose (remakes share
+titles), and concurrent creates can race past the check. The duplicate scan
+finds all of them: it re-keys every work (keys change when the normalization
+changes) and groups by key in the database. It runs as the ``duplicates.scan``
+background job; the report is the job's result.
+"""
+
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from ..exceptions import ValidationException
+from ..models.work import Work
+from ..utils.logger import logger
+from ..utils.title_key import title_key
+from .jobs import JobContext, register_job_type
+
+ON_DUPLICATE_ERROR = "error"
+ON_DUPLICATE_MERGE = "merge"
+ON_DUPLICATE_ALLOW = "allow"
+ON_DUPLICATE_MODES = (ON_DUPLICATE_ERROR, ON_DUPLICATE_MERGE, ON_DUPLICATE_ALLOW)
+
+# SQLite 預設最多 999 個綁定參數
+_LOOKUP_CHUNK = 500
+_REKEY_BATCH = 1000
+
+
+def validate_on_duplicate(mode: str) -> str:
+    if mode not in ON_DUPLICATE_MODES:
+        raise ValidationException(
+            f"on_duplicate must be one of: {', '.join(ON_DUPLICATE_MODES)}"
+        )
+    return mode
+
+
+def find_existing(
+    db: Session, keys: Iterable[Tuple[str, str]]
+) -> Dict[Tuple[str, str], str]:
+    """批次查詢 (title_key, type) 已存在的作品，回傳最早建立者的 ID"""
+    wanted = set(keys)
+    title_keys = sorted({key for key, _ in wanted})
+    found: Dict[Tuple[str, str], str] = {}
+    for start in range(0, len(title_keys), _LOOKUP_CHUNK):
+        rows = db.execute(
+            select(Work.title_key, Work.type, Work.id)
+            .where(Work.title_key.in_(title_keys[start : start + _LOOKUP_CHUNK]))
+            .order_by(Work.date_added, Work.id)
+        )
+        for key, work_type, work_id in rows:
+            if (key, work_type) in wanted:
+                found.setdefault((key, work_type), work_id)
+    return found
+
+
+class DuplicateService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def rekey(self, batch_size: int = _REKEY_BATCH) -> int:
+        """重新計算所有作品的 title_key，只更新有變動者，回傳更新筆數"""
+        changed = 0
+        last_id = ""
+        statement = (
+            update(Work)
+            .where(Work.id == bindparam("work_id"))
+            .values(title_key=bindparam("key"))
+            .execution_options(synchronize_session=False)
+        )
+        while True:
+            rows = self.db.execute(
+                select(Work.id, Work.title, Work.title_key)
+                .where(Work.id > last_id)
+                .order_by(Work.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            stale = [
+                {"work_id": work_id, "key": key}
+                for work_id, title, stored in rows
+                if (key := title_key(title)) != stored
+            ]
+            if stale:
+                self.db.connection().execute(statement, stale)
+                self.db.commit()
+                changed += len(stale)
+        return changed
+
+    def clusters(self) -> List[Dict[str, Any]]:
+        """找出 (title_key, type) 相同的作品群組，依數量由多到少"""
+        duplicated = (
+            select(Work.title_key, Work.type)
+            .where(Work.title_key.is_not(None))
+            .group_by(Work.title_key, Work.type)
+            .having(func.count() > 1)
+            .subquery()
+        )
+        rows = self.db.execute(
+            select(Work.title_key, Work.type, Work.id, Work.title, Work.year)
+            .join(
+                duplicated,
+                (Work.title_key == duplicated.c.title_key)
+                & (Work.type == duplicated.c.type),
+            )
+            .order_by(Work.date_added, Work.id)
+        )
+
+        members: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for key, work_type, work_id, title, year in rows:
+            members[(key, work_type)].append(
+                {"id": work_id, "title": title, "year": year}
+            )
+        return [
+            {"title_key": key, "type": work_type, "works": works}
+            for (key, work_type), works in sorted(
+                members.items(), key=lambda item: (-len(item[1]), item[0])
+            )
+        ]
+
+
+def scan_duplicates(db: Session, params: Dict[str, Any], context: JobContext):
+    """工作 duplicates.scan：重新計算正規化標題，再依鍵值分群"""
+    started = time.perf_counter()
+    service = DuplicateService(db)
+    context.progress(0, 2, "rekey", force=True)
+    rekeyed = service.rekey()
+    if context.cancelled:
+        return {"rekeyed": rekeyed, "clusters": []}
+    context.progress(1, 2, "clusters", force=True)
+    clusters = service.clusters()
+    context.progress(2, 2, force=True)
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(
+        "Duplicate scan finished in %.1f ms: %d clusters, %d works re-keyed",
+        duration_ms,
+        len(clusters),
+        rekeyed,
+    )
+    return {"rekeyed": rekeyed, "clusters": clusters, "duration_ms": duration_ms}
+
+
+register_job_type("duplicates.scan", scan_duplicates)
@@ -0,0 +1,426 @@
+"""Background metadata enrichment from AniList.
+
+Works created by hand have no AniList ID, cover, genres or episode count. The
+enrichment worker picks up works whose ``enriched_at`` is NULL, matches them
+to AniList and fills those fields in.
+
+Throughput is bounded by AniList's rate limit (``ANILIST_RATE_LIMIT``
+requests per minute), not by latency, so each request carries up to
+``ENRICHMENT_BATCH_SIZE`` lookups as aliased GraphQL fields (``m0: Page(...)
+m1: Media(...)``). Requests are spaced by a ``RateBudget`` and at most
+``ENRICHMENT_CONCURRENCY`` are in flight. 429 responses and an exhausted
+``X-RateLimit-Remaining`` pause the whole budget, not just one request. At
+the defaults (30 requests/min, 15 works per request) 5,000 works take about
+11 minutes.
+
+A work counts as matched when one of the AniList titles or synonyms has the
+same ``title_key``, or failing that, the same year. Unmatched works are still
+stamped with ``enriched_at`` so they are not searched again. Works in failed
+requests are left NULL and retried by the next run. Results are written in
+batches as one executemany ``UPDATE``. The update only fills year and total
+episodes where they are missing, so it never overwrites user edits or
+progress made while the run was in flight.
+
+A run is the ``works.enrich`` background job (see ``services.jobs``), which
+reports progress and stops sending requests once cancelled.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, Integer, and_, bindparam, case, func, select, update
+from sqlalchemy.orm import Session
+
+from ..models.work import Work
+from ..utils.logger import logger
+from ..utils.metrics import track_upstream
+from ..utils.title_key import title_key
+from .change_log import ENTITY_WORK, record_changes
+from .jobs import JobContext, register_job_type
+from .work_service import ProgressSQL
+
+# 作品類型對應的 AniList 媒體類型；其餘類型不比對
+MEDIA_TYPES = {"動畫": "ANIME", "電影": "ANIME", "漫畫": "MANGA", "小說": "MANGA"}
+
+MEDIA_FIELDS = (
+    "id title { romaji english native } synonyms episodes chapters seasonYear "
+    "startDate { year } coverImage { large } genres"
+)
+SEARCH_CANDIDATES = 3
+WRITE_BATCH = 200
+MAX_ATTEMPTS = 4
+
+
+def get_anilist_url() -> str:
+    return os.getenv("ANILIST_API_URL", "https://graphql.anilist.co")
+
+
+def get_rate_limit() -> int:
+    """每分鐘最多請求數（AniList 官方上限 90，降級期間為 30）"""
+    return max(1, int(os.getenv("ANILIST_RATE_LIMIT", "30")))
+
+
+def get_enrichment_concurrency() -> int:
+    return max(1, int(os.getenv("ENRICHMENT_CONCURRENCY", "4")))
+
+
+def get_enrichment_batch_size() -> int:
+    """每個 GraphQL 請求合併的作品數"""
+    return max(1, int(os.getenv("ENRICHMENT_BATCH_SIZE", "15")))
+
+
+class RateBudget:
+    """依每分鐘額度平均分配請求時間；pause 會讓所有請求一起暫停"""
+
+    def __init__(self, per_minute: int, clock=time.monotonic, sleep=asyncio.sleep):
+        self.interval = 60.0 / per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._next_at = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = self._clock()
+            start = max(now, self._next_at, self._paused_until)
+            if start > now:
+                await self._sleep(start - now)
+            self._next_at = start + self.interval
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+@dataclass
+class Candidate:
+    id: str
+    title: str
+    media_type: str
+    year: Optional[int]
+    anilist_id: Optional[int]
+
+
+@dataclass
+class Match:
+    work_id: str
+    anilist_id: Optional[int] = None
+    cover_image: Optional[str] = None
+    genres: Optional[List[str]] = None
+    episodes: Optional[int] = None
+    year: Optional[int] = None
+
+
+def build_query(batch: Sequence[Candidate]) -> Tuple[str, Dict[str, Any]]:
+    """把一批作品組成一個帶別名的 GraphQL 查詢"""
+    definitions, fields, variables = [], [], {}
+    for index, candidate in enumerate(batch):
+        if candidate.anilist_id:
+            definitions.append(f"$id{index}: Int")
+            variables[f"id{index}"] = candidate.anilist_id
+            fields.append(f"m{index}: Media(id: $id{index}) {{ {MEDIA_FIELDS} }}")
+        else:
+            definitions.append(f"$q{index}: String")
+            variables[f"q{index}"] = candidate.title
+            fields.append(
+                f"m{index}: Page(perPage: {SEARCH_CANDIDATES}) {{ "
+                f"media(search: $q{index}, type: {candidate.media_type}) "
+                f"{{ {MEDIA_FIELDS} }} }}"
+            )
+    return f"query ({', '.join(definitions)}) {{ {' '.join(fields)} }}", variables
+
+
+def _media_year(media: Dict[str, Any]) -> Optional[int]:
+    return media.get("seasonYear") or (media.get("startDate") or {}).get("year")
+
+
+def pick_match(
+    candidate: Candidate, media_list: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """標題（含別名）正規化後相同者優先，其次為同年份的結果"""
+    key = title_key(candidate.title)
+    for media in media_list:
+        titles = [*(media.get("title") or {}).values(), *(media.get("synonyms") or [])]
+        if any(title and title_key(title) == key for title in titles):
+            return media
+    if candidate.year:
+        for media in media_list:
+            if _media_year(media) == candidate.year:
+                return media
+    return None
+
+
+def parse_response(batch: Sequence[Candidate], data: Dict[str, Any]) -> List[Match]:
+    matches = []
+    for index, candidate in enumerate(batch):
+        result = data.get(f"m{index}")
+        if candidate.anilist_id:
+            media = result
+        else:
+            media = pick_match(candidate, (result or {}).get("media") or [])
+
+        if not media:
+            matches.append(Match(work_id=candidate.id))
+            continue
+        matches.append(
+            Match(
+                work_id=candidate.id,
+                anilist_id=media.get("id"),
+                cover_image=(media.get("coverImage") or {}).get("large"),
+                genres=media.get("genres") or [],
+                episodes=media.get("episodes") or media.get("chapters"),
+                year=_media_year(media),
+            )
+        )
+    return matches
+
+
+class EnrichmentService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def pending_count(self) -> int:
+        return self.db.scalar(
+            select(func.count()).where(
+                Work.enriched_at.is_(None), Work.type.in_(MEDIA_TYPES)
+            )
+        )
+
+    def candidates(self, limit: Optional[int] = None) -> List[Candidate]:
+        """尚未補充資料的作品（enriched_at 索引範圍掃描）"""
+        query = (
+            select(Work.id, Work.title, Work.type, Work.year, Work.anilist_id)
+            .where(Work.enriched_at.is_(None), Work.type.in_(MEDIA_TYPES))
+            .order_by(Work.id)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return [
+            Candidate(work_id, title, MEDIA_TYPES[work_type], year, anilist_id)
+            for work_id, title, work_type, year, anilist_id in self.db.execute(query)
+        ]
+
+    def apply(self, matches: Sequence[Match]) -> None:
+        """以單一 executemany UPDATE 寫入一批結果"""
+        if not matches:
+            return
+
+        progress = ProgressSQL(self.db.get_bind().dialect.name)
+        episodes = bindparam("b_episodes", type_=Integer)
+        statement = (
+            update(Work)
+            .where(Work.id == bindparam("b_id"))
+            .values(
+                anilist_id=func.coalesce(bindparam("b_anilist_id"), Work.anilist_id),
+                cover_image=func.coalesce(bindparam("b_cover"), Work.cover_image),
+                genres=func.coalesce(
+                    bindparam("b_genres", type_=JSON(none_as_null=True)), Work.genres
+                ),
+                enriched_at=bindparam("b_enriched_at"),
+                year=func.coalesce(Work.year, bindparam("b_year", type_=Integer)),
+                # 只在尚無總集數時補上，不動使用者的進度
+                progress=case(
+                    (
+                        and_(
+                            episodes.is_not(None),
+                            progress.field("total_episode").is_(None),
+                        ),
+                        progress.with_field("total_episode", episodes),
+                    ),
+                    else_=Work.progress,
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        enriched_at = datetime.now(timezone.utc)
+        self.db.connection().execute(
+            statement,
+            [
+                {
+                    "b_id": match.work_id,
+                    "b_anilist_id": match.anilist_id,
+                    "b_cover": match.cover_image,
+                    "b_genres": match.genres,
+                    "b_enriched_at": enriched_at,
+                    "b_year": match.year,
+                    "b_episodes": match.episodes,
+                }
+                for match in matches
+            ],
+        )
+        record_changes(self.db, ENTITY_WORK, [match.work_id for match in matches])
+        self.db.commit()
+
+
+@dataclass
+class EnrichmentProgress:
+    total: int = 0
+    processed: int = 0
+    matched: int = 0
+    unmatched: int = 0
+    failed: int = 0
+    requests: int = 0
+
+    def __post_init__(self):
+        self._started = time.perf_counter()
+
+    def to_dict(self, running: bool = False) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        rate = self.processed / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = self.total - self.processed - self.failed
+        return {
+            "total": self.total,
+            "processed": self.processed,
+            "matched": self.matched,
+            "unmatched": self.unmatched,
+            "failed": self.failed,
+            "requests": self.requests,
+            "works_per_minute": round(rate, 1),
+            "eta_seconds": round(remaining / rate * 60) if running and rate else None,
+        }
+
+
+class EnrichmentWorker:
+    def __init__(
+        self,
+        db: Session,
+        context: Optional[JobContext] = None,
+        budget: Optional[RateBudget] = None,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        transport=None,
+    ):
+        self.db = db
+        self.context = context
+        self.progress = EnrichmentProgress()
+        self.budget = budget or RateBudget(get_rate_limit())
+        self.concurrency = concurrency or get_enrichment_concurrency()
+        self.batch_size = batch_size or get_enrichment_batch_size()
+        self.transport = transport
+        self._pending: List[Match] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self.context is not None and self.context.cancelled
+
+    async def run(self, limit: Optional[int] = None) -> EnrichmentProgress:
+        import httpx
+
+        candidates = EnrichmentService(self.db).candidates(limit)
+        self.progress.total = len(candidates)
+        batches = [
+            candidates[start : start + self.batch_size]
+            for start in range(0, len(candidates), self.batch_size)
+        ]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(transport=self.transport, timeout=30.0) as client:
+
+            async def fetch(batch: List[Candidate]) -> None:
+                async with semaphore:
+                    if self.cancelled:
+                        return
+                    matches = await self._fetch(client, batch)
+                if matches is None:
+                    self.progress.failed += len(batch)
+                else:
+                    self._record(matches)
+                    if len(self._pending) >= WRITE_BATCH:
+                        self._flush()
+                self._report()
+
+            await asyncio.gather(*(fetch(batch) for batch in batches))
+        self._flush()
+
+        logger.info(
+            "AniList enrichment %s: %d/%d works, %d matched, %d failed, %d requests",
+            "cancelled" if self.cancelled else "finished",
+            self.progress.processed,
+            self.progress.total,
+            self.progress.matched,
+            self.progress.failed,
+            self.progress.requests,
+        )
+        return self.progress
+
+    async def _fetch(self, client, batch: List[Candidate]) -> Optional[List[Match]]:
+        """送出一批查詢；429、5xx 與連線錯誤會退避重試"""
+        import httpx
+
+        query, variables = build_query(batch)
+        for attempt in range(MAX_ATTEMPTS):
+            await self.budget.acquire()
+            self.progress.requests += 1
+            try:
+                with track_upstream("anilist"):
+                    response = await client.post(
+                        get_anilist_url(),
+                        json={"query": query, "variables": variables},
+                    )
+            except httpx.HTTPError as e:
+                logger.warning("AniList request failed: %s", e)
+                await asyncio.sleep(2**attempt)
+                continue
+
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                self.budget.pause(_seconds_until_reset(response.headers))
+            if response.status_code == 429:
+                self.budget.pause(float(response.headers.get("Retry-After", 60)))
+                continue
+            if response.status_code >= 500:
+                await asyncio.sleep(2**attempt)
+                continue
+
+            # 以 ID 查詢時任一筆不存在會回 404，但其餘結果仍在 data 中
+            data = response.json().get("data")
+            if data is None:
+                logger.warning(
+                    "AniList rejected query (%s): %s",
+                    response.status_code,
+                    response.text[:200],
+                )
+                return None
+            return parse_response(batch, data)
+        return None
+
+    def _record(self, matches: List[Match]) -> None:
+        self._pending.extend(matches)
+        for match in matches:
+            self.progress.processed += 1
+            if match.anilist_id:
+                self.progress.matched += 1
+            else:
+                self.progress.unmatched += 1
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        EnrichmentService(self.db).apply(pending)
+
+    def _report(self) -> None:
+        if self.context is not None:
+            self.context.progress(
+                self.progress.processed + self.progress.failed,
+                self.progress.total,
+                f"{self.progress.matched} matched",
+            )
+
+
+def _seconds_until_reset(headers) -> float:
+    try:
+        return max(1.0, float(headers["X-RateLimit-Reset"]) - time.time())
+    except (KeyError, ValueError):
+        return 60.0
+
+
+async def enrich_works(db: Session, params: Dict[str, Any], context: JobContext):
+    """工作 works.enrich：補充尚未處理的作品（params.limit 限制本次數量）"""
+    worker = EnrichmentWorker(db, context)
+    progress = await worker.run(params.get("limit"))
+    return progress.to_dict()
+
+
+register_job_type("works.enrich", enrich_works)
@@ -0,0 +1,397 @@
+"""Local cache for AniList cover images.
+
+``/images/cover/{anilist_id}`` downloads a cover once and serves it from
+disk afterwards. Layout under ``COVER_CACHE_DIR``::
+
+    refs/<anilist_id>                 "<sha256> <ext>" of the current original
+    originals/<sha[:2]>/<sha>.<ext>   downloaded bytes, content-addressed
+    thumbs/<sha[:2]>/<sha>-<size>.webp
+
+Content addressing means two IDs that share an image share the files, and a
+cover that changes upstream gets a new hash (and ETag) rather than stale
+thumbnails. Thumbnails at fixed widths (``SIZES``) are WebP when Pillow is
+installed; without it every size falls back to the original.
+
+Files are written atomically (temp file + rename). Every hit bumps the
+file's mtime, so mtime order is LRU order. When the cache grows past
+``COVER_CACHE_MAX_MB``, the oldest originals and thumbnails are removed
+until it is back under 90 % of the limit. A ref whose original was evicted
+simply triggers a new download. Concurrent requests for the same missing
+file share one download or encode.
+
+Files are served with long-lived cache headers, either by ``FileResponse``
+or, when ``COVER_CACHE_ACCEL_PREFIX`` is set, by nginx via
+``X-Accel-Redirect`` so the bytes go out through ``sendfile``.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..exceptions import ValidationException
+from ..models.work import Work
+from ..utils.logger import logger
+from ..utils.metrics import track_upstream
+
+ORIGINAL = "original"
+# 縮圖寬度（px）；作品格線約 160 CSS px，medium 供 2x 螢幕使用
+SIZES = {"small": 160, "medium": 320}
+WEBP_QUALITY = 80
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+CACHE_MAX_AGE = 30 * 24 * 3600
+EVICT_TARGET = 0.9
+
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+_MEDIA_TYPES = {extension: media for media, extension in _EXTENSIONS.items()}
+
+
+def get_cover_cache_dir() -> Path:
+    return Path(os.getenv("COVER_CACHE_DIR", "./cache/covers"))
+
+
+def get_cover_cache_max_bytes() -> int:
+    return int(float(os.getenv("COVER_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+
+def get_accel_prefix() -> str:
+    """nginx internal location 的路徑前綴（例如 /_covers/）；留空則由應用程式傳送檔案"""
+    return os.getenv("COVER_CACHE_ACCEL_PREFIX", "")
+
+
+def get_allowed_hosts() -> List[str]:
+    value = os.getenv("COVER_ALLOWED_HOSTS", "anilist.co,anili.st")
+    return [host.strip().lower() for host in value.split(",") if host.strip()]
+
+
+def thumbnails_enabled() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def host_allowed(url: str) -> bool:
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    return parsed.scheme in ("http", "https") and any(
+        host == allowed or host.endswith(f".{allowed}")
+        for allowed in get_allowed_hosts()
+    )
+
+
+def make_thumbnail(data: bytes, width: int) -> bytes:
+    """縮成指定寬度（不放大）並編碼為 WebP"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG 可直接以較低解析度解碼，大幅減少縮圖時間
+        image.draft("RGB", (width, width * 4))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        image.thumbnail((width, width * 4))
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+        return buffer.getvalue()
+
+
+@dataclass
+class CachedImage:
+    path: Path
+    relative_path: str
+    media_type: str
+    etag: str
+
+
+class CoverCache:
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        transport=None,
+        thumbnails: Optional[bool] = None,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.transport = transport
+        self.thumbnails = thumbnails_enabled() if thumbnails is None else thumbnails
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._size_lock = threading.Lock()
+        self._total: Optional[int] = None
+
+    # 查詢 ---------------------------------------------------------------
+
+    async def get(
+        self,
+        cover_id: int,
+        size: str,
+        resolve_url: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[CachedImage]:
+        """取得封面（必要時下載原圖並產生縮圖）；找不到來源時回傳 None"""
+        if size != ORIGINAL and size not in SIZES:
+            raise ValidationException(
+                f"Invalid size: {size}. Must be one of: "
+                f"{', '.join([*SIZES, ORIGINAL])}"
+            )
+
+        original = self._read_ref(cover_id)
+        if original is None:
+            original = await self._once(
+                f"download:{cover_id}", lambda: self._download(cover_id, resolve_url)
+            )
+            if original is None:
+                return None
+        digest, extension = original
+
+        if size == ORIGINAL or not self.thumbnails:
+            return self._image(self._original_path(digest, extension))
+
+        thumb = self._thumb_path(digest, size)
+        if not self._touch(thumb):
+            await self._once(
+                f"thumb:{digest}:{size}",
+                lambda: self._make_thumb(digest, extension, size),
+            )
+        return self._image(thumb)
+
+    async def _once(self, key: str, factory: Callable[[], Awaitable]):
+        """同一個 key 同時只執行一次，其餘請求等待同一結果"""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 沒有其他等待者時避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    # 下載與縮圖 ---------------------------------------------------------
+
+    async def _download(
+        self, cover_id: int, resolve_url: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[Tuple[str, str]]:
+        import httpx
+
+        url = await resolve_url()
+        if not url:
+            return None
+        if not host_allowed(url):
+            logger.warning("Refusing to fetch cover from %s", url)
+            return None
+
+        # 不跟隨重新導向，避免繞過來源主機限制
+        async with httpx.AsyncClient(transport=self.transport, timeout=15.0) as client:
+            with track_upstream("anilist-cdn"):
+                response = await client.get(url)
+        media_type = response.headers.get("content-type", "").split(";")[0].strip()
+        extension = _EXTENSIONS.get(media_type)
+        if response.status_code != 200 or extension is None:
+            logger.warning(
+                "Cover download failed (%s, %s): %s",
+                response.status_code,
+                media_type,
+                url,
+            )
+            return None
+        data = response.content
+        if len(data) > MAX_IMAGE_BYTES:
+            logger.warning("Cover too large (%d bytes): %s", len(data), url)
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        await run_in_threadpool(self._store_original, cover_id, digest, extension, data)
+        return digest, extension
+
+    def _store_original(
+        self, cover_id: int, digest: str, extension: str, data: bytes
+    ) -> None:
+        path = self._original_path(digest, extension)
+        if not self._touch(path):
+            self._write(path, data)
+        self._write_ref(cover_id, digest, extension)
+
+    async def _make_thumb(self, digest: str, extension: str, size: str) -> None:
+        def build() -> None:
+            data = self._original_path(digest, extension).read_bytes()
+            self._write(
+                self._thumb_path(digest, size), make_thumbnail(data, SIZES[size])
+            )
+
+        await run_in_threadpool(build)
+
+    # 檔案 ---------------------------------------------------------------
+
+    def _original_path(self, digest: str, extension: str) -> Path:
+        return self.directory / "originals" / digest[:2] / f"{digest}.{extension}"
+
+    def _thumb_path(self, digest: str, size: str) -> Path:
+        return self.directory / "thumbs" / digest[:2] / f"{digest}-{size}.webp"
+
+    def _ref_path(self, cover_id: int) -> Path:
+        return self.directory / "refs" / str(cover_id)
+
+    def _read_ref(self, cover_id: int) -> Optional[Tuple[str, str]]:
+        """取得原圖的雜湊與副檔名；原圖已被淘汰時視為沒有"""
+        try:
+            digest, extension = self._ref_path(cover_id).read_text().split()
+        except (OSError, ValueError):
+            return None
+        if not self._touch(self._original_path(digest, extension)):
+            return None
+        return digest, extension
+
+    def _write_ref(self, cover_id: int, digest: str, extension: str) -> None:
+        self._write(
+            self._ref_path(cover_id), f"{digest} {extension}".encode(), account=False
+        )
+
+    def _image(self, path: Path) -> CachedImage:
+        relative = path.relative_to(self.directory).as_posix()
+        return CachedImage(
+            path=path,
+            relative_path=relative,
+            media_type=_MEDIA_TYPES[path.suffix[1:]],
+            etag=f'"{path.stem}"',
+        )
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """更新 mtime（LRU 順序）；檔案不存在時回傳 False"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _write(self, path: Path, data: bytes, account: bool = True) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+        if account:
+            self._account(len(data))
+
+    # 容量控制 -----------------------------------------------------------
+
+    def _cached_files(self) -> Iterator[os.DirEntry]:
+        for kind in ("originals", "thumbs"):
+            root = self.directory / kind
+            if not root.is_dir():
+                continue
+            for shard in os.scandir(root):
+                if shard.is_dir():
+                    yield from (
+                        entry
+                        for entry in os.scandir(shard.path)
+                        if not entry.name.startswith(".")
+                    )
+
+    def size(self) -> int:
+        with self._size_lock:
+            if self._total is None:
+                self._total = sum(
+                    entry.stat().st_size for entry in self._cached_files()
+                )
+            return self._total
+
+    def _account(self, added: int) -> None:
+        total = self.size() + added
+        with self._size_lock:
+            self._total = total
+        if total > self.max_bytes:
+            self.evict()
+
+    def evict(self, target: Optional[int] = None) -> int:
+        """依 mtime 由舊到新刪除，直到低於目標大小；回傳刪除的檔案數"""
+        target = int(self.max_bytes * EVICT_TARGET) if target is None else target
+        started = time.perf_counter()
+        with self._size_lock:
+            files = []
+            for entry in self._cached_files():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+
+            removed = 0
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._total = total
+
+        if removed:
+            logger.info(
+                "Cover cache evicted %d files in %.1f ms (%d bytes left)",
+                removed,
+                (time.perf_counter() - started) * 1000,
+                total,
+            )
+        return removed
+
+
+async def resolve_cover_url(db: Session, cover_id: int) -> Optional[str]:
+    """封面來源：已補充資料的作品，否則向 AniList 查詢"""
+    url = db.scalar(
+        select(Work.cover_image)
+        .where(Work.anilist_id == cover_id, Work.cover_image.is_not(None))
+        .limit(1)
+    )
+    if url:
+        return url
+
+    from .search_service import SearchService
+
+    anime = await SearchService(db).get_anime_by_id(cover_id)
+    return anime.get("cover_image")
+
+
+_cache: Optional[CoverCache] = None
+
+
+def get_cover_cache() -> CoverCache:
+    global _cache
+    if _cache is None:
+        _cache = CoverCache(get_cover_cache_dir(), get_cover_cache_max_bytes())
+    return _cache
+
+
+def set_cover_cache(cache: Optional[CoverCache]) -> None:
+    global _cache
+    _cache = cache
@@ -0,0 +1,693 @@
+"""Streaming import of MyAnimeList and AniList list exports.
+
+Export files hold thousands of entries, so nothing here loads a whole file.
+MyAnimeList XML (optionally gzipped, as MAL serves it) is read with
+``ElementTree.iterparse`` and every ``<anime>``/``<manga>`` element is
+cleared as soon as it has been mapped. AniList JSON, either the GraphQL
+``MediaListCollection`` response or a bare list of entries, is scanned in
+64 KiB chunks and each object of an ``"entries"`` array is decoded on its own
+with ``JSONDecoder.raw_decode``. Memory therefore stays flat in the file size;
+only the current batch and at most ``MAX_REPORTED_ERRORS`` error rows are
+kept.
+
+Rows are validated with ``WorkCreate`` and written ``IMPORT_BATCH_SIZE`` at a
+time, one transaction per batch. Duplicates are resolved by title key with one
+``find_existing`` lookup per batch, following ``on_duplicate`` like
+``POST /works/`` does, except that a duplicate skips its row instead of
+failing the import. Tags are looked up by name and created when missing.
+AniList entries also carry the AniList ID, cover and genres, so they are
+stored as already enriched.
+
+A failed batch is rolled back and reported row by row. The batches before it
+stay committed. A parse error stops the import at that point.
+
+As a ``works.import`` job, every batch also commits a checkpoint (the last row
+number and the report so far) with ``context.save_checkpoint``. When a
+shutdown interrupts the job, the upload is kept and the re-run skips the rows
+up to the checkpoint and continues the report, so committed batches are not
+imported twice.
+"""
+
+import codecs
+import gzip
+import json
+import os
+import re
+import shutil
+import uuid
+import xml.etree.ElementTree as ElementTree
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..exceptions import ValidationException
+from ..models.tag import Tag, WorkTag
+from ..models.work import Work
+from ..schemas.tag import TagResponse
+from ..schemas.work import WorkCreate
+from ..utils.logger import logger
+from ..utils.title_key import title_key
+from .change_log import ENTITY_TAG, ENTITY_WORK, record_change, record_changes
+from .duplicates import (
+    ON_DUPLICATE_ALLOW,
+    ON_DUPLICATE_ERROR,
+    find_existing,
+    validate_on_duplicate,
+)
+from .jobs import JobContext, register_job_type
+from .tag_cache import get_tag_registry
+from .tag_service import adjust_tag_usage
+
+FORMAT_MAL = "mal"
+FORMAT_ANILIST = "anilist"
+IMPORT_FORMATS = (FORMAT_MAL, FORMAT_ANILIST)
+
+MAX_REPORTED_ERRORS = 1000
+_READ_SIZE = 64 * 1024
+_MERGE_FIELDS = ("year", "progress", "rating", "review", "note", "source")
+
+# MAL 狀態（新版匯出為文字，舊版為數字）
+MAL_STATUSES = {
+    "watching": "進行中",
+    "reading": "進行中",
+    "completed": "已完結",
+    "on-hold": "暫停",
+    "dropped": "放棄",
+    "plan to watch": "暫停",
+    "plan to read": "暫停",
+    "1": "進行中",
+    "2": "已完結",
+    "3": "暫停",
+    "4": "放棄",
+    "6": "暫停",
+}
+MAL_NOVEL_TYPES = {"novel", "light novel"}
+
+# 尚未開始（PLANNING）沒有對應狀態，視為暫停
+ANILIST_STATUSES = {
+    "CURRENT": "進行中",
+    "REPEATING": "進行中",
+    "COMPLETED": "已完結",
+    "PAUSED": "暫停",
+    "PLANNING": "暫停",
+    "DROPPED": "放棄",
+}
+
+
+def get_import_batch_size() -> int:
+    return max(1, int(os.getenv("IMPORT_BATCH_SIZE", "500")))
+
+
+def validate_import_format(import_format: Optional[str]) -> Optional[str]:
+    if import_format is not None and import_format not in IMPORT_FORMATS:
+        raise ValidationException(
+            f"Invalid import format '{import_format}'. "
+            f"Must be one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    return import_format
+
+
+@dataclass
+class ImportRow:
+    row: int  # 檔案中的第幾筆（從 1 開始）
+    title: Optional[str]
+    work: Optional[WorkCreate] = None
+    tags: List[str] = field(default_factory=list)
+    # AniList 匯出已有的資料，寫入後不需再補充
+    anilist: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    created: int = 0
+    merged: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    errors_truncated: bool = False
+    completed: bool = False
+
+    def add_error(self, row: Optional[int], title: Optional[str], error: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "title": title, "error": error})
+        else:
+            self.errors_truncated = True
+
+    def tally(
+        self, created: int, merged: int, skipped: List[Tuple[ImportRow, str]]
+    ) -> "ImportReport":
+        """加上一批的結果，回傳新的報告（原報告不變）"""
+        report = replace(self, errors=list(self.errors))
+        report.created += created
+        report.merged += merged
+        report.skipped += len(skipped)
+        for row, error in skipped:
+            report.add_error(row.row, row.title, error)
+        return report
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "created": self.created,
+            "merged": self.merged,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "completed": self.completed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+# 讀取 --------------------------------------------------------------------
+
+
+def open_export(stream: IO[bytes]) -> IO[bytes]:
+    """gzip 壓縮的匯出檔（MAL 下載的 .xml.gz）直接解壓讀取"""
+    peek = _peek(stream, 2)
+    if peek == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+
+def detect_format(stream: IO[bytes]) -> str:
+    """依第一個非空白字元判斷：< 為 MAL XML，{ 或 [ 為 AniList JSON"""
+    head = _peek(stream, 512).lstrip(codecs.BOM_UTF8).lstrip()
+    if head.startswith(b"<"):
+        return FORMAT_MAL
+    if head[:1] in (b"{", b"["):
+        return FORMAT_ANILIST
+    raise ValidationException(
+        "Unrecognized export file: expected MAL XML or AniList JSON"
+    )
+
+
+def _peek(stream: IO[bytes], size: int) -> bytes:
+    position = stream.tell()
+    head = stream.read(size)
+    stream.seek(position)
+    return head
+
+
+def iter_mal_entries(stream: IO[bytes]) -> Iterator[Dict[str, str]]:
+    """逐筆讀取 <anime>/<manga>，讀完即清除，記憶體不隨檔案變大"""
+    events = ElementTree.iterparse(stream, events=("start", "end"))
+    root = None
+    for event, element in events:
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag in ("anime", "manga"):
+            entry = {child.tag: (child.text or "").strip() for child in element}
+            entry["kind"] = element.tag
+            yield entry
+            root.clear()
+
+
+def iter_json_entries(
+    stream: IO[bytes], key: str = "entries", read_size: int = _READ_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """逐筆解析 JSON 中所有 key 陣列的元素；最外層為陣列時直接逐筆解析"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    whitespace = re.compile(r"[\s,]*")
+
+    buffer, position, eof = "", 0, False
+    in_array = first = True
+
+    def fill() -> None:
+        nonlocal buffer, position, eof
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+        position = 0
+
+    fill()
+    while True:
+        if first:
+            # 最外層是陣列（只有 entries 的匯出）或物件（GraphQL 回應）
+            position = whitespace.match(buffer, position).end()
+            if position >= len(buffer) and not eof:
+                fill()
+                continue
+            in_array = buffer[position : position + 1] == "["
+            position += 1 if in_array else 0
+            first = False
+
+        if not in_array:
+            match = marker.search(buffer, position)
+            if match:
+                position, in_array = match.end(), True
+                continue
+            if eof:
+                return
+            # 保留結尾，避免標記被切在兩個區塊之間
+            position = max(position, len(buffer) - len(key) - 16)
+            fill()
+            continue
+
+        position = whitespace.match(buffer, position).end()
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON input")
+            fill()
+            continue
+        if buffer[position] == "]":
+            position += 1
+            in_array = False
+            continue
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if not isinstance(item, dict):
+            continue
+        if isinstance(item.get(key), list):
+            # 最外層為清單陣列時，逐一展開各清單
+            yield from item[key]
+        else:
+            yield item
+
+
+# 對應 --------------------------------------------------------------------
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def _progress(current: Any, total: Any) -> Optional[Dict[str, int]]:
+    progress = {}
+    if _int(current):
+        progress["episode"] = _int(current)
+    if _int(total):
+        progress["total_episode"] = _int(total)
+    return progress or None
+
+
+def _build_row(
+    row: int, fields: Dict[str, Any], tags: Iterable[str], **anilist
+) -> ImportRow:
+    title = fields.get("title")
+    try:
+        work = WorkCreate(**fields)
+    except ValidationError as e:
+        message = "; ".join(
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+            for error in e.errors()
+        )
+        return ImportRow(row, title, error=message)
+    names = list(dict.fromkeys(tag.strip()[:50] for tag in tags if tag.strip()))
+    return ImportRow(row, work.title, work, names, anilist)
+
+
+def map_mal_entry(row: int, entry: Dict[str, str]) -> ImportRow:
+    if entry["kind"] == "anime":
+        title = entry.get("series_title")
+        work_type = "電影" if entry.get("series_type") == "Movie" else "動畫"
+        progress = _progress(
+            entry.get("my_watched_episodes"), entry.get("series_episodes")
+        )
+    else:
+        title = entry.get("manga_title") or entry.get("series_title")
+        manga_type = (entry.get("series_type") or "").lower()
+        work_type = "小說" if manga_type in MAL_NOVEL_TYPES else "漫畫"
+        progress = _progress(entry.get("my_read_chapters"), entry.get("manga_chapters"))
+
+    status = entry.get("my_status", "")
+    fields = {
+        "title": title,
+        "type": work_type,
+        "status": MAL_STATUSES.get(status.lower(), status),
+        "progress": progress,
+        "rating": _int(entry.get("my_score")),
+        "note": (entry.get("my_comments") or "")[:1000] or None,
+    }
+    return _build_row(row, fields, (entry.get("my_tags") or "").split(","))
+
+
+def map_anilist_entry(row: int, entry: Dict[str, Any]) -> ImportRow:
+    media = entry.get("media") or {}
+    titles = media.get("title") or {}
+    title = next(
+        (
+            titles.get(name)
+            for name in ("userPreferred", "romaji", "english", "native")
+            if titles.get(name)
+        ),
+        None,
+    )
+    if media.get("type") == "MANGA":
+        work_type = "小說" if media.get("format") == "NOVEL" else "漫畫"
+        total = media.get("chapters")
+    else:
+        work_type = "電影" if media.get("format") == "MOVIE" else "動畫"
+        total = media.get("episodes")
+
+    # 分數依使用者設定為 10 分或 100 分制
+    score = entry.get("score") or None
+    if score is not None and score > 10:
+        score = round(score / 10, 1)
+
+    status = entry.get("status") or ""
+    fields = {
+        "title": title,
+        "type": work_type,
+        "status": ANILIST_STATUSES.get(status, status),
+        "year": (media.get("startDate") or {}).get("year") or media.get("seasonYear"),
+        "progress": _progress(entry.get("progress"), total),
+        "rating": score,
+        "note": (entry.get("notes") or "")[:1000] or None,
+    }
+
+    # 自訂清單：匯出為 {名稱: 是否勾選}，GraphQL 為 [{name, enabled}]
+    custom_lists = entry.get("customLists") or {}
+    if isinstance(custom_lists, list):
+        tags = [item["name"] for item in custom_lists if item.get("enabled")]
+    else:
+        tags = [name for name, enabled in custom_lists.items() if enabled]
+
+    anilist = {}
+    if media.get("id"):
+        anilist = {
+            "anilist_id": media["id"],
+            "cover_image": (media.get("coverImage") or {}).get("large"),
+            "genres": media.get("genres"),
+            "enriched_at": datetime.now(timezone.utc),
+        }
+    return _build_row(row, fields, tags, **anilist)
+
+
+def read_export(
+    stream: IO[bytes], import_format: Optional[str] = None
+) -> Iterator[ImportRow]:
+    """依格式逐筆產生對應後的列"""
+    stream = open_export(stream)
+    import_format = validate_import_format(import_format) or detect_format(stream)
+    if import_format == FORMAT_MAL:
+        entries, mapper = iter_mal_entries(stream), map_mal_entry
+    else:
+        entries, mapper = iter_json_entries(stream), map_anilist_entry
+    for row, entry in enumerate(entries, start=1):
+        yield mapper(row, entry)
+
+
+# 寫入 --------------------------------------------------------------------
+
+
+class WorkImporter:
+    def __init__(
+        self,
+        db: Session,
+        on_duplicate: str = ON_DUPLICATE_ERROR,
+        batch_size: Optional[int] = None,
+        context: Optional[JobContext] = None,
+    ):
+        self.db = db
+        self.on_duplicate = validate_on_duplicate(on_duplicate)
+        self.batch_size = batch_size or get_import_batch_size()
+        self.context = context
+        self.registry = get_tag_registry(db)
+        self.report = ImportReport()
+        self._created_tags: List[TagResponse] = []
+        # 續跑時從上次提交的批次之後開始，報告也接續
+        self._resume_after = 0
+        checkpoint = context.checkpoint if context is not None else None
+        if checkpoint:
+            self._resume_after = checkpoint["row"]
+            self.report = ImportReport(**checkpoint["report"])
+
+    def import_file(
+        self, stream: IO[bytes], import_format: Optional[str] = None
+    ) -> ImportReport:
+        """匯入整個檔案；解析錯誤時停在該處，先前的批次保留"""
+        try:
+            self.run(read_export(stream, import_format))
+        except (ElementTree.ParseError, ValueError, EOFError, OSError) as e:
+            self.report.add_error(None, None, f"Stopped reading the file: {e}")
+        return self.report
+
+    def run(self, rows: Iterable[ImportRow]) -> ImportReport:
+        batch: List[ImportRow] = []
+        for row in rows:
+            if row.row <= self._resume_after:
+                continue
+            self.report.total += 1
+            if row.error is not None:
+                self.report.failed += 1
+                self.report.add_error(row.row, row.title, row.error)
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+                if self.context is not None and self.context.cancelled:
+                    return self.report
+        if batch:
+            self._write_batch(batch)
+        self.report.completed = True
+        logger.info(
+            "Import finished: %d rows, %d created, %d merged, %d skipped, %d failed",
+            self.report.total,
+            self.report.created,
+            self.report.merged,
+            self.report.skipped,
+            self.report.failed,
+        )
+        return self.report
+
+    def _write_batch(self, batch: List[ImportRow]) -> None:
+        try:
+            report = self.report.tally(*self._apply(batch))
+            if self.context is not None:
+                self.context.save_checkpoint(
+                    self.db, {"row": batch[-1].row, "report": report.to_dict()}
+                )
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.warning("Import batch failed: %s", e)
+            self.report.failed += len(batch)
+            for row in batch:
+                self.report.add_error(row.row, row.title, f"Database error: {e}")
+            return
+        finally:
+            created_tags, self._created_tags = self._created_tags, []
+
+        # 標籤在交易提交後才放入快取
+        for tag in created_tags:
+            self.registry.put(tag)
+
+        self.report = report
+        if self.context is not None:
+            self.context.progress(
+                self.report.total, None, f"{self.report.created} created"
+            )
+
+    def _apply(
+        self, batch: List[ImportRow]
+    ) -> Tuple[int, int, List[Tuple[ImportRow, str]]]:
+        tag_ids = self._tag_ids({name for row in batch for name in row.tags})
+        keys = [(title_key(row.work.title), row.work.type) for row in batch]
+        existing = (
+            {}
+            if self.on_duplicate == ON_DUPLICATE_ALLOW
+            else find_existing(self.db, set(keys))
+        )
+
+        works: List[Work] = []
+        pending: Dict[Tuple[str, str], Work] = {}
+        links: Dict[str, List[int]] = {}
+        merges: Dict[str, List[ImportRow]] = {}
+        skipped: List[Tuple[ImportRow, str]] = []
+        merged = 0
+        now = datetime.now(timezone.utc)
+        for row, key in zip(batch, keys):
+            ids = list(dict.fromkeys(tag_ids[name] for name in row.tags))
+            if self.on_duplicate == ON_DUPLICATE_ALLOW or (
+                key not in existing and key not in pending
+            ):
+                work = _new_work(row, key[0], now)
+                works.append(work)
+                pending[key] = work
+                links[work.id] = ids
+            elif self.on_duplicate == ON_DUPLICATE_ERROR:
+                duplicate_of = existing.get(key) or pending[key].title
+                skipped.append((row, f"Duplicate of '{duplicate_of}'"))
+            elif key in existing:
+                merges.setdefault(existing[key], []).append(row)
+            else:
+                # 同一批次中重複的列併入先出現的那一筆
+                work = pending[key]
+                _fill_missing(work, row)
+                links[work.id].extend(i for i in ids if i not in links[work.id])
+                merged += 1
+
+        self.db.add_all(works)
+        self.db.add_all(
+            WorkTag(work_id=work_id, tag_id=tag_id)
+            for work_id, ids in links.items()
+            for tag_id in ids
+        )
+        record_changes(self.db, ENTITY_WORK, [work.id for work in works])
+        usage = Counter(tag_id for ids in links.values() for tag_id in ids)
+
+        if merges:
+            merged += self._merge(merges, tag_ids, usage)
+        for count, ids in _group_by_count(usage).items():
+            adjust_tag_usage(self.db, ids, count)
+        self.db.flush()
+        return len(works), merged, skipped
+
+    def _merge(
+        self,
+        merges: Dict[str, List[ImportRow]],
+        tag_ids: Dict[str, int],
+        usage: Counter,
+    ) -> int:
+        """併入既有作品：只補空白欄位與缺少的標籤（與 create_work 的 merge 相同）"""
+        works = self.db.scalars(select(Work).where(Work.id.in_(merges))).all()
+        linked: Dict[str, set] = {work_id: set() for work_id in merges}
+        for work_id, tag_id in self.db.execute(
+            select(WorkTag.work_id, WorkTag.tag_id).where(WorkTag.work_id.in_(merges))
+        ):
+            linked[work_id].add(tag_id)
+
+        changed = []
+        for work in works:
+            added = []
+            for row in merges[work.id]:
+                _fill_missing(work, row)
+                for name in row.tags:
+                    tag_id = tag_ids[name]
+                    if tag_id not in linked[work.id]:
+                        linked[work.id].add(tag_id)
+                        added.append(tag_id)
+            self.db.add_all(WorkTag(work_id=work.id, tag_id=tag_id) for tag_id in added)
+            usage.update(added)
+            if added or self.db.is_modified(work):
+                changed.append(work.id)
+        record_changes(self.db, ENTITY_WORK, changed)
+        return sum(len(rows) for rows in merges.values())
+
+    def _tag_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """依名稱取得標籤 ID，不存在的標籤在目前交易中建立"""
+        ids = {}
+        for name in names:
+            tag_id = self.registry.id_for_name(self.db, name)
+            if tag_id is None:
+                tag_id = self._create_tag(name)
+            ids[name] = tag_id
+        return ids
+
+    def _create_tag(self, name: str) -> int:
+        tag = Tag(name=name)
+        self.db.add(tag)
+        self.db.flush()
+        record_change(self.db, ENTITY_TAG, tag.id)
+        self._created_tags.append(
+            TagResponse(id=tag.id, name=tag.name, color=tag.color)
+        )
+        return tag.id
+
+
+def _new_work(row: ImportRow, key: str, now: datetime) -> Work:
+    # 明確給定 date_added 與 date_updated，eager_defaults 就不必在 flush 後逐列 SELECT
+    data = row.work
+    return Work(
+        id=str(uuid.uuid4()),
+        date_added=now,
+        date_updated=None,
+        title=data.title,
+        title_key=key,
+        type=data.type,
+        status=data.status,
+        year=data.year,
+        progress=data.progress,
+        rating=data.rating,
+        review=data.review,
+        note=data.note,
+        source=data.source,
+        reminder_enabled=False,
+        **row.anilist,
+    )
+
+
+def _fill_missing(work: Work, row: ImportRow) -> None:
+    for name in _MERGE_FIELDS:
+        value = getattr(row.work, name)
+        if value is not None and getattr(work, name) is None:
+            setattr(work, name, value)
+    for name, value in row.anilist.items():
+        if value is not None and getattr(work, name) is None:
+            setattr(work, name, value)
+
+
+def _group_by_count(usage: Counter) -> Dict[int, List[int]]:
+    groups: Dict[int, List[int]] = {}
+    for tag_id, count in usage.items():
+        groups.setdefault(count, []).append(tag_id)
+    return groups
+
+
+def import_works(db: Session, params: Dict[str, Any], context: JobContext):
+    """工作 works.import：匯入上傳時暫存的檔案，結束後刪除（關閉服務中斷時保留以便重跑）"""
+    path = resolve_upload(params.get("upload_id"))
+    importer = WorkImporter(
+        db, params.get("on_duplicate", ON_DUPLICATE_ERROR), context=context
+    )
+    try:
+        with open(path, "rb") as stream:
+            report = importer.import_file(stream, params.get("format"))
+    finally:
+        if not context.resumable:
+            path.unlink(missing_ok=True)
+    return report.to_dict()
+
+
+def get_import_upload_dir() -> Path:
+    return Path(os.getenv("IMPORT_UPLOAD_DIR", "./uploads/imports"))
+
+
+_UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def save_upload(stream: IO[bytes]) -> str:
+    """背景匯入時先把上傳檔存到磁碟，服務重新啟動後工作仍可讀取；回傳上傳 ID"""
+    directory = get_import_upload_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    with open(directory / f"{upload_id}.upload", "wb") as target:
+        shutil.copyfileobj(stream, target, _READ_SIZE)
+    return upload_id
+
+
+def resolve_upload(upload_id: Any) -> Path:
+    """上傳 ID 對應的暫存檔；工作參數只接受 ID，不接受任意路徑"""
+    if not isinstance(upload_id, str) or not _UPLOAD_ID.fullmatch(upload_id):
+        raise ValidationException("Invalid upload ID")
+    directory = get_import_upload_dir().resolve()
+    path = (directory / f"{upload_id}.upload").resolve()
+    if path.parent != directory:
+        raise ValidationException("Invalid upload ID")
+    return path
+
+
+register_job_type("works.import", import_works, concurrency=1)
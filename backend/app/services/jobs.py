@@ -0,0 +1,728 @@
+"""In-process background jobs.
+
+Heavy operations (restoring an uploaded backup, the duplicate scan, AniList
+enrichment, recomputing statistics) run as jobs instead of inside the request:
+``POST /jobs`` inserts a row into ``jobs`` and returns its ID at once, and the
+client polls ``GET /jobs/{id}`` for progress and the result.
+
+Jobs run on a thread pool of ``JOB_WORKERS`` threads inside the API process.
+Each job type has its own concurrency limit (``register_job_type``, overridden
+with ``JOB_CONCURRENCY=backup.upload=2,works.enrich=1``). Jobs over the limit
+wait in a per-type queue, so a burst of uploads cannot starve a scan. A worker
+claims its job with a conditional ``UPDATE ... WHERE status = 'queued'``, so a
+job runs once even when several processes try to pick it up.
+
+State lives in the table, so it survives restarts. Running jobs refresh
+``heartbeat_at`` every ``JOB_HEARTBEAT_SECONDS``. On startup ``recover``
+requeues running jobs whose heartbeat is older than ``JOB_STALE_SECONDS``
+(their process died; after ``JOB_MAX_ATTEMPTS`` they fail instead), deletes
+finished jobs older than ``JOB_RETENTION_DAYS`` and submits every queued job,
+in the main database or in every tenant database. On shutdown running jobs
+are asked to stop and go back to the queue.
+
+Cancelling a queued job marks it cancelled at once. A running job gets
+``cancel_requested``; handlers check ``context.cancelled`` between batches and
+return early, keeping whatever they already committed. A handler that can pick
+up where it stopped records ``context.save_checkpoint`` in the same transaction
+as each batch; when the job runs again after a shutdown or a crash, the last
+one is in ``context.checkpoint``.
+
+Handlers are ``handler(db, params, context)`` and may be ``async``. They get a
+session of their own and return a JSON-serialisable result.
+
+Only types registered with ``public=True`` can be created through
+``POST /jobs``, and their params are checked against ``params_model`` first.
+The other types are submitted by their own endpoints, which validate the
+request themselves.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import orjson
+from pydantic import BaseModel, ConfigDict, ValidationError
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..exceptions import JobNotFoundException, ValidationException
+from ..models.job import Job
+from ..utils.logger import logger
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+JOB_STATUSES = ACTIVE_STATUSES + (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+# 進度最多每秒寫入一次
+PROGRESS_INTERVAL = 1.0
+# progress 中保存續跑點的鍵，不回傳給客戶端
+CHECKPOINT_KEY = "checkpoint"
+
+SessionFactory = Callable[[], Session]
+
+
+def get_job_workers() -> int:
+    return max(1, int(os.getenv("JOB_WORKERS", "4")))
+
+
+def get_heartbeat_interval() -> float:
+    return float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+
+
+def get_stale_after() -> float:
+    return float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+
+def get_max_attempts() -> int:
+    return int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+def get_retention_days() -> int:
+    return int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+
+def get_shutdown_timeout() -> float:
+    return float(os.getenv("JOB_SHUTDOWN_TIMEOUT", "30"))
+
+
+def get_concurrency_overrides() -> Dict[str, int]:
+    """JOB_CONCURRENCY=type=n,type=n"""
+    overrides = {}
+    for item in os.getenv("JOB_CONCURRENCY", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            overrides[name.strip()] = max(1, int(value))
+    return overrides
+
+
+Handler = Callable[[Session, Dict[str, Any], "JobContext"], Any]
+
+
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    handler: Handler
+    concurrency: int = 1
+    # 參數很大（如整份備份）時，工作結束後不再保留
+    keep_params: bool = True
+    # 可由 POST /jobs 直接建立；其餘類型只能經由各自檢查過參數的端點送出
+    public: bool = False
+    params_model: Optional[Type[BaseModel]] = None
+
+    @property
+    def limit(self) -> int:
+        return get_concurrency_overrides().get(self.name, self.concurrency)
+
+
+_job_types: Dict[str, JobType] = {}
+
+
+class NoParams(BaseModel):
+    """不接受任何參數的工作類型"""
+
+    model_config = ConfigDict(extra="forbid")
+
+
+def register_job_type(
+    name: str,
+    handler: Handler,
+    concurrency: int = 1,
+    keep_params: bool = True,
+    public: bool = False,
+    params_model: Optional[Type[BaseModel]] = None,
+) -> None:
+    """註冊工作類型（各服務模組載入時呼叫）"""
+    _job_types[name] = JobType(
+        name, handler, concurrency, keep_params, public, params_model
+    )
+
+
+def get_job_type(name: str) -> JobType:
+    job_type = _job_types.get(name)
+    if job_type is None:
+        raise ValidationException(
+            f"Unknown job type '{name}'. Available: {', '.join(sorted(_job_types))}"
+        )
+    return job_type
+
+
+def validate_public_job(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """檢查客戶端可否建立此類型的工作，回傳驗證後的參數"""
+    job_type = _job_types.get(name)
+    if job_type is None or not job_type.public:
+        public = sorted(key for key, item in _job_types.items() if item.public)
+        raise ValidationException(
+            f"Job type '{name}' cannot be created here. Available: {', '.join(public)}"
+        )
+    try:
+        model = (job_type.params_model or NoParams).model_validate(params)
+    except ValidationError as e:
+        raise ValidationException(f"Invalid params for '{name}': {e}")
+    return model.model_dump(exclude_none=True)
+
+
+def _to_json(value: Any) -> Any:
+    """轉為 JSON 欄位可儲存的值（datetime 轉為 ISO 字串，數字鍵轉為字串）"""
+    return orjson.loads(orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def job_to_dict(job: Job) -> Dict[str, Any]:
+    progress = job.progress
+    if progress and CHECKPOINT_KEY in progress:
+        progress = {
+            key: value for key, value in progress.items() if key != CHECKPOINT_KEY
+        }
+    return {
+        "id": job.id,
+        "type": job.type,
+        "status": job.status,
+        "progress": progress,
+        "result": job.result,
+        "error": job.error,
+        "attempts": job.attempts,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, type_name: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        get_job_type(type_name)
+        job = Job(type=type_name, status=STATUS_QUEUED, params=_to_json(params or {}))
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self.db.get(Job, job_id)
+        if job is None:
+            raise JobNotFoundException(job_id)
+        return job
+
+    def recent(
+        self,
+        type_name: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Job]:
+        """最近建立的工作在前"""
+        if status is not None and status not in JOB_STATUSES:
+            raise ValidationException(
+                f"Invalid status '{status}'. Must be one of: {', '.join(JOB_STATUSES)}"
+            )
+        query = select(Job)
+        if type_name is not None:
+            query = query.where(Job.type == type_name)
+        if status is not None:
+            query = query.where(Job.status == status)
+        query = query.order_by(Job.created_at.desc(), Job.id).limit(limit)
+        return list(self.db.scalars(query))
+
+    def latest(self, type_name: str, *statuses: str) -> Optional[Job]:
+        """同類型最近的一筆工作，可限定狀態"""
+        query = select(Job).where(Job.type == type_name)
+        if statuses:
+            query = query.where(Job.status.in_(statuses))
+        return self.db.scalars(
+            query.order_by(Job.created_at.desc(), Job.id.desc()).limit(1)
+        ).first()
+
+    def request_cancel(self, job_id: str) -> Job:
+        """排隊中的工作直接取消；執行中的工作標記後由處理函式自行停止"""
+        job = self.get(job_id)
+        if job.status == STATUS_QUEUED:
+            self.db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == STATUS_QUEUED)
+                .values(status=STATUS_CANCELLED, finished_at=_now())
+            )
+        if job.status in ACTIVE_STATUSES:
+            self.db.execute(
+                update(Job).where(Job.id == job_id).values(cancel_requested=True)
+            )
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def claim(self, job_id: str) -> bool:
+        """排隊中 → 執行中；只有更新成功的行程會執行此工作"""
+        now = _now()
+        claimed = self.db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == STATUS_QUEUED)
+            .values(
+                status=STATUS_RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=Job.attempts + 1,
+            )
+        ).rowcount
+        self.db.commit()
+        return claimed == 1
+
+    def report(
+        self, job_id: str, progress: Dict[str, Any], heartbeat: datetime
+    ) -> bool:
+        """寫入進度，回傳是否已要求取消"""
+        self.db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(progress=progress, heartbeat_at=heartbeat)
+        )
+        self.db.commit()
+        return bool(
+            self.db.scalar(select(Job.cancel_requested).where(Job.id == job_id))
+        )
+
+    def heartbeat(self, job_ids: List[str]) -> List[str]:
+        """更新執行中工作的心跳，回傳其中已要求取消的 ID"""
+        self.db.execute(
+            update(Job)
+            .where(Job.id.in_(job_ids), Job.status == STATUS_RUNNING)
+            .values(heartbeat_at=_now())
+        )
+        self.db.commit()
+        return list(
+            self.db.scalars(
+                select(Job.id).where(Job.id.in_(job_ids), Job.cancel_requested)
+            )
+        )
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Any = None,
+        error: Optional[str] = None,
+        keep_params: bool = True,
+    ) -> None:
+        values: Dict[str, Any] = {"status": status, "heartbeat_at": None}
+        if status == STATUS_QUEUED:
+            # 關閉時中斷的工作放回佇列，下次啟動重新執行
+            values.update(started_at=None)
+        else:
+            values.update(result=result, error=error, finished_at=_now())
+            if not keep_params:
+                values.update(params=None)
+        self.db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == STATUS_RUNNING)
+            .values(**values)
+        )
+        self.db.commit()
+
+    def requeue_stale(self, stale_before: datetime, max_attempts: int) -> int:
+        """心跳過期的執行中工作重新排隊，已達嘗試上限者標記失敗"""
+        stale = (Job.status == STATUS_RUNNING) & (
+            Job.heartbeat_at.is_(None) | (Job.heartbeat_at < stale_before)
+        )
+        failed = self.db.execute(
+            update(Job)
+            .where(stale, Job.attempts >= max_attempts)
+            .values(
+                status=STATUS_FAILED,
+                error="Worker stopped while the job was running",
+                finished_at=_now(),
+            )
+        ).rowcount
+        requeued = self.db.execute(
+            update(Job)
+            .where(stale)
+            .values(status=STATUS_QUEUED, started_at=None, heartbeat_at=None)
+        ).rowcount
+        self.db.commit()
+        if failed or requeued:
+            logger.warning(
+                "Recovered stale jobs: %d requeued, %d failed", requeued, failed
+            )
+        return requeued
+
+    def prune(self, finished_before: datetime) -> int:
+        deleted = self.db.execute(
+            delete(Job).where(
+                Job.status.notin_(ACTIVE_STATUSES), Job.finished_at < finished_before
+            )
+        ).rowcount
+        self.db.commit()
+        return deleted
+
+    def queued(self) -> List[Tuple[str, str]]:
+        return [
+            (row.id, row.type)
+            for row in self.db.execute(
+                select(Job.id, Job.type)
+                .where(Job.status == STATUS_QUEUED)
+                .order_by(Job.created_at, Job.id)
+            )
+        ]
+
+
+class JobContext:
+    """傳給處理函式：回報進度、檢查是否應停止"""
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        job_id: str,
+        cancel: threading.Event,
+        shutdown: threading.Event,
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ):
+        self.job_id = job_id
+        self._session_factory = session_factory
+        self._cancel = cancel
+        self._shutdown = shutdown
+        self._last_report = 0.0
+        self._progress: Dict[str, Any] = {}
+        self.interrupted = False
+        # 上次執行中斷前記錄的續跑點；第一次執行時為 None
+        self.checkpoint = checkpoint
+
+    @property
+    def cancelled(self) -> bool:
+        """已要求取消或服務正在關閉；處理函式應儘快結束"""
+        if self._cancel.is_set() or self._shutdown.is_set():
+            self.interrupted = True
+        return self.interrupted
+
+    @property
+    def resumable(self) -> bool:
+        """因服務關閉而停止，工作會放回佇列重新執行"""
+        return self._shutdown.is_set() and not self._cancel.is_set()
+
+    def progress(
+        self,
+        current: int,
+        total: Optional[int] = None,
+        message: Optional[str] = None,
+        force: bool = False,
+    ) -> None:
+        """記錄進度（節流寫入；寫入失敗只記錄警告，不影響工作）"""
+        self._progress = {"current": current, "total": total, "message": message}
+        now = time.monotonic()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+
+        db = self._session_factory()
+        try:
+            cancel_requested = JobService(db).report(
+                self.job_id, self._with_checkpoint(), _now()
+            )
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning("Failed to record progress of job %s: %s", self.job_id, e)
+            return
+        finally:
+            db.close()
+        if cancel_requested:
+            self._cancel.set()
+
+    def save_checkpoint(self, db: Session, state: Dict[str, Any]) -> None:
+        """在處理函式的交易中記錄續跑點，與該批資料一同提交（不另外 commit）"""
+        self.checkpoint = _to_json(state)
+        db.execute(
+            update(Job)
+            .where(Job.id == self.job_id)
+            .values(progress=self._with_checkpoint())
+        )
+
+    def _with_checkpoint(self) -> Dict[str, Any]:
+        if self.checkpoint is None:
+            return self._progress
+        return {**self._progress, CHECKPOINT_KEY: self.checkpoint}
+
+
+@dataclass
+class _ActiveJob:
+    session_factory: SessionFactory
+    cancel: threading.Event
+
+
+class JobRunner:
+    """執行緒池執行工作，並限制每種類型同時執行的數量"""
+
+    def __init__(
+        self, workers: Optional[int] = None, heartbeat_interval: Optional[float] = None
+    ):
+        self.workers = workers or get_job_workers()
+        self.heartbeat_interval = (
+            get_heartbeat_interval()
+            if heartbeat_interval is None
+            else heartbeat_interval
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, Deque[Tuple[SessionFactory, str]]] = defaultdict(deque)
+        self._active: Dict[str, _ActiveJob] = {}
+        self._shutdown = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def submit(self, session_factory: SessionFactory, job_id: str, type_name: str):
+        limit = get_job_type(type_name).limit
+        with self._lock:
+            self._ensure_started()
+            if self._running[type_name] < limit:
+                self._running[type_name] += 1
+                self._start(session_factory, job_id, type_name)
+            else:
+                self._waiting[type_name].append((session_factory, job_id))
+
+    def cancel(self, job_id: str) -> None:
+        """立即通知此行程中執行的工作（其他行程由心跳讀取資料庫旗標）"""
+        with self._lock:
+            active = self._active.get(job_id)
+        if active is not None:
+            active.cancel.set()
+
+    def recover(self, factories: Iterable[SessionFactory]) -> int:
+        """重新排入中斷與排隊中的工作，回傳送出的數量"""
+        stale_before = _now() - timedelta(seconds=get_stale_after())
+        finished_before = _now() - timedelta(days=get_retention_days())
+        submitted = 0
+        for session_factory in factories:
+            db = session_factory()
+            try:
+                service = JobService(db)
+                service.requeue_stale(stale_before, get_max_attempts())
+                service.prune(finished_before)
+                queued = service.queued()
+            except SQLAlchemyError as e:
+                db.rollback()
+                logger.warning("Job recovery failed: %s", e)
+                continue
+            finally:
+                db.close()
+            for job_id, type_name in queued:
+                if type_name not in _job_types:
+                    logger.warning(
+                        "Skipping job %s of unknown type %s", job_id, type_name
+                    )
+                    continue
+                self.submit(session_factory, job_id, type_name)
+                submitted += 1
+        return submitted
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待所有工作結束（測試與關閉時使用）"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not any(self._running.values()), timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """要求執行中的工作停止；逾時仍未結束者留待心跳過期後由下次啟動接手"""
+        self._shutdown.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._waiting.clear()
+        if executor is None:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        if not self.wait_idle(get_shutdown_timeout() if timeout is None else timeout):
+            logger.warning("Jobs still running at shutdown: %s", list(self._active))
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+
+    def _ensure_started(self) -> None:
+        if self._executor is not None:
+            return
+        self._shutdown.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="watchedit-job"
+        )
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="watchedit-job-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def _start(self, session_factory: SessionFactory, job_id: str, type_name: str):
+        """送進執行緒池（呼叫端持有鎖）；關閉時被取消、未執行的工作也要釋放名額"""
+        future = self._executor.submit(self._run, session_factory, job_id, type_name)
+        future.add_done_callback(partial(self._release_if_cancelled, type_name))
+
+    def _release_if_cancelled(self, type_name: str, future: Future) -> None:
+        if future.cancelled():
+            self._release(type_name)
+
+    def _run(self, session_factory: SessionFactory, job_id: str, type_name: str):
+        try:
+            self._execute(session_factory, job_id, get_job_type(type_name))
+        except Exception:
+            logger.exception("Job %s crashed", job_id)
+        finally:
+            self._release(type_name)
+
+    def _execute(
+        self, session_factory: SessionFactory, job_id: str, job_type: JobType
+    ) -> None:
+        db = session_factory()
+        try:
+            service = JobService(db)
+            if not service.claim(job_id):
+                return
+            job = service.get(job_id)
+            params = job.params or {}
+            checkpoint = (job.progress or {}).get(CHECKPOINT_KEY)
+
+            cancel = threading.Event()
+            with self._lock:
+                self._active[job_id] = _ActiveJob(session_factory, cancel)
+            context = JobContext(
+                session_factory, job_id, cancel, self._shutdown, checkpoint
+            )
+            started = time.perf_counter()
+            result, error = None, None
+            try:
+                result = job_type.handler(db, params, context)
+                if inspect.isawaitable(result):
+                    result = asyncio.run(result)
+                result = _to_json(result)
+                if not context.interrupted:
+                    status = STATUS_SUCCEEDED
+                elif cancel.is_set():
+                    status = STATUS_CANCELLED
+                else:
+                    status = STATUS_QUEUED
+            except Exception as e:
+                db.rollback()
+                logger.exception("Job %s (%s) failed", job_id, job_type.name)
+                status, error = STATUS_FAILED, str(e) or type(e).__name__
+            finally:
+                with self._lock:
+                    self._active.pop(job_id, None)
+
+            service.finish(job_id, status, result, error, job_type.keep_params)
+            logger.info(
+                "Job %s (%s) %s in %.1f ms",
+                job_id,
+                job_type.name,
+                status,
+                (time.perf_counter() - started) * 1000,
+            )
+        finally:
+            db.close()
+
+    def _release(self, type_name: str) -> None:
+        with self._lock:
+            waiting = self._waiting[type_name]
+            if waiting and self._executor is not None:
+                session_factory, job_id = waiting.popleft()
+                self._start(session_factory, job_id, type_name)
+            else:
+                self._running[type_name] -= 1
+            self._idle.notify_all()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._shutdown.wait(self.heartbeat_interval):
+            with self._lock:
+                active = dict(self._active)
+            by_factory: Dict[SessionFactory, List[str]] = defaultdict(list)
+            for job_id, job in active.items():
+                by_factory[job.session_factory].append(job_id)
+
+            for session_factory, job_ids in by_factory.items():
+                db = session_factory()
+                try:
+                    cancelled = JobService(db).heartbeat(job_ids)
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    logger.warning("Job heartbeat failed: %s", e)
+                    continue
+                finally:
+                    db.close()
+                for job_id in cancelled:
+                    active[job_id].cancel.set()
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
+
+
+def submit_job(
+    db: Session,
+    type_name: str,
+    params: Optional[Dict[str, Any]] = None,
+    unique: bool = False,
+) -> Tuple[Job, bool]:
+    """建立工作並交給背景執行；unique 時若同類型已有未完成的工作則回傳它與 False"""
+    service = JobService(db)
+    if unique:
+        current = service.latest(type_name, *ACTIVE_STATUSES)
+        if current is not None:
+            return current, False
+    job = service.create(type_name, params)
+    # 請求結束後 Session 即關閉，工作使用同一 Engine 的新 Session
+    get_job_runner().submit(
+        sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind()),
+        job.id,
+        job.type,
+    )
+    return job, True
+
+
+def cancel_job(db: Session, job_id: str) -> Job:
+    job = JobService(db).request_cancel(job_id)
+    get_job_runner().cancel(job_id)
+    return job
+
+
+def start_job_runner() -> int:
+    """重新排入上次未完成的工作（lifespan 啟動時呼叫）"""
+    from ..db.tenancy import session_factories
+
+    submitted = get_job_runner().recover(session_factories())
+    if submitted:
+        logger.info("Resumed %d queued jobs", submitted)
+    return submitted
+
+
+def stop_job_runner() -> None:
+    global _runner
+    with _runner_lock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.stop()
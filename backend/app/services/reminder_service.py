@@ -0,0 +1,303 @@
+"""Reminder scheduling.
+
+Works with ``reminder_enabled`` carry an indexed ``next_reminder_at``; disabled
+works keep it ``NULL``. A scheduler tick therefore only range-scans the index
+for ``next_reminder_at <= now`` and touches the reminders that are due, no
+matter how many works exist.
+
+Each due reminder is claimed with a conditional ``UPDATE ... WHERE
+next_reminder_at = <value read>`` that moves it to its next occurrence; only
+the process whose update matched dispatches it, so several workers can run
+the scheduler without sending duplicates. Dispatch goes through a pluggable
+``Notifier`` (``REMINDER_NOTIFIER``; the default ``log`` notifier just writes
+to the log).
+
+Environment:
+    REMINDER_SCHEDULER_ENABLED: run the background scheduler (default ``false``)
+    REMINDER_POLL_INTERVAL: seconds between ticks (default ``60``)
+    REMINDER_BATCH_SIZE: due reminders claimed per query (default ``100``)
+    REMINDER_NOTIFIER: registered notifier name (default ``log``)
+"""
+
+import calendar
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..db.tenancy import session_factories
+from ..models.work import Work
+from ..utils.logger import logger
+from .change_log import ENTITY_WORK, record_changes
+
+REMINDER_FREQUENCIES = ("daily", "weekly", "monthly")
+
+
+def get_poll_interval() -> float:
+    return float(os.getenv("REMINDER_POLL_INTERVAL", "60"))
+
+
+def get_batch_size() -> int:
+    return int(os.getenv("REMINDER_BATCH_SIZE", "100"))
+
+
+def reminder_scheduler_enabled() -> bool:
+    return os.getenv("REMINDER_SCHEDULER_ENABLED", "false").lower() == "true"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    """SQLite 取回的時間不帶時區，一律視為 UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def next_occurrence(frequency: str, after: datetime) -> datetime:
+    """依頻率計算下一次提醒時間（每月提醒遇到較短月份時取月底）"""
+    if frequency == "daily":
+        return after + timedelta(days=1)
+    if frequency == "weekly":
+        return after + timedelta(days=7)
+    if frequency == "monthly":
+        year, month = divmod(after.year * 12 + after.month, 12)
+        month += 1
+        day = min(after.day, calendar.monthrange(year, month)[1])
+        return after.replace(year=year, month=month, day=day)
+    raise ValueError(f"Unknown reminder frequency: {frequency}")
+
+
+def schedule_for(
+    enabled: Optional[bool], frequency: Optional[str], now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """建立或修改提醒設定時的 next_reminder_at；停用時為 NULL，不進入索引範圍"""
+    if not enabled or frequency not in REMINDER_FREQUENCIES:
+        return None
+    return next_occurrence(frequency, now or utcnow())
+
+
+# 通知 -----------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class DueReminder:
+    work_id: str
+    title: str
+    frequency: str
+    due_at: datetime
+    next_at: datetime
+
+
+class Notifier:
+    """提醒的送出方式；send 失敗時提醒仍已排入下一次，不會重送"""
+
+    name = "base"
+
+    def send(self, reminders: List[DueReminder]) -> None:
+        raise NotImplementedError
+
+
+class LogNotifier(Notifier):
+    name = "log"
+
+    def send(self, reminders: List[DueReminder]) -> None:
+        for reminder in reminders:
+            logger.info(
+                "Reminder due: %s (%s)",
+                reminder.title,
+                reminder.work_id,
+                extra={
+                    "frequency": reminder.frequency,
+                    "due_at": reminder.due_at.isoformat(),
+                    "next_at": reminder.next_at.isoformat(),
+                },
+            )
+
+
+_notifiers: Dict[str, Callable[[], Notifier]] = {"log": LogNotifier}
+
+
+def register_notifier(name: str, factory: Callable[[], Notifier]) -> None:
+    """註冊通知方式，供 REMINDER_NOTIFIER 選用"""
+    _notifiers[name] = factory
+
+
+def create_notifier(name: Optional[str] = None) -> Notifier:
+    name = name or os.getenv("REMINDER_NOTIFIER", "log")
+    try:
+        return _notifiers[name]()
+    except KeyError:
+        raise ValueError(f"Unknown reminder notifier: {name}") from None
+
+
+# 排程 -----------------------------------------------------------------------
+
+
+class ReminderService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def due(self, now: datetime, limit: int) -> List[tuple]:
+        """依索引取出已到期的提醒（停用者為 NULL，不會被掃到）"""
+        return self.db.execute(
+            select(Work.id, Work.title, Work.reminder_frequency, Work.next_reminder_at)
+            .where(Work.next_reminder_at <= now)
+            .order_by(Work.next_reminder_at)
+            .limit(limit)
+        ).all()
+
+    def claim(self, rows: Iterable[tuple], now: datetime) -> List[DueReminder]:
+        """以條件式 UPDATE 將到期提醒排入下一次；只有更新成功的行程負責送出"""
+        claimed = []
+        for work_id, title, frequency, due_at in rows:
+            if frequency not in REMINDER_FREQUENCIES:
+                next_at = None
+            else:
+                # 停機期間錯過的提醒只送一次，下一次排在現在之後
+                next_at = as_utc(due_at)
+                while next_at <= now:
+                    next_at = next_occurrence(frequency, next_at)
+
+            result = self.db.execute(
+                update(Work)
+                .where(Work.id == work_id, Work.next_reminder_at == due_at)
+                .values(next_reminder_at=next_at)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount and next_at is not None:
+                claimed.append(
+                    DueReminder(work_id, title, frequency, as_utc(due_at), next_at)
+                )
+
+        record_changes(self.db, ENTITY_WORK, [r.work_id for r in claimed])
+        self.db.commit()
+        return claimed
+
+    def run_due(
+        self,
+        notifier: Notifier,
+        now: Optional[datetime] = None,
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """處理所有到期提醒，回傳送出的數量"""
+        now = now or utcnow()
+        batch_size = batch_size or get_batch_size()
+        sent = 0
+        while True:
+            rows = self.due(now, batch_size)
+            if not rows:
+                break
+            reminders = self.claim(rows, now)
+            if reminders:
+                try:
+                    notifier.send(reminders)
+                except Exception:
+                    logger.exception("Reminder notifier %s failed", notifier.name)
+                sent += len(reminders)
+            if len(rows) < batch_size:
+                break
+        return sent
+
+    def backfill(self, now: Optional[datetime] = None) -> int:
+        """為已啟用提醒但尚未排程的作品補上 next_reminder_at（新增欄位時使用）"""
+        now = now or utcnow()
+        scheduled = 0
+        for frequency in REMINDER_FREQUENCIES:
+            scheduled += self.db.execute(
+                update(Work)
+                .where(
+                    Work.reminder_enabled.is_(True),
+                    Work.reminder_frequency == frequency,
+                    Work.next_reminder_at.is_(None),
+                )
+                .values(next_reminder_at=next_occurrence(frequency, now))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        self.db.commit()
+        return scheduled
+
+
+class ReminderScheduler:
+    """背景執行緒定期處理到期提醒"""
+
+    def __init__(
+        self,
+        session_factories: Callable[[], Iterable[Callable[[], Session]]],
+        notifier: Optional[Notifier] = None,
+        interval: Optional[float] = None,
+    ):
+        self.session_factories = session_factories
+        self.notifier = notifier or create_notifier()
+        self.interval = get_poll_interval() if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        sent = 0
+        for session_factory in self.session_factories():
+            db = session_factory()
+            try:
+                sent += ReminderService(db).run_due(self.notifier, now=now)
+            except SQLAlchemyError as e:
+                db.rollback()
+                logger.warning("Reminder scheduler tick failed: %s", e)
+            finally:
+                db.close()
+        return sent
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="watchedit-reminders", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Reminder scheduler tick failed")
+
+
+_scheduler: Optional[ReminderScheduler] = None
+
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReminderScheduler(session_factories)
+    return _scheduler
+
+
+def start_reminder_scheduler() -> Optional[ReminderScheduler]:
+    """REMINDER_SCHEDULER_ENABLED=true 時啟動（lifespan 啟動時呼叫）"""
+    if not reminder_scheduler_enabled():
+        return None
+    scheduler = get_reminder_scheduler()
+    scheduler.start()
+    logger.info(
+        "Reminder scheduler started (every %.0fs, notifier=%s)",
+        scheduler.interval,
+        scheduler.notifier.name,
+    )
+    return scheduler
+
+
+def stop_reminder_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
@@ -1,13 +1,16 @@
 from typing import Any, Dict, List
 
-import httpx
 from sqlalchemy.orm import Session
 
+from ..utils.logger import logger
+from ..utils.metrics import track_upstream
+from .enrichment import get_anilist_url
+
 
 class SearchService:
     def __init__(self, db: Session):
         self.db = db
-        self.anilist_url = "https://graphql.anilist.co"
+        self.anilist_url = get_anilist_url()
 
     async def search_anime(
         self, query: str, page: int = 1, per_page: int = 24
@@ -46,12 +49,15 @@ class SearchService:
         variables = {"search": query, "page": page, "perPage": per_page}
 
         try:
+            import httpx  # 只有查詢 AniList 時才需要，延後載入以加快啟動
+
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.anilist_url,
-                    json={"query": graphql_query, "variables": variables},
-                    headers={"Content-Type": "application/json"},
-                )
+                with track_upstream("anilist"):
+                    response = await client.post(
+                        self.anilist_url,
+                        json={"query": graphql_query, "variables": variables},
+                        headers={"Content-Type": "application/json"},
+                    )
 
                 if response.status_code == 200:
                     data = response.json()
@@ -85,7 +91,7 @@ class SearchService:
                     return []
 
         except Exception as e:
-            print(f"搜尋動畫時發生錯誤: {e}")
+            logger.error("搜尋動畫時發生錯誤: %s", e)
             return []
 
     async def get_anime_by_id(self, anime_id: int) -> Dict[str, Any]:
@@ -121,12 +127,15 @@ class SearchService:
         variables = {"id": anime_id}
 
         try:
+            import httpx
+
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.anilist_url,
-                    json={"query": graphql_query, "variables": variables},
-                    headers={"Content-Type": "application/json"},
-                )
+                with track_upstream("anilist"):
+                    response = await client.post(
+                        self.anilist_url,
+                        json={"query": graphql_query, "variables": variables},
+                        headers={"Content-Type": "application/json"},
+                    )
 
                 if response.status_code == 200:
                     data = response.json()
@@ -158,7 +167,7 @@ class SearchService:
                     return {}
 
         except Exception as e:
-            print(f"獲取動畫詳情時發生錯誤: {e}")
+            logger.error("獲取動畫詳情時發生錯誤: %s", e)
             return {}
 
     def get_suggestions(self, query: str) -> List[str]:
@@ -0,0 +1,264 @@
+"""In-process "more like this" index.
+
+Each work is a sparse, L2-normalised feature vector: one feature per tag plus
+lower-weighted ``type`` and ``year`` features. An inverted index maps every
+feature to the rows that have it, so the cosine scores of one work against
+all others are a single ``np.bincount`` over the posting lists of its own
+features; ``argpartition`` then picks the top k. Only works sharing a feature
+are ever touched, and scoring itself runs no SQL.
+
+The index is built lazily per database and kept current by replaying
+``change_log`` entries after its cursor: changed works are reloaded, deleted
+ones removed. Tag merges and deletes already log the affected works, so tag
+changes are picked up the same way.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.change_log import ChangeLog
+from ..models.tag import WorkTag
+from ..models.work import Work
+from ..utils.logger import logger
+from .change_log import ENTITY_WORK, OP_DELETE
+
+TAG_WEIGHT = 1.0
+TYPE_WEIGHT = 0.5
+YEAR_WEIGHT = 0.3
+
+# 累積的變更超過此數量時整個重建，比逐筆更新快
+REBUILD_THRESHOLD = 5000
+
+
+def work_features(
+    work_type: Optional[str], year: Optional[int], tag_ids: Iterable[int]
+) -> Dict[str, float]:
+    """作品的稀疏特徵向量（已正規化為單位長度）"""
+    features = {f"tag:{tag_id}": TAG_WEIGHT for tag_id in tag_ids}
+    if work_type:
+        features[f"type:{work_type}"] = TYPE_WEIGHT
+    if year:
+        features[f"year:{year}"] = YEAR_WEIGHT
+    norm = sum(weight * weight for weight in features.values()) ** 0.5
+    return {feature: weight / norm for feature, weight in features.items()}
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._row_of: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._features: List[Dict[str, float]] = []
+        self._free_rows: List[int] = []
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        # 特徵 → (rows, weights) 陣列，該特徵有變動時才重建
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._cursor: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, work_id: str) -> bool:
+        return work_id in self._row_of
+
+    # 更新 ---------------------------------------------------------------
+
+    def upsert(
+        self,
+        work_id: str,
+        work_type: Optional[str],
+        year: Optional[int],
+        tag_ids: Iterable[int],
+    ) -> None:
+        features = work_features(work_type, year, tag_ids)
+        with self._lock:
+            row = self._row_of.get(work_id)
+            if row is None:
+                row = self._allocate(work_id)
+            else:
+                self._unlink(row)
+            self._features[row] = features
+            for feature, weight in features.items():
+                self._postings[feature][row] = weight
+                self._arrays.pop(feature, None)
+
+    def remove(self, work_id: str) -> None:
+        with self._lock:
+            row = self._row_of.pop(work_id, None)
+            if row is None:
+                return
+            self._unlink(row)
+            self._ids[row] = None
+            self._features[row] = {}
+            self._free_rows.append(row)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._row_of.clear()
+            self._ids.clear()
+            self._features.clear()
+            self._free_rows.clear()
+            self._postings.clear()
+            self._arrays.clear()
+            self._cursor = None
+
+    def _allocate(self, work_id: str) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._ids[row] = work_id
+        else:
+            row = len(self._ids)
+            self._ids.append(work_id)
+            self._features.append({})
+        self._row_of[work_id] = row
+        return row
+
+    def _unlink(self, row: int) -> None:
+        for feature in self._features[row]:
+            posting = self._postings.get(feature)
+            if posting is not None:
+                posting.pop(row, None)
+                if not posting:
+                    del self._postings[feature]
+            self._arrays.pop(feature, None)
+
+    def _posting_arrays(self, feature: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(feature)
+        if arrays is None:
+            posting = self._postings.get(feature, {})
+            arrays = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float64, count=len(posting)),
+            )
+            self._arrays[feature] = arrays
+        return arrays
+
+    # 查詢 ---------------------------------------------------------------
+
+    def similar(self, work_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """回傳 (work_id, cosine 相似度)，依分數由高到低"""
+        with self._lock:
+            row = self._row_of.get(work_id)
+            if row is None or not self._features[row]:
+                return []
+
+            rows: List[np.ndarray] = []
+            weights: List[np.ndarray] = []
+            for feature, query_weight in self._features[row].items():
+                posting_rows, posting_weights = self._posting_arrays(feature)
+                rows.append(posting_rows)
+                weights.append(posting_weights * query_weight)
+
+            scores = np.bincount(
+                np.concatenate(rows),
+                weights=np.concatenate(weights),
+                minlength=len(self._ids),
+            )
+            scores[row] = 0.0
+            candidates = np.flatnonzero(scores > 1e-9)
+            if len(candidates) > limit:
+                top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[top]
+            ranked = sorted(
+                candidates.tolist(), key=lambda r: (-scores[r], self._ids[r])
+            )
+            return [(self._ids[r], round(float(scores[r]), 4)) for r in ranked]
+
+    # 與資料庫同步 ---------------------------------------------------------
+
+    def refresh(self, db: Session) -> None:
+        """依 change_log 補上游標之後的變更；首次或變更過多時整個重建"""
+        with self._lock:
+            if self._cursor is None:
+                self.rebuild(db)
+                return
+
+            rows = db.execute(
+                select(ChangeLog.id, ChangeLog.entity_id, ChangeLog.op)
+                .where(ChangeLog.id > self._cursor, ChangeLog.entity == ENTITY_WORK)
+                .order_by(ChangeLog.id)
+                .limit(REBUILD_THRESHOLD + 1)
+            ).all()
+            if not rows:
+                return
+            if len(rows) > REBUILD_THRESHOLD:
+                self.rebuild(db)
+                return
+
+            # 同一作品只看最後一筆紀錄
+            latest_op = {work_id: op for _, work_id, op in rows}
+            for work_id, op in latest_op.items():
+                if op == OP_DELETE:
+                    self.remove(work_id)
+            self._load(
+                db, [work_id for work_id, op in latest_op.items() if op != OP_DELETE]
+            )
+            self._cursor = rows[-1][0]
+
+    def rebuild(self, db: Session) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            self.clear()
+            cursor = db.execute(select(func.max(ChangeLog.id))).scalar() or 0
+            self._load(db, None)
+            self._cursor = cursor
+        logger.info(
+            "Similarity index built: %d works in %.1f ms",
+            len(self),
+            (time.perf_counter() - started) * 1000,
+        )
+
+    def _load(self, db: Session, work_ids: Optional[Sequence[str]]) -> None:
+        """載入指定作品（None 為全部）的類型、年份與標籤"""
+        if work_ids is not None and not work_ids:
+            return
+
+        works = select(Work.id, Work.type, Work.year)
+        links = select(WorkTag.work_id, WorkTag.tag_id)
+        if work_ids is not None:
+            works = works.where(Work.id.in_(work_ids))
+            links = links.where(WorkTag.work_id.in_(work_ids))
+
+        tags_by_work: Dict[str, List[int]] = defaultdict(list)
+        for work_id, tag_id in db.execute(links):
+            tags_by_work[work_id].append(tag_id)
+
+        found = set()
+        for work_id, work_type, year in db.execute(works):
+            found.add(work_id)
+            self.upsert(work_id, work_type, year, tags_by_work.get(work_id, ()))
+
+        # 紀錄為更新但作品已不存在（例如之後被刪除）
+        for work_id in set(work_ids or ()) - found:
+            self.remove(work_id)
+
+
+_indexes: Dict[str, SimilarityIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index(db: Session) -> SimilarityIndex:
+    """取得此資料庫的相似度索引並補上最新變更"""
+    key = str(db.get_bind().url)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(key, SimilarityIndex())
+    index.refresh(db)
+    return index
+
+
+def drop_similarity_index(database_url: str) -> None:
+    with _indexes_lock:
+        _indexes.pop(database_url, None)
+
+
+def clear_similarity_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,191 @@
+"""Work statistics computed in one aggregated pass.
+
+A single ``GROUP BY type, status, year, rating bucket`` query over ``works``
+returns a few hundred rows at most (with per-group rating and episode sums),
+and every statistic is folded from those rows in Python. Per-tag counts come
+from the maintained ``tags.usage_count``. The result is cached per database
+and keyed by the work/tag data versions, so repeated dashboard loads cost one
+version lookup until something is written. After a large import the
+``stats.refresh`` background job can warm the cache so no request pays for
+the recomputation.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Integer, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from ..models.tag import Tag
+from ..models.work import Work
+from .change_log import ENTITY_TAG, ENTITY_WORK, get_data_versions
+from .jobs import JobContext, register_job_type
+from .work_service import STATUS_COMPLETED, ProgressSQL
+
+STATUS_IN_PROGRESS = "進行中"
+RATING_BUCKETS = [str(bucket) for bucket in range(11)]
+
+# 每個資料庫（租戶）一份快取
+_CACHE_SIZE = 128
+_cache: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def clear_stats_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+class StatsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def overview(self, versions: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """類型、狀態、年份統計（與 extended 共用同一份快取）"""
+        stats = self.extended(versions)
+        return {
+            key: stats[key]
+            for key in ("total_works", "type_stats", "status_stats", "year_stats")
+        }
+
+    def extended(self, versions: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """完整統計；資料版本未變時直接回傳快取"""
+        if versions is None or not {ENTITY_WORK, ENTITY_TAG} <= versions.keys():
+            versions = get_data_versions(self.db, [ENTITY_WORK, ENTITY_TAG])
+        key = str(self.db.get_bind().url)
+        version = (versions[ENTITY_WORK], versions[ENTITY_TAG])
+
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None and cached[0] == version:
+                _cache.move_to_end(key)
+                return cached[1]
+
+        stats = self._compute()
+        with _cache_lock:
+            _cache[key] = (version, stats)
+            _cache.move_to_end(key)
+            while len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+        return stats
+
+    def _compute(self) -> Dict[str, Any]:
+        progress = ProgressSQL(self.db.get_bind().dialect.name)
+        episode = func.coalesce(progress.field("episode"), 0)
+        total_episode = progress.field("total_episode")
+        # 評分為 0-10，先 floor 再轉型：PostgreSQL 的 CAST 會四捨五入（8.5 → 9）
+        bucket = case(
+            (Work.rating.is_(None), None),
+            else_=cast(func.floor(Work.rating), Integer),
+        )
+        remaining = case((total_episode > episode, total_episode - episode), else_=0)
+
+        rows = self.db.execute(
+            select(
+                Work.type,
+                Work.status,
+                Work.year,
+                bucket,
+                func.count(),
+                func.count(Work.rating),
+                func.coalesce(func.sum(Work.rating), 0),
+                func.sum(episode),
+                func.coalesce(func.sum(total_episode), 0),
+                func.sum(remaining),
+            ).group_by(Work.type, Work.status, Work.year, bucket)
+        ).all()
+
+        total_works = 0
+        type_stats: Dict[str, int] = {}
+        status_stats: Dict[str, int] = {}
+        year_stats: Dict[Optional[int], int] = {}
+        histogram = dict.fromkeys(RATING_BUCKETS, 0)
+        rated = 0
+        rating_sum = 0.0
+        rating_by_type: Dict[str, list] = {}
+        watched_episodes = 0
+        total_episodes = 0
+        remaining_episodes = 0
+
+        for (
+            work_type,
+            status,
+            year,
+            rating_bucket,
+            count,
+            rated_count,
+            group_rating_sum,
+            group_watched,
+            group_total,
+            group_remaining,
+        ) in rows:
+            total_works += count
+            type_stats[work_type] = type_stats.get(work_type, 0) + count
+            status_stats[status] = status_stats.get(status, 0) + count
+            year_stats[year] = year_stats.get(year, 0) + count
+            watched_episodes += group_watched or 0
+            total_episodes += group_total or 0
+            if status == STATUS_IN_PROGRESS:
+                remaining_episodes += group_remaining or 0
+            if rating_bucket is not None:
+                histogram[str(min(max(rating_bucket, 0), 10))] += count
+                rated += rated_count
+                rating_sum += group_rating_sum
+                by_type = rating_by_type.setdefault(work_type, [0.0, 0])
+                by_type[0] += group_rating_sum
+                by_type[1] += rated_count
+
+        tags = self.db.execute(
+            select(Tag.id, Tag.name, Tag.color, Tag.usage_count).order_by(
+                Tag.usage_count.desc(), Tag.name
+            )
+        ).all()
+
+        completed = status_stats.get(STATUS_COMPLETED, 0)
+        return {
+            "total_works": total_works,
+            "type_stats": type_stats,
+            "status_stats": status_stats,
+            "year_stats": year_stats,
+            "rating": {
+                "histogram": histogram,
+                "rated": rated,
+                "unrated": total_works - rated,
+                "average": round(rating_sum / rated, 2) if rated else None,
+                "average_by_type": {
+                    work_type: round(total / count, 2)
+                    for work_type, (total, count) in sorted(rating_by_type.items())
+                },
+            },
+            "tag_stats": [
+                {"id": tag_id, "name": name, "color": color, "count": count}
+                for tag_id, name, color, count in tags
+            ],
+            "completion": {
+                "completed": completed,
+                "total": total_works,
+                "rate": round(completed / total_works, 4) if total_works else 0.0,
+            },
+            "backlog": {
+                "in_progress": status_stats.get(STATUS_IN_PROGRESS, 0),
+                "remaining_episodes": remaining_episodes,
+            },
+            "episode_stats": {
+                "total_episodes": total_episodes,
+                "watched_episodes": watched_episodes,
+                "completion_rate": (
+                    round(watched_episodes / total_episodes, 4)
+                    if total_episodes
+                    else 0.0
+                ),
+            },
+        }
+
+
+def refresh_stats(db: Session, params: Dict[str, Any], context: JobContext):
+    """工作 stats.refresh：在背景重算統計並放入快取，之後的請求直接命中"""
+    return StatsService(db).extended()
+
+
+register_job_type("stats.refresh", refresh_stats, public=True)
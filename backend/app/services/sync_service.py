@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from ..models.change_log import ChangeLog
+from ..models.tag import Tag
+from ..models.work import Work
+from ..schemas.sync import SyncChange, SyncChangeFeed
+from .change_log import ENTITY_TAG, ENTITY_WORK, OP_DELETE
+from .work_service import WorkService
+
+
+class SyncService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_changes(self, since: int = 0, limit: int = 500) -> SyncChangeFeed:
+        """取得游標之後的變更，同一批次內同一實體只回傳最後一次變更"""
+        rows = (
+            self.db.query(ChangeLog)
+            .filter(ChangeLog.id > since)
+            .order_by(ChangeLog.id)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = rows[-1].id if rows else since
+
+        latest: Dict[Tuple[str, str], ChangeLog] = {}
+        for row in rows:
+            latest.pop((row.entity, row.entity_id), None)
+            latest[(row.entity, row.entity_id)] = row
+
+        upserted_work_ids = [
+            entity_id
+            for (entity, entity_id), row in latest.items()
+            if entity == ENTITY_WORK and row.op != OP_DELETE
+        ]
+        upserted_tag_ids = [
+            int(entity_id)
+            for (entity, entity_id), row in latest.items()
+            if entity == ENTITY_TAG and row.op != OP_DELETE
+        ]
+        data = {
+            (ENTITY_WORK, key): value
+            for key, value in self._load_works(upserted_work_ids).items()
+        }
+        data.update(
+            {
+                (ENTITY_TAG, key): value
+                for key, value in self._load_tags(upserted_tag_ids).items()
+            }
+        )
+
+        changes: List[SyncChange] = []
+        for key, row in latest.items():
+            if row.op == OP_DELETE:
+                changes.append(self._to_change(row))
+            elif key in data:
+                changes.append(self._to_change(row, data[key]))
+            # 實體已不存在時略過，其刪除紀錄會出現在後續批次
+
+        return SyncChangeFeed(
+            changes=changes, next_cursor=next_cursor, has_more=has_more
+        )
+
+    def _load_works(self, work_ids: List[str]) -> Dict[str, dict]:
+        if not work_ids:
+            return {}
+        work_service = WorkService(self.db)
+        works = (
+            self.db.query(Work)
+            .options(selectinload(Work.tags))
+            .filter(Work.id.in_(work_ids))
+            .all()
+        )
+        return {
+            work.id: work_service._work_to_response(work).model_dump(mode="json")
+            for work in works
+        }
+
+    def _load_tags(self, tag_ids: List[int]) -> Dict[str, dict]:
+        if not tag_ids:
+            return {}
+        tags = self.db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
+        return {
+            str(tag.id): {"id": tag.id, "name": tag.name, "color": tag.color}
+            for tag in tags
+        }
+
+    @staticmethod
+    def _to_change(row: ChangeLog, data: Optional[dict] = None) -> SyncChange:
+        return SyncChange(
+            cursor=row.id, entity=row.entity, id=row.entity_id, op=row.op, data=data
+        )
@@ -0,0 +1,195 @@
+"""In-process tag registry.
+
+Tags are a small, hot, rarely-changing table, so each process keeps them in
+memory (id → tag, name → id). ``TagService`` writes through to the registry on
+create/update/delete. Changes made by other worker processes are picked up by
+comparing the tag data version (the latest tag ``change_log`` cursor) at most
+once every ``TAG_CACHE_CHECK_INTERVAL`` seconds; between checks, lookups and
+validation never touch the database. When a cache invalidation bus is running
+(see ``cache_bus``), a notification forces the next lookup to re-check, and the
+interval becomes a 30 second safety net.
+
+A write through ``TagService`` also moves the cached version to the change-log
+entry it wrote, as long as no other change landed in between, so the writer's
+own next check finds the version unchanged instead of reloading every tag.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.tag import Tag
+from ..schemas.tag import TagResponse
+from .cache_bus import cache_bus_active, subscribe, unsubscribe
+from .change_log import ENTITY_TAG, get_data_versions
+
+
+def get_check_interval() -> float:
+    default = "30.0" if cache_bus_active() else "1.0"
+    return float(os.getenv("TAG_CACHE_CHECK_INTERVAL", default))
+
+
+class TagRegistry:
+    def __init__(self, check_interval: Optional[float] = None):
+        self.check_interval = (
+            get_check_interval() if check_interval is None else check_interval
+        )
+        self._lock = threading.RLock()
+        self._by_id: Dict[int, TagResponse] = {}
+        self._by_name: Dict[str, int] = {}
+        self._sorted: Optional[List[TagResponse]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._stale = False
+
+    # 讀取 ---------------------------------------------------------------
+
+    def tags(self, db: Session) -> List[TagResponse]:
+        """依名稱排序的所有標籤"""
+        self._ensure_fresh(db)
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._by_id.values(), key=lambda tag: tag.name)
+            return list(self._sorted)
+
+    def get(self, db: Session, tag_id: int) -> Optional[TagResponse]:
+        self._ensure_fresh(db)
+        return self._by_id.get(tag_id)
+
+    def id_for_name(self, db: Session, name: str) -> Optional[int]:
+        self._ensure_fresh(db)
+        return self._by_name.get(name)
+
+    def lookup(self, db: Session, tag_ids: Iterable[int]) -> List[TagResponse]:
+        """依序取得已知的標籤，未知的 ID（例如孤兒關聯）直接略過"""
+        self._ensure_fresh(db)
+        by_id = self._by_id
+        return [by_id[tag_id] for tag_id in tag_ids if tag_id in by_id]
+
+    def missing(self, db: Session, tag_ids: Iterable[int]) -> List[int]:
+        """回傳不存在的標籤 ID；有未命中時重新載入一次，以涵蓋其他行程剛建立的標籤"""
+        self._ensure_fresh(db)
+        missing = [tag_id for tag_id in tag_ids if tag_id not in self._by_id]
+        if missing:
+            self.reload(db)
+            missing = [tag_id for tag_id in missing if tag_id not in self._by_id]
+        return missing
+
+    # 寫入 ---------------------------------------------------------------
+
+    def put(
+        self,
+        tag: TagResponse,
+        db: Optional[Session] = None,
+        version: Optional[int] = None,
+    ) -> None:
+        """寫入標籤；version 為同一交易寫下的變更游標（見 _advance）"""
+        current = self._current_before(db, version)
+        with self._lock:
+            previous = self._by_id.get(tag.id)
+            if previous is not None and previous.name != tag.name:
+                self._by_name.pop(previous.name, None)
+            self._by_id[tag.id] = tag
+            self._by_name[tag.name] = tag.id
+            self._sorted = None
+            self._advance(current, version)
+
+    def remove(
+        self, tag_id: int, db: Optional[Session] = None, version: Optional[int] = None
+    ) -> None:
+        current = self._current_before(db, version)
+        with self._lock:
+            previous = self._by_id.pop(tag_id, None)
+            if previous is not None:
+                self._by_name.pop(previous.name, None)
+            self._sorted = None
+            self._advance(current, version)
+
+    def _current_before(self, db: Optional[Session], version: Optional[int]) -> bool:
+        """version 之前的最後一筆標籤變更是否就是快取的版本（中間沒有其他行程的變更）"""
+        if db is None or version is None or self._version is None:
+            return False
+        before = get_data_versions(db, [ENTITY_TAG], before=version)[ENTITY_TAG]
+        return before == self._version
+
+    def _advance(self, current: bool, version: Optional[int]) -> None:
+        """快取已含此次寫入：直接前進到該版本，下次檢查不必整批重新載入"""
+        if current:
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self, entities=None) -> None:
+        """收到其他行程的變更通知：下次存取時重新比對資料版本"""
+        if entities is None or ENTITY_TAG in entities:
+            self._stale = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._by_name.clear()
+            self._sorted = None
+            self._version = None
+            self._checked_at = 0.0
+
+    def reload(self, db: Session) -> None:
+        version = get_data_versions(db, [ENTITY_TAG])[ENTITY_TAG]
+        tags = db.query(Tag.id, Tag.name, Tag.color).all()
+        with self._lock:
+            self._by_id = {
+                tag_id: TagResponse.model_construct(id=tag_id, name=name, color=color)
+                for tag_id, name, color in tags
+            }
+            self._by_name = {tag.name: tag.id for tag in self._by_id.values()}
+            self._sorted = None
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self, db: Session) -> None:
+        if self._version is None:
+            self.reload(db)
+            return
+
+        now = time.monotonic()
+        if not self._stale and now - self._checked_at < self.check_interval:
+            return
+        self._stale = False
+
+        version = get_data_versions(db, [ENTITY_TAG])[ENTITY_TAG]
+        if version != self._version:
+            self.reload(db)
+        else:
+            self._checked_at = now
+
+
+_registries: Dict[str, TagRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_tag_registry(db: Session) -> TagRegistry:
+    """取得此資料庫對應的標籤快取"""
+    key = str(db.get_bind().url)
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = _registries[key] = TagRegistry()
+                subscribe(registry.invalidate)
+    return registry
+
+
+def clear_tag_registries() -> None:
+    with _registries_lock:
+        for registry in _registries.values():
+            registry.clear()
+
+
+def drop_tag_registry(database_url: str) -> None:
+    """移除已關閉資料庫的標籤快取（租戶 Engine 被逐出時呼叫）"""
+    with _registries_lock:
+        registry = _registries.pop(database_url, None)
+    if registry is not None:
+        unsubscribe(registry.invalidate)
@@ -1,38 +1,92 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased
 
-from ..models.tag import Tag
-from ..schemas.tag import TagCreate, TagResponse, TagUpdate
+from ..exceptions import TagNotFoundException, ValidationException
+from ..models.tag import Tag, WorkTag
+from ..models.work import Work
+from ..schemas.tag import (
+    TagBulkResult,
+    TagCreate,
+    TagResponse,
+    TagUpdate,
+    TagWithCountResponse,
+)
+from .change_log import (
+    ENTITY_TAG,
+    ENTITY_WORK,
+    OP_DELETE,
+    record_change,
+    record_changes,
+)
+from .tag_cache import get_tag_registry
+
+
+def adjust_tag_usage(db: Session, tag_ids: Iterable[int], delta: int) -> None:
+    """在目前交易中調整標籤的使用次數"""
+    tag_ids = list(tag_ids)
+    if tag_ids and delta:
+        db.execute(
+            update(Tag)
+            .where(Tag.id.in_(tag_ids))
+            .values(usage_count=Tag.usage_count + delta)
+        )
+
+
+def _count_links(tag_id):
+    return (
+        select(func.count())
+        .select_from(WorkTag)
+        .where(WorkTag.tag_id == tag_id)
+        .scalar_subquery()
+    )
 
 
 class TagService:
     def __init__(self, db: Session):
         self.db = db
+        self.registry = get_tag_registry(db)
 
     def create_tag(self, tag_data: TagCreate) -> TagResponse:
         """建立新標籤"""
         tag = Tag(name=tag_data.name, color=tag_data.color)
 
         self.db.add(tag)
+        self.db.flush()
+        entry = record_change(self.db, ENTITY_TAG, tag.id)
+        self.db.flush()
+        version = entry.id
+        response = TagResponse(id=tag.id, name=tag.name, color=tag.color)
         self.db.commit()
-        self.db.refresh(tag)
 
-        return TagResponse(id=tag.id, name=tag.name, color=tag.color)
+        self.registry.put(response, self.db, version)
+        return response
 
     def get_tags(self) -> List[TagResponse]:
         """取得所有標籤"""
-        tags = self.db.query(Tag).order_by(Tag.name).all()
+        return self.registry.tags(self.db)
 
-        return [TagResponse(id=tag.id, name=tag.name, color=tag.color) for tag in tags]
+    def get_tags_with_counts(self) -> List[TagWithCountResponse]:
+        """取得所有標籤及其使用次數"""
+        rows = (
+            self.db.query(Tag.id, Tag.name, Tag.color, Tag.usage_count)
+            .order_by(Tag.name)
+            .all()
+        )
+        return [
+            TagWithCountResponse.model_construct(
+                id=tag_id, name=name, color=color, usage_count=usage_count
+            )
+            for tag_id, name, color, usage_count in rows
+        ]
 
     def get_tag(self, tag_id: int) -> Optional[TagResponse]:
         """取得單一標籤"""
-        tag = self.db.query(Tag).filter(Tag.id == tag_id).first()
-
-        if tag:
-            return TagResponse(id=tag.id, name=tag.name, color=tag.color)
-        return None
+        tag = self.registry.get(self.db, tag_id)
+        if tag is None and not self.registry.missing(self.db, [tag_id]):
+            tag = self.registry.get(self.db, tag_id)
+        return tag
 
     def update_tag(self, tag_id: int, tag_data: TagUpdate) -> Optional[TagResponse]:
         """更新標籤"""
@@ -46,19 +100,187 @@ class TagService:
         for field, value in update_data.items():
             setattr(tag, field, value)
 
+        entry = record_change(self.db, ENTITY_TAG, tag_id)
+        self.db.flush()
+        version = entry.id
+        response = TagResponse(id=tag.id, name=tag.name, color=tag.color)
         self.db.commit()
-        self.db.refresh(tag)
 
-        return TagResponse(id=tag.id, name=tag.name, color=tag.color)
+        self.registry.put(response, self.db, version)
+        return response
 
     def delete_tag(self, tag_id: int) -> bool:
-        """刪除標籤"""
+        """刪除標籤，並一併移除作品上的此標籤"""
         tag = self.db.query(Tag).filter(Tag.id == tag_id).first()
 
         if not tag:
             return False
 
+        affected_work_ids = self._linked_work_ids([tag_id])
+        self.db.query(WorkTag).filter(WorkTag.tag_id == tag_id).delete(
+            synchronize_session=False
+        )
         self.db.delete(tag)
+        entry = record_change(self.db, ENTITY_TAG, tag_id, OP_DELETE)
+        record_changes(self.db, ENTITY_WORK, affected_work_ids)
+        self.db.flush()
+        version = entry.id
         self.db.commit()
 
+        self.registry.remove(tag_id, self.db, version)
         return True
+
+    def merge_tags(self, source_ids: List[int], target_id: int) -> TagBulkResult:
+        """將來源標籤併入目標標籤：作品改掛目標標籤，來源標籤刪除"""
+        source_ids = list(dict.fromkeys(source_ids))
+        if target_id in source_ids:
+            raise ValidationException("Target tag cannot be one of the source tags")
+        self._require_tags([target_id, *source_ids])
+
+        affected_work_ids = self._linked_work_ids(source_ids)
+
+        # 已有目標標籤的作品不重複新增
+        self.db.execute(
+            insert(WorkTag).from_select(
+                ["work_id", "tag_id"],
+                select(WorkTag.work_id, literal(target_id))
+                .where(WorkTag.tag_id.in_(source_ids))
+                .where(~self._has_link(WorkTag.work_id, target_id))
+                .distinct(),
+            )
+        )
+        self.db.query(WorkTag).filter(WorkTag.tag_id.in_(source_ids)).delete(
+            synchronize_session=False
+        )
+        self.db.query(Tag).filter(Tag.id.in_(source_ids)).delete(
+            synchronize_session=False
+        )
+        self.db.execute(
+            update(Tag)
+            .where(Tag.id == target_id)
+            .values(usage_count=_count_links(target_id))
+        )
+
+        record_changes(self.db, ENTITY_TAG, source_ids, OP_DELETE)
+        record_changes(self.db, ENTITY_WORK, affected_work_ids)
+        result = TagBulkResult(
+            tag=self._tag_with_count(target_id), affected_works=len(affected_work_ids)
+        )
+        self.db.commit()
+
+        for source_id in source_ids:
+            self.registry.remove(source_id)
+        return result
+
+    def rename_tag(self, tag_id: int, name: str) -> TagBulkResult:
+        """重新命名標籤；若名稱已被其他標籤使用，則併入該標籤"""
+        self._require_tags([tag_id])
+        existing_id = (
+            self.db.query(Tag.id).filter(Tag.name == name, Tag.id != tag_id).scalar()
+        )
+        if existing_id is not None:
+            return self.merge_tags([tag_id], existing_id)
+
+        self.db.execute(update(Tag).where(Tag.id == tag_id).values(name=name))
+        entry = record_change(self.db, ENTITY_TAG, tag_id)
+        affected_work_ids = self._linked_work_ids([tag_id])
+        record_changes(self.db, ENTITY_WORK, affected_work_ids)
+        tag = self._tag_with_count(tag_id)
+        self.db.flush()
+        version = entry.id
+        self.db.commit()
+
+        self.registry.put(
+            TagResponse(id=tag.id, name=tag.name, color=tag.color), self.db, version
+        )
+        return TagBulkResult(tag=tag, affected_works=len(affected_work_ids))
+
+    def apply_tag(self, tag_id: int, work_ids: List[str]) -> TagBulkResult:
+        """為多個作品加上標籤（已有此標籤或不存在的作品略過）"""
+        self._require_tags([tag_id])
+        work_ids = list(dict.fromkeys(work_ids))
+
+        affected_work_ids = [
+            work_id
+            for (work_id,) in self.db.query(Work.id).filter(
+                Work.id.in_(work_ids), ~self._has_link(Work.id, tag_id)
+            )
+        ]
+        if affected_work_ids:
+            self.db.execute(
+                insert(WorkTag),
+                [
+                    {"work_id": work_id, "tag_id": tag_id}
+                    for work_id in affected_work_ids
+                ],
+            )
+            adjust_tag_usage(self.db, [tag_id], len(affected_work_ids))
+            record_changes(self.db, ENTITY_WORK, affected_work_ids)
+
+        result = TagBulkResult(
+            tag=self._tag_with_count(tag_id), affected_works=len(affected_work_ids)
+        )
+        self.db.commit()
+        return result
+
+    def remove_tag(self, tag_id: int, work_ids: List[str]) -> TagBulkResult:
+        """從多個作品移除標籤"""
+        self._require_tags([tag_id])
+        work_ids = list(dict.fromkeys(work_ids))
+
+        affected_work_ids = [
+            work_id
+            for (work_id,) in self.db.query(WorkTag.work_id).filter(
+                WorkTag.tag_id == tag_id, WorkTag.work_id.in_(work_ids)
+            )
+        ]
+        if affected_work_ids:
+            self.db.query(WorkTag).filter(
+                WorkTag.tag_id == tag_id, WorkTag.work_id.in_(affected_work_ids)
+            ).delete(synchronize_session=False)
+            adjust_tag_usage(self.db, [tag_id], -len(affected_work_ids))
+            record_changes(self.db, ENTITY_WORK, affected_work_ids)
+
+        result = TagBulkResult(
+            tag=self._tag_with_count(tag_id), affected_works=len(affected_work_ids)
+        )
+        self.db.commit()
+        return result
+
+    def recount_usage(self) -> None:
+        """依 work_tags 重新計算所有標籤的使用次數（維護用）"""
+        self.db.execute(update(Tag).values(usage_count=_count_links(Tag.id)))
+        self.db.commit()
+
+    def _require_tags(self, tag_ids: List[int]) -> None:
+        existing = {
+            tag_id for (tag_id,) in self.db.query(Tag.id).filter(Tag.id.in_(tag_ids))
+        }
+        for tag_id in tag_ids:
+            if tag_id not in existing:
+                raise TagNotFoundException(tag_id)
+
+    def _linked_work_ids(self, tag_ids: List[int]) -> List[str]:
+        return [
+            work_id
+            for (work_id,) in self.db.query(WorkTag.work_id)
+            .filter(WorkTag.tag_id.in_(tag_ids))
+            .distinct()
+        ]
+
+    @staticmethod
+    def _has_link(work_id_column, tag_id: int):
+        link = aliased(WorkTag)
+        return exists().where(
+            and_(link.work_id == work_id_column, link.tag_id == tag_id)
+        )
+
+    def _tag_with_count(self, tag_id: int) -> TagWithCountResponse:
+        tag_id, name, color, usage_count = (
+            self.db.query(Tag.id, Tag.name, Tag.color, Tag.usage_count)
+            .filter(Tag.id == tag_id)
+            .one()
+        )
+        return TagWithCountResponse(
+            id=tag_id, name=name, color=color, usage_count=usage_count
+        )
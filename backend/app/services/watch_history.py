@@ -0,0 +1,186 @@
+"""Watch history and time-series rollups.
+
+Every progress change made through ``WorkService`` appends a ``WatchEvent``
+(episode delta and minutes watched) and, in the same transaction, adds the
+delta to the daily and monthly rollup rows with an upsert. Timeline queries
+read the rollups, so their cost depends on the number of periods requested,
+not on the size of the history. Periods are UTC.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..exceptions import ValidationException
+from ..models.watch_event import WatchDaily, WatchEvent, WatchMonthly
+
+GRANULARITIES = {"day": WatchDaily, "month": WatchMonthly}
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def day_key(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+def month_key(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def month_key_for(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def _upsert(db: Session, rollup, period: str, episodes: int, minutes: int, events: int):
+    values = {
+        "period": period,
+        "episodes": episodes,
+        "minutes": minutes,
+        "events": events,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert_factory = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        statement = insert_factory(rollup).values(**values)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[rollup.period],
+                set_={
+                    column: getattr(rollup, column) + statement.excluded[column]
+                    for column in ("episodes", "minutes", "events")
+                },
+            )
+        )
+        return
+
+    updated = db.execute(
+        update(rollup)
+        .where(rollup.period == period)
+        .values(
+            episodes=rollup.episodes + episodes,
+            minutes=rollup.minutes + minutes,
+            events=rollup.events + events,
+        )
+    ).rowcount
+    if not updated:
+        db.execute(insert(rollup).values(**values))
+
+
+def add_to_rollups(
+    db: Session, watched_at: datetime, episodes: int, minutes: int, events: int = 1
+) -> None:
+    """將一筆觀看事件累加到每日與每月彙總（與事件在同一交易）"""
+    _upsert(db, WatchDaily, day_key(watched_at), episodes, minutes, events)
+    _upsert(db, WatchMonthly, month_key(watched_at), episodes, minutes, events)
+
+
+def record_watch(
+    db: Session,
+    work_id: str,
+    episodes: int,
+    minutes: int = 0,
+    watched_at: Optional[datetime] = None,
+) -> None:
+    """新增觀看事件並更新彙總；集數沒有變化時不記錄"""
+    if not episodes:
+        return
+    watched_at = watched_at or utcnow()
+    db.execute(
+        insert(WatchEvent).values(
+            work_id=work_id, episodes=episodes, minutes=minutes, watched_at=watched_at
+        )
+    )
+    add_to_rollups(db, watched_at, episodes, minutes)
+
+
+class WatchHistoryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def timeline(
+        self,
+        granularity: str = "day",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict:
+        """從彙總表讀取觀看時間軸（預設最近 30 天或 12 個月）"""
+        rollup = GRANULARITIES.get(granularity)
+        if rollup is None:
+            raise ValidationException(
+                f"Invalid granularity: {granularity}. Must be one of: day, month"
+            )
+
+        end = end or utcnow().date()
+        if start is None and granularity == "day":
+            start = end - timedelta(days=29)
+        elif start is None:
+            year, month = divmod(end.year * 12 + end.month - 12, 12)
+            start = date(year, month + 1, 1)
+        if start > end:
+            raise ValidationException("start must not be after end")
+
+        key = (lambda d: d.isoformat()) if granularity == "day" else month_key_for
+        rows = self.db.execute(
+            select(rollup.period, rollup.episodes, rollup.minutes, rollup.events)
+            .where(rollup.period.between(key(start), key(end)))
+            .order_by(rollup.period)
+        ).all()
+
+        points: List[Dict] = [
+            {
+                "period": period,
+                "episodes": episodes,
+                "minutes": minutes,
+                "events": events,
+            }
+            for period, episodes, minutes, events in rows
+        ]
+        return {
+            "granularity": granularity,
+            "start": key(start),
+            "end": key(end),
+            "points": points,
+            "totals": {
+                "episodes": sum(point["episodes"] for point in points),
+                "minutes": sum(point["minutes"] for point in points),
+                "events": sum(point["events"] for point in points),
+            },
+        }
+
+    def rebuild_rollups(self) -> int:
+        """由事件表重新計算全部彙總（修復用），回傳事件數"""
+        self.db.execute(WatchDaily.__table__.delete())
+        self.db.execute(WatchMonthly.__table__.delete())
+        events = self.db.execute(
+            select(WatchEvent.watched_at, WatchEvent.episodes, WatchEvent.minutes)
+        ).all()
+
+        daily: Dict[str, List[int]] = {}
+        monthly: Dict[str, List[int]] = {}
+        for watched_at, episodes, minutes in events:
+            if watched_at.tzinfo is None:
+                watched_at = watched_at.replace(tzinfo=timezone.utc)
+            for totals, period in (
+                (daily, day_key(watched_at)),
+                (monthly, month_key(watched_at)),
+            ):
+                bucket = totals.setdefault(period, [0, 0, 0])
+                bucket[0] += episodes
+                bucket[1] += minutes
+                bucket[2] += 1
+
+        for rollup, totals in ((WatchDaily, daily), (WatchMonthly, monthly)):
+            rows = [
+                {"period": period, "episodes": e, "minutes": m, "events": n}
+                for period, (e, m, n) in totals.items()
+            ]
+            if rows:
+                self.db.execute(insert(rollup), rows)
+        self.db.commit()
+        return len(events)
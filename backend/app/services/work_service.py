@@ -1,17 +1,123 @@
+import uuid
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import JSON, Integer, and_, case, cast, delete, func, literal
+from sqlalchemy import Numeric, insert, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..models.tag import Tag, WorkTag
+from ..models.tag import WorkTag
+from ..models.watch_event import WatchEvent
 from ..models.work import Work
-from ..schemas.work import WorkCreate, WorkList, WorkResponse, WorkUpdate
+from ..schemas.work import (
+    SimilarWork,
+    SimilarWorks,
+    WorkCreate,
+    WorkList,
+    WorkProgressResponse,
+    WorkResponse,
+    WorkUpdate,
+)
 from ..exceptions import (
     WorkNotFoundException,
     TagNotFoundException,
     DatabaseException,
+    DuplicateWorkException,
 )
 from ..utils.logger import logger
+from ..utils.title_key import title_key
+from .change_log import ENTITY_WORK, OP_DELETE, record_change
+from .duplicates import (
+    ON_DUPLICATE_ALLOW,
+    ON_DUPLICATE_ERROR,
+    ON_DUPLICATE_MERGE,
+    validate_on_duplicate,
+)
+from .reminder_service import schedule_for
+from .similarity import get_similarity_index
+from .tag_cache import get_tag_registry
+from .tag_service import adjust_tag_usage
+from .watch_history import add_to_rollups, record_watch, utcnow
+
+
+STATUS_COMPLETED = "已完結"
+
+
+def _episode(progress: Optional[Dict[str, Any]]) -> int:
+    try:
+        return int((progress or {}).get("episode") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _progress_delta(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+    """回傳 (集數變化, 觀看分鐘數)，分鐘數依新進度的每集長度計算"""
+    episodes = _episode(new) - _episode(old if isinstance(old, dict) else None)
+    try:
+        duration = int((new or {}).get("duration") or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    return episodes, episodes * duration
+
+
+class ProgressSQL:
+    """在資料庫內讀寫 progress JSON 的運算式（SQLite 用 json_*，PostgreSQL 用 jsonb）"""
+
+    def __init__(self, dialect_name: str):
+        if dialect_name == "postgresql":
+            progress = cast(Work.progress, JSONB)
+            self._fields = progress
+            self._base = case(
+                (func.jsonb_typeof(progress) == "object", progress),
+                else_=literal_column("'{}'::jsonb"),
+            )
+            self.postgres = True
+        else:
+            self._base = case(
+                (func.json_type(Work.progress) == "object", Work.progress),
+                else_=literal_column("'{}'"),
+            )
+            self.postgres = False
+
+    def field(self, key: str):
+        """progress 中的整數欄位；非數字的值（例如 "第三集"）視為 NULL，不讓轉型失敗"""
+        if self.postgres:
+            value = self._fields[key]
+            text = value.astext
+            number = cast(text, Numeric)
+            # CASE 依序求值（AND 則不保證），先確認型別再轉型
+            return case(
+                (
+                    func.jsonb_typeof(value) == "number",
+                    case((func.abs(number) < 2**31, cast(number, Integer))),
+                ),
+                (text.regexp_match(r"^\s*-?[0-9]{1,9}\s*$"), cast(text, Integer)),
+            )
+        path = f"$.{key}"
+        value = func.json_extract(Work.progress, path)
+        kind = func.json_type(Work.progress, path)
+        return case(
+            # 不用 IN：展開的參數無法搭配 executemany（enrichment 的批次 UPDATE）
+            (or_(kind == "integer", kind == "real"), cast(value, Integer)),
+            (
+                and_(kind == "text", value != "", value.op("NOT GLOB")("*[^0-9]*")),
+                cast(value, Integer),
+            ),
+        )
+
+    def with_episode(self, episode):
+        return self.with_field("episode", episode)
+
+    def with_field(self, key: str, value):
+        if self.postgres:
+            return cast(
+                func.jsonb_set(
+                    self._base, literal_column(f"'{{{key}}}'"), func.to_jsonb(value)
+                ),
+                JSON,
+            )
+        return func.json_set(self._base, f"$.{key}", value)
 
 
 class WorkService:
@@ -24,30 +130,40 @@ class WorkService:
             return []
 
         unique_tag_ids = list(dict.fromkeys(tag_ids))
-        existing_tag_ids = {
-            tag_id
-            for (tag_id,) in self.db.query(Tag.id)
-            .filter(Tag.id.in_(unique_tag_ids))
-            .all()
-        }
-        missing_tag_ids = [
-            tag_id for tag_id in unique_tag_ids if tag_id not in existing_tag_ids
-        ]
+        missing_tag_ids = get_tag_registry(self.db).missing(self.db, unique_tag_ids)
         if missing_tag_ids:
             raise TagNotFoundException(missing_tag_ids[0])
 
         return unique_tag_ids
 
-    def create_work(self, work_data: WorkCreate) -> WorkResponse:
-        """建立新作品"""
-        logger.info(f"Creating work: {work_data.title}")
+    def create_work(
+        self, work_data: WorkCreate, on_duplicate: str = ON_DUPLICATE_ERROR
+    ) -> WorkResponse:
+        """建立新作品；同類型已有相同正規化標題時依 on_duplicate 報錯、合併或照常建立"""
+        logger.info("Creating work: %s", work_data.title)
+        validate_on_duplicate(on_duplicate)
         
         try:
             tag_ids = self._validate_tag_ids(work_data.tag_ids)
-
-            # 建立作品
+            key = title_key(work_data.title)
+
+            if on_duplicate != ON_DUPLICATE_ALLOW:
+                existing = self.db.scalars(
+                    select(Work)
+                    .where(Work.title_key == key, Work.type == work_data.type)
+                    .order_by(Work.date_added, Work.id)
+                    .limit(1)
+                ).first()
+                if existing is not None:
+                    if on_duplicate != ON_DUPLICATE_MERGE:
+                        raise DuplicateWorkException(existing.title)
+                    return self._merge_into(existing, work_data, tag_ids)
+
+            # 建立作品（預先產生 ID，讓標籤關聯與變更紀錄在同一次 flush 寫入）
             work = Work(
+                id=str(uuid.uuid4()),
                 title=work_data.title,
+                title_key=key,
                 type=work_data.type,
                 status=work_data.status,
                 year=work_data.year,
@@ -58,27 +174,63 @@ class WorkService:
                 source=work_data.source,
                 reminder_enabled=work_data.reminder_enabled,
                 reminder_frequency=work_data.reminder_frequency,
+                next_reminder_at=schedule_for(
+                    work_data.reminder_enabled, work_data.reminder_frequency
+                ),
             )
-
             self.db.add(work)
-            self.db.commit()
-            self.db.refresh(work)
 
             # 處理標籤關聯
-            if tag_ids:
-                for tag_id in tag_ids:
-                    work_tag = WorkTag(work_id=work.id, tag_id=tag_id)
-                    self.db.add(work_tag)
-                self.db.commit()
-
-            logger.info(f"Work created successfully: {work.id}")
-            return self._work_to_response(work)
-            
+            self.db.add_all(
+                WorkTag(work_id=work.id, tag_id=tag_id) for tag_id in tag_ids
+            )
+            adjust_tag_usage(self.db, tag_ids, 1)
+            record_change(self.db, ENTITY_WORK, work.id)
+
+            # date_added 等伺服器預設值由 INSERT ... RETURNING 取回，不需再 refresh
+            self.db.flush()
+            response = self._work_to_response(work, tag_ids)
+            self.db.commit()
+
+            logger.info("Work created successfully: %s", work.id)
+            return response
+
         except SQLAlchemyError as e:
-            logger.error(f"Database error creating work: {str(e)}")
+            logger.error("Database error creating work: %s", e)
             self.db.rollback()
             raise DatabaseException(f"Failed to create work: {str(e)}")
 
+    def _merge_into(
+        self, work: Work, work_data: WorkCreate, tag_ids: List[int]
+    ) -> WorkResponse:
+        """合併至既有作品：只補上空白欄位並加入缺少的標籤，不覆寫既有資料"""
+        logger.info("Merging duplicate of %s into work %s", work_data.title, work.id)
+
+        for field in ("year", "progress", "rating", "review", "note", "source"):
+            value = getattr(work_data, field)
+            if value is not None and getattr(work, field) is None:
+                setattr(work, field, value)
+
+        current_tag_ids = [
+            tag_id
+            for (tag_id,) in self.db.query(WorkTag.tag_id).filter(
+                WorkTag.work_id == work.id
+            )
+        ]
+        linked = set(current_tag_ids)
+        added_tag_ids = [tag_id for tag_id in tag_ids if tag_id not in linked]
+        self.db.add_all(
+            WorkTag(work_id=work.id, tag_id=tag_id) for tag_id in added_tag_ids
+        )
+        adjust_tag_usage(self.db, added_tag_ids, 1)
+
+        if added_tag_ids or self.db.is_modified(work):
+            record_change(self.db, ENTITY_WORK, work.id)
+        self.db.flush()
+        response = self._work_to_response(work, current_tag_ids + added_tag_ids)
+        self.db.commit()
+        return response
+
     def get_works(
         self,
         page: int = 1,
@@ -107,22 +259,34 @@ class WorkService:
         # 計算總數
         total = query.count()
 
-        # 分頁
+        # 分頁（一次預先載入整頁的標籤關聯，標籤內容由快取提供）
         offset = (page - 1) * size
-        works = query.offset(offset).limit(size).all()
+        works = (
+            query.options(selectinload(Work.tags))
+            .offset(offset)
+            .limit(size)
+            .all()
+        )
 
         # 轉換為回應格式
         work_responses = [self._work_to_response(work) for work in works]
 
-        return WorkList(works=work_responses, total=total, page=page, size=size)
+        return WorkList.model_construct(
+            works=work_responses, total=total, page=page, size=size
+        )
 
     def get_work(self, work_id: str) -> Optional[WorkResponse]:
         """取得單一作品"""
-        logger.debug(f"Fetching work: {work_id}")
+        logger.debug("Fetching work: %s", work_id)
         
-        work = self.db.query(Work).filter(Work.id == work_id).first()
+        work = (
+            self.db.query(Work)
+            .options(selectinload(Work.tags))
+            .filter(Work.id == work_id)
+            .first()
+        )
         if not work:
-            logger.warning(f"Work not found: {work_id}")
+            logger.warning("Work not found: %s", work_id)
             raise WorkNotFoundException(work_id)
         
         return self._work_to_response(work)
@@ -142,77 +306,260 @@ class WorkService:
             self._validate_tag_ids(tag_ids) if tag_ids is not None else None
         )
 
-        for field, value in update_data.items():
-            setattr(work, field, value)
-
-        # 處理標籤更新
-        if validated_tag_ids is not None:
-            # 刪除現有標籤關聯
-            self.db.query(WorkTag).filter(WorkTag.work_id == work_id).delete()
-
-            # 新增標籤關聯
-            for tag_id in validated_tag_ids:
-                work_tag = WorkTag(work_id=work_id, tag_id=tag_id)
-                self.db.add(work_tag)
-
-        self.db.commit()
-        self.db.refresh(work)
+        try:
+            # 進度變動時記錄觀看事件
+            if "progress" in update_data:
+                episodes, minutes = _progress_delta(work.progress, update_data["progress"])
+                record_watch(self.db, work_id, episodes, minutes)
+
+            for field, value in update_data.items():
+                setattr(work, field, value)
+            if "title" in update_data:
+                work.title_key = title_key(work.title)
+
+            # 提醒設定有變動時重新排程
+            if update_data.keys() & {"reminder_enabled", "reminder_frequency"}:
+                work.next_reminder_at = schedule_for(
+                    work.reminder_enabled, work.reminder_frequency
+                )
+
+            # 處理標籤更新（只增刪有變動的關聯，並同步使用次數）
+            if validated_tag_ids is not None:
+                current_tag_ids = {
+                    tag_id
+                    for (tag_id,) in self.db.query(WorkTag.tag_id).filter(
+                        WorkTag.work_id == work_id
+                    )
+                }
+                removed_tag_ids = current_tag_ids - set(validated_tag_ids)
+                added_tag_ids = [
+                    tag_id
+                    for tag_id in validated_tag_ids
+                    if tag_id not in current_tag_ids
+                ]
+
+                if removed_tag_ids:
+                    self.db.query(WorkTag).filter(
+                        WorkTag.work_id == work_id,
+                        WorkTag.tag_id.in_(removed_tag_ids),
+                    ).delete(synchronize_session=False)
+                    adjust_tag_usage(self.db, removed_tag_ids, -1)
+
+                self.db.add_all(
+                    WorkTag(work_id=work_id, tag_id=tag_id) for tag_id in added_tag_ids
+                )
+                adjust_tag_usage(self.db, added_tag_ids, 1)
+
+            record_change(self.db, ENTITY_WORK, work_id)
+
+            # date_updated 由 UPDATE ... RETURNING 取回，單次提交
+            self.db.flush()
+            response = self._work_to_response(work, validated_tag_ids)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            logger.error("Database error updating work: %s", e)
+            self.db.rollback()
+            raise DatabaseException(f"Failed to update work: {str(e)}")
 
-        return self._work_to_response(work)
+        return response
 
     def delete_work(self, work_id: str) -> bool:
         """刪除作品"""
-        work = self.db.query(Work).filter(Work.id == work_id).first()
-        if not work:
-            return False
+        try:
+            # 刪除標籤關聯，並取回被移除的標籤以更新使用次數
+            unlink = delete(WorkTag).where(WorkTag.work_id == work_id)
+            if self.db.get_bind().dialect.delete_returning:
+                tag_ids = self.db.scalars(unlink.returning(WorkTag.tag_id)).all()
+            else:
+                tag_ids = self.db.scalars(
+                    select(WorkTag.tag_id).where(WorkTag.work_id == work_id)
+                ).all()
+                self.db.execute(unlink)
+
+            # 刪除作品
+            deleted = self.db.execute(delete(Work).where(Work.id == work_id)).rowcount
+            if not deleted:
+                self.db.rollback()
+                return False
+
+            adjust_tag_usage(self.db, tag_ids, -1)
+            record_change(self.db, ENTITY_WORK, work_id, OP_DELETE)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            logger.error("Database error deleting work: %s", e)
+            self.db.rollback()
+            raise DatabaseException(f"Failed to delete work: {str(e)}")
 
-        # 刪除標籤關聯
-        self.db.query(WorkTag).filter(WorkTag.work_id == work_id).delete()
+        return True
 
-        # 刪除作品
-        self.db.delete(work)
-        self.db.commit()
+    def increment_progress(self, work_id: str, by: int = 1) -> WorkProgressResponse:
+        """集數加減 by（不超過總集數、不小於 0）"""
+        return self._update_progress(
+            work_id, lambda current, total: func.coalesce(current, 0) + by
+        )
 
-        return True
+    def set_progress(self, work_id: str, episode: int) -> WorkProgressResponse:
+        """直接設定目前集數"""
+        return self._update_progress(
+            work_id, lambda current, total: literal(episode, Integer)
+        )
 
-    def get_stats(self) -> Dict[str, Any]:
-        """取得統計資訊"""
-        from sqlalchemy import func
+    def complete_progress(self, work_id: str) -> WorkProgressResponse:
+        """標記為已看完：集數設為總集數（若有）並轉為已完結"""
+        return self._update_progress(
+            work_id,
+            lambda current, total: func.coalesce(total, current, 0),
+            complete=True,
+        )
 
-        total_works = self.db.query(Work).count()
+    def _update_progress(
+        self, work_id: str, new_episode, complete: bool = False
+    ) -> WorkProgressResponse:
+        """以單一 UPDATE 在資料庫內改寫 progress.episode，到最後一集時自動轉為已完結
+
+        不先載入作品，也不重建完整回應；並行的兩次 +1 不會互相覆蓋。
+        """
+        progress = ProgressSQL(self.db.get_bind().dialect.name)
+        current = progress.field("episode")
+        total = progress.field("total_episode")
+        requested = new_episode(current, total)
+        episode = case(
+            (and_(total.is_not(None), requested > total), total),
+            (requested < 0, 0),
+            else_=requested,
+        )
+        if complete:
+            status = STATUS_COMPLETED
+        else:
+            status = case(
+                (and_(total.is_not(None), episode >= total), STATUS_COMPLETED),
+                else_=Work.status,
+            )
 
-        # 按類型統計
-        type_stats = (
-            self.db.query(Work.type, func.count(Work.id)).group_by(Work.type).all()
+        # 先以 INSERT ... SELECT 由目前的資料列算出集數變化，寫入觀看事件
+        delta = episode - func.coalesce(current, 0)
+        watched_at = utcnow()
+        event_row = (
+            select(
+                Work.id,
+                delta.label("episodes"),
+                (delta * func.coalesce(progress.field("duration"), 0)).label(
+                    "minutes"
+                ),
+                literal(watched_at, WatchEvent.watched_at.type),
+            )
+            .where(Work.id == work_id, delta != 0)
+            .with_for_update()
         )
 
-        # 按狀態統計
-        status_stats = (
-            self.db.query(Work.status, func.count(Work.id)).group_by(Work.status).all()
+        statement = (
+            update(Work)
+            .where(Work.id == work_id)
+            .values(progress=progress.with_episode(episode), status=status)
+            .execution_options(synchronize_session=False)
         )
+        columns = (Work.id, Work.progress, Work.status, Work.date_updated)
+
+        dialect = self.db.get_bind().dialect
+        try:
+            if dialect.insert_returning:
+                event = self.db.execute(
+                    insert(WatchEvent)
+                    .from_select(
+                        ["work_id", "episodes", "minutes", "watched_at"], event_row
+                    )
+                    .returning(WatchEvent.episodes, WatchEvent.minutes)
+                ).first()
+            else:
+                # 不支援 RETURNING：先鎖定並讀出集數變化，再寫入觀看事件
+                event = self.db.execute(event_row).first()
+                if event is not None:
+                    self.db.execute(
+                        insert(WatchEvent).values(
+                            work_id=work_id,
+                            episodes=event.episodes,
+                            minutes=event.minutes,
+                            watched_at=watched_at,
+                        )
+                    )
+            if dialect.update_returning:
+                row = self.db.execute(statement.returning(*columns)).first()
+            else:
+                updated = self.db.execute(statement).rowcount
+                row = (
+                    self.db.execute(select(*columns).where(Work.id == work_id)).first()
+                    if updated
+                    else None
+                )
+            if row is None:
+                self.db.rollback()
+                raise WorkNotFoundException(work_id)
+
+            if event is not None:
+                add_to_rollups(self.db, watched_at, event.episodes, event.minutes)
+            record_change(self.db, ENTITY_WORK, work_id)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            logger.error("Database error updating progress: %s", e)
+            self.db.rollback()
+            raise DatabaseException(f"Failed to update progress: {str(e)}")
 
-        # 按年份統計
-        year_stats = (
-            self.db.query(Work.year, func.count(Work.id)).group_by(Work.year).all()
+        return WorkProgressResponse.model_construct(
+            id=row.id,
+            progress=row.progress,
+            status=row.status,
+            date_updated=row.date_updated,
         )
 
-        return {
-            "total_works": total_works,
-            "type_stats": dict(type_stats),
-            "status_stats": dict(status_stats),
-            "year_stats": dict(year_stats),
+    def get_similar_works(self, work_id: str, limit: int = 10) -> SimilarWorks:
+        """依標籤、類型與年份的相似度取得相似作品（由記憶體索引計算）"""
+        index = get_similarity_index(self.db)
+        if work_id not in index:
+            raise WorkNotFoundException(work_id)
+
+        neighbours = index.similar(work_id, limit)
+        rows = {
+            row.id: row
+            for row in self.db.execute(
+                select(Work.id, Work.title, Work.type, Work.year).where(
+                    Work.id.in_([neighbour_id for neighbour_id, _ in neighbours])
+                )
+            )
         }
+        return SimilarWorks.model_construct(
+            work_id=work_id,
+            similar=[
+                SimilarWork.model_construct(
+                    id=neighbour_id,
+                    title=rows[neighbour_id].title,
+                    type=rows[neighbour_id].type,
+                    year=rows[neighbour_id].year,
+                    score=score,
+                )
+                for neighbour_id, score in neighbours
+                if neighbour_id in rows
+            ],
+        )
+
+    def get_stats(self, versions: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """取得統計資訊（與擴充統計共用單次彙總查詢與快取）"""
+        from .stats_service import StatsService
+
+        return StatsService(self.db).overview(versions)
+
+    def _work_to_response(
+        self, work: Work, tag_ids: Optional[List[int]] = None
+    ) -> WorkResponse:
+        """將 Work 模型轉換為 WorkResponse
 
-    def _work_to_response(self, work: Work) -> WorkResponse:
-        """將 Work 模型轉換為 WorkResponse"""
-        # 取得標籤
-        tags = []
-        for work_tag in work.tags:
-            tag = self.db.query(Tag).filter(Tag.id == work_tag.tag_id).first()
-            if tag:
-                tags.append({"id": tag.id, "name": tag.name, "color": tag.color})
+        資料來自資料庫且寫入時已驗證，使用 model_construct 略過重複驗證。
+        寫入路徑可直接傳入 tag_ids，避免再載入關聯。
+        """
+        if tag_ids is None:
+            tag_ids = [work_tag.tag_id for work_tag in work.tags]
+        tags = get_tag_registry(self.db).lookup(self.db, tag_ids)
 
-        return WorkResponse(
+        return WorkResponse.model_construct(
             id=work.id,
             title=work.title,
             type=work.type,
@@ -227,5 +574,10 @@ class WorkService:
             source=work.source,
             reminder_enabled=work.reminder_enabled,
             reminder_frequency=work.reminder_frequency,
+            next_reminder_at=work.next_reminder_at,
+            anilist_id=work.anilist_id,
+            cover_image=work.cover_image,
+            genres=work.genres,
+            enriched_at=work.enriched_at,
             tags=tags,
         )
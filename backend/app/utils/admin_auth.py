@@ -0,0 +1,40 @@
+"""Bearer-token guard for the ``/admin`` router.
+
+Admin routes trigger maintenance (VACUUM on every tenant, reminder runs,
+AniList enrichment), so they are only reachable with
+``Authorization: Bearer <ADMIN_TOKEN>``. Without ``ADMIN_TOKEN`` the router is
+disabled and answers 403.
+"""
+
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+_bearer = HTTPBearer(auto_error=False, description="ADMIN_TOKEN")
+
+
+def get_admin_token() -> Optional[str]:
+    return os.getenv("ADMIN_TOKEN") or None
+
+
+def require_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> None:
+    """檢查管理權杖；未設定 ADMIN_TOKEN 時停用所有管理端點"""
+    token = get_admin_token()
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled (ADMIN_TOKEN is not set)",
+        )
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), token.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
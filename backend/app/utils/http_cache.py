@@ -0,0 +1,103 @@
+"""Conditional GET support based on change-log data versions.
+
+Routes opt in with ``dependencies=[Depends(conditional_get(...))]``. The
+dependency derives a weak ETag from the data versions of the listed entities
+plus the request path and query string, and answers a matching
+``If-None-Match`` with ``304`` before the route body (and its services) run.
+``HTTPCacheMiddleware`` then stamps ``ETag``/``Cache-Control`` on the full
+response, so routes returning their own ``Response`` objects are covered too.
+"""
+
+import hashlib
+
+from fastapi import Depends, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..services.change_log import get_data_versions
+
+# 私有資料：瀏覽器可保存但每次都需以 If-None-Match 重新驗證，共用快取（nginx）不得保存
+CACHE_CONTROL = "private, no-cache"
+
+_STATE_KEY = "etag"
+
+
+class NotModified(Exception):
+    """Raised by ``conditional_get`` when the client copy is still current."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+        super().__init__(etag)
+
+
+def build_etag(request: Request, versions: dict) -> str:
+    query = "&".join(
+        f"{key}={value}" for key, value in sorted(request.query_params.multi_items())
+    )
+    version_key = ",".join(
+        f"{entity}:{versions[entity]}" for entity in sorted(versions)
+    )
+    # 啟用租戶時各裝置的資料版本各自獨立，需納入裝置 ID 以免 ETag 相撞
+    device_id = request.headers.get("x-device-id", "")
+    digest = hashlib.sha1(
+        f"{request.url.path}?{query}|{version_key}|{device_id}".encode("utf-8")
+    ).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    # 弱比較：忽略 W/ 前綴（nginx 壓縮後可能改寫）
+    opaque = etag[2:]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == opaque for candidate in candidates
+    )
+
+
+def conditional_get(*entities: str):
+    """建立依資料版本回應 304 的路由依賴"""
+
+    def dependency(request: Request, db: Session = Depends(get_db)) -> None:
+        versions = get_data_versions(db, entities)
+        etag = build_etag(request, versions)
+        request.state.etag = etag
+        # 路由可沿用已查得的資料版本（例如統計快取），不必再查一次
+        request.state.data_versions = versions
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            raise NotModified(etag)
+
+    return dependency
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": exc.etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+class HTTPCacheMiddleware:
+    """Adds the ETag computed by ``conditional_get`` to successful responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                etag = scope.get("state", {}).get(_STATE_KEY)
+                if etag:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"etag", etag.encode("latin-1")),
+                        (b"cache-control", CACHE_CONTROL.encode("latin-1")),
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -1,13 +1,124 @@
-"""Logging configuration for WatchedIt backend."""
+"""Logging configuration for WatchedIt backend.
 
+Log calls on the request path only build a ``LogRecord`` and put it on an
+in-memory queue; a background ``QueueListener`` thread, started by
+``start_logging()`` from the app lifespan, does the formatting and the
+console/file I/O. Importing this module opens no files. Output is one JSON object per line (set
+``LOG_FORMAT=text`` for the plain format), carries the current request ID and
+is written to a size-rotated file.
+
+Environment:
+    LOG_LEVEL: minimum level (default ``INFO``)
+    LOG_FORMAT: ``json`` (default) or ``text``
+    LOG_FILE: log file path (default ``logs/watchedit.log``)
+    LOG_MAX_BYTES / LOG_BACKUP_COUNT: rotation size and kept files
+    LOG_DEBUG_SAMPLE_RATE: fraction of DEBUG records kept (default ``1.0``)
+"""
+
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
+
+import orjson
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# 背景執行緒尚未啟動（或寫入跟不上）時最多暫存的紀錄數，超過即丟棄
+_QUEUE_SIZE = 10_000
+_queue: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# LogRecord 的標準屬性，其餘（extra=...）才會輸出到 JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+_plain_formatter = logging.Formatter()
+
+
+class RequestIdFilter(logging.Filter):
+    """在呼叫端（而非背景執行緒）附上目前請求的 ID"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """依比例抽樣 DEBUG 紀錄，避免高頻除錯事件塞滿佇列"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """只合併訊息參數；例外堆疊另存於 exc_text，交由背景執行緒排版"""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _plain_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in payload:
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = record.stack_info
+        return orjson.dumps(payload, default=str).decode()
+
+
+def _build_formatter() -> logging.Formatter:
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        return logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+    return JsonFormatter()
 
 
 def setup_logger(name: str = "watchedit") -> logging.Logger:
     """
-    Setup structured logger with console and file handlers.
+    Setup queue-based logger. No handlers or files are opened here; records
+    are buffered until ``start_logging()`` starts the background writer.
 
     Args:
         name: Logger name
@@ -16,35 +127,96 @@ def setup_logger(name: str = "watchedit") -> logging.Logger:
         Configured logger instance
     """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
 
+    # 請求路徑只負責入列，格式化與 I/O 交給背景執行緒
+    queue_handler = _QueueHandler(_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(
+        DebugSamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0")))
+    )
+    logger.addHandler(queue_handler)
+
+    return logger
+
+
+def start_logging() -> None:
+    """建立 console 與輪替檔案 handler 並啟動背景寫入執行緒（重複呼叫無作用）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = _build_formatter()
+
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-
-    # File handler
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    file_handler = logging.FileHandler(log_dir / "watchedit.log")
-    file_handler.setLevel(logging.DEBUG)
-
-    # Formatter
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
     console_handler.setFormatter(formatter)
+
+    # Rotating file handler（首次寫入時才開檔）
+    log_file = Path(os.getenv("LOG_FILE", "logs/watchedit.log"))
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8",
+        delay=True,
+    )
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    _listener = logging.handlers.QueueListener(
+        _queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
 
-    return logger
+
+def stop_logging() -> None:
+    """送出佇列中剩餘的紀錄並停止背景執行緒"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """沿用或產生 X-Request-ID，供日誌關聯同一請求"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
 
 
 # Global logger instance
 logger = setup_logger()
+atexit.register(stop_logging)
@@ -0,0 +1,291 @@
+"""Per-request performance instrumentation and Prometheus metrics.
+
+Enabled with ``METRICS_ENABLED=true``. When disabled nothing is installed:
+no middleware, no SQLAlchemy event listeners and no ``/metrics`` route, so the
+request path is unchanged.
+
+When enabled, ``MetricsMiddleware`` records a latency histogram per route
+template and emits a ``Server-Timing`` header with the time spent in the app,
+in SQL (via engine cursor events) and in upstream calls such as AniList
+(via ``track_upstream``).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}{labels} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._series[label_values] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                for index, bound in enumerate(self.buckets):
+                    labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {series[index]}")
+                labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+                count = series[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return "\n".join(lines)
+
+
+REQUEST_DURATION = Histogram(
+    "watchedit_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    labels=("method", "route", "status"),
+)
+SQL_DURATION = Histogram(
+    "watchedit_sql_statement_duration_seconds",
+    "SQL statement execution time.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+SQL_STATEMENTS_PER_REQUEST = Histogram(
+    "watchedit_sql_statements_per_request",
+    "Number of SQL statements executed per HTTP request.",
+    labels=("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+UPSTREAM_DURATION = Histogram(
+    "watchedit_upstream_request_duration_seconds",
+    "Latency of calls to upstream APIs such as AniList.",
+    labels=("upstream",),
+)
+UPSTREAM_ERRORS = Counter(
+    "watchedit_upstream_errors_total",
+    "Failed calls to upstream APIs.",
+    labels=("upstream",),
+)
+
+REGISTRY = [
+    REQUEST_DURATION,
+    SQL_DURATION,
+    SQL_STATEMENTS_PER_REQUEST,
+    UPSTREAM_DURATION,
+    UPSTREAM_ERRORS,
+]
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文字格式輸出所有指標"""
+    return "\n\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_seconds", "upstream_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.upstream_seconds: Dict[str, float] = {}
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "watchedit_request_stats", default=None
+)
+_installed = False
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+# SQL 計時 ------------------------------------------------------------------
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("watchedit_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["watchedit_query_start"].pop()
+    SQL_DURATION.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+
+
+def install_instrumentation() -> None:
+    """在所有 Engine 上註冊 SQL 計時事件，並啟用上游 API 計時"""
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+def uninstall_instrumentation() -> None:
+    global _installed
+    if _installed:
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = False
+
+
+# 上游 API 計時 ---------------------------------------------------------------
+
+
+@contextmanager
+def track_upstream(upstream: str) -> Iterator[None]:
+    """記錄一次上游 API 呼叫的耗時；未啟用指標時不做任何事"""
+    if not _installed:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(upstream)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_DURATION.observe(elapsed, upstream)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.upstream_seconds[upstream] = (
+                stats.upstream_seconds.get(upstream, 0.0) + elapsed
+            )
+
+
+# 中介層 ----------------------------------------------------------------------
+
+
+def _route_label(scope) -> str:
+    """以路由樣板（如 /works/{work_id}）作為標籤，避免高基數"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+
+    paths = getattr(app.state, "metrics_route_paths", None)
+    if paths is None:
+        paths = {}
+        for route in app.routes:
+            route_endpoint = getattr(route, "endpoint", None)
+            if route_endpoint is not None:
+                paths.setdefault(route_endpoint, route.path)
+        app.state.metrics_route_paths = paths
+    return paths.get(endpoint, "unmatched")
+
+
+def _server_timing(total: float, stats: RequestStats) -> str:
+    parts = [f"app;dur={total * 1000:.1f}"]
+    parts.append(
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"'
+    )
+    for upstream, seconds in stats.upstream_seconds.items():
+        parts.append(f"{upstream};dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = _server_timing(time.perf_counter() - started, stats)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = _route_label(scope)
+            REQUEST_DURATION.observe(elapsed, scope["method"], route, str(status_code))
+            SQL_STATEMENTS_PER_REQUEST.observe(stats.sql_count, route)
+            _request_stats.reset(token)
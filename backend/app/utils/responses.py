@@ -0,0 +1,31 @@
+"""Fast JSON responses for already-built response models."""
+
+from typing import Iterable, Sequence
+
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> ORJSONResponse:
+    """以 orjson 直接編碼回應模型，略過 FastAPI 對 response_model 的二次驗證"""
+    return ORJSONResponse(model.model_dump(), status_code=status_code)
+
+
+def models_response(models: Iterable[BaseModel]) -> ORJSONResponse:
+    """以 orjson 直接編碼回應模型列表"""
+    return ORJSONResponse([model.model_dump() for model in models])
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip，但略過已壓縮內容（例如圖片）的路徑前綴"""
+
+    def __init__(self, app, exclude_prefixes: Sequence[str] = (), **options):
+        super().__init__(app, **options)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
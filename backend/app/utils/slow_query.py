@@ -0,0 +1,220 @@
+"""Slow query log.
+
+``SQL_ECHO`` dumps every statement, which is unusable in production. Instead,
+setting ``SLOW_QUERY_THRESHOLD_MS`` installs engine cursor events that time
+each statement and keep those over the threshold in an in-memory ring buffer
+(``SLOW_QUERY_LOG_SIZE`` entries). Each entry records the normalized SQL, the
+shape of the parameters (never their values), the duration, the service
+method that issued it and the database's query plan. Entries are also logged
+and can be inspected through ``GET /admin/slow-queries``.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .logger import logger
+
+_APP_PACKAGE = __name__.split(".")[0]
+_START_KEY = "watchedit_slow_query_start"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(
+    r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)" r"(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def get_slow_query_threshold_ms() -> Optional[float]:
+    value = os.getenv("SLOW_QUERY_THRESHOLD_MS")
+    return float(value) if value else None
+
+
+def get_slow_query_log_size() -> int:
+    return int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+
+def slow_query_log_enabled() -> bool:
+    return get_slow_query_threshold_ms() is not None
+
+
+def normalize_sql(statement: str) -> str:
+    """去除字面值並合併 IN 清單，讓相同形狀的查詢歸為同一筆"""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """只保留參數的型別與數量，不記錄實際值"""
+    if executemany:
+        rows = list(parameters or [])
+        return {
+            "rows": len(rows),
+            "row": parameter_shape(rows[0]) if rows else None,
+        }
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def find_caller() -> Optional[str]:
+    """從呼叫堆疊找出發出查詢的服務方法（例如 WorkService.get_works）"""
+    services_prefix = f"{_APP_PACKAGE}.services."
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(services_prefix):
+            owner = frame.f_locals.get("self")
+            name = frame.f_code.co_name
+            if owner is not None:
+                return f"{type(owner).__name__}.{name}"
+            return f"{module.rsplit('.', 1)[-1]}.{name}"
+        if (
+            fallback is None
+            and module.startswith(f"{_APP_PACKAGE}.")
+            and not (module == __name__ or module.startswith(f"{_APP_PACKAGE}.utils."))
+        ):
+            fallback = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, size: int = 100):
+        self.threshold_ms = threshold_ms
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._entries.maxlen
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """由新到舊的紀錄"""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_log: Optional[SlowQueryLog] = None
+
+
+def get_slow_query_log() -> Optional[SlowQueryLog]:
+    return _log
+
+
+_EXPLAIN_SAVEPOINT = "watchedit_explain"
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[List[str]]:
+    """以另一個 cursor 取得查詢計畫，不影響原查詢的結果集
+
+    PostgreSQL 上失敗的 EXPLAIN 會讓整個交易進入 aborted 狀態，因此在交易中
+    包在 SAVEPOINT 裡執行，失敗時只回滾到 SAVEPOINT。
+    """
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    dbapi_connection = conn.connection.dbapi_connection
+    savepoint = not sqlite and not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [
+                " ".join(str(column) for column in row if column is not None)
+                for row in cursor.fetchall()
+            ]
+        except Exception as e:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            logger.warning("EXPLAIN failed for slow query: %s", e)
+            plan = [f"EXPLAIN failed: {e}"]
+        if savepoint:
+            cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        return plan
+    except Exception as e:
+        # 連 SAVEPOINT 本身都失敗時只記錄，不讓原本的請求失敗
+        logger.warning("Could not run EXPLAIN for slow query: %s", e)
+        return None
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_START_KEY)
+    log = _log
+    if not started or log is None:
+        return
+
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    if elapsed_ms < log.threshold_ms:
+        return
+
+    entry = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 3),
+        "sql": normalize_sql(statement),
+        "parameters": parameter_shape(parameters, executemany),
+        "caller": find_caller(),
+        "plan": None if executemany else _explain(conn, statement, parameters),
+    }
+    log.add(entry)
+    logger.warning(
+        "Slow query (%.1f ms) from %s: %s",
+        elapsed_ms,
+        entry["caller"],
+        entry["sql"],
+    )
+
+
+def install_slow_query_log(
+    threshold_ms: Optional[float] = None, size: Optional[int] = None
+) -> SlowQueryLog:
+    """在所有 Engine 上註冊慢查詢紀錄；參數未指定時讀取環境變數"""
+    global _log
+    if threshold_ms is None:
+        threshold_ms = get_slow_query_threshold_ms() or 0.0
+    log = SlowQueryLog(threshold_ms, size or get_slow_query_log_size())
+    if _log is None:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _log = log
+    return log
+
+
+def uninstall_slow_query_log() -> None:
+    global _log
+    if _log is not None:
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+        _log = None
@@ -0,0 +1,34 @@
+"""Normalized title keys for duplicate detection.
+
+Two titles get the same key when they differ only in case, full/half width,
+punctuation, symbols or whitespace (``「進擊的巨人」 ``, ``進擊的巨人！`` and
+``ＳＰＹ×ＦＡＭＩＬＹ`` / ``spy family``). Traditional Chinese is also folded
+to simplified with ``opencc`` (a pure-Python build, see requirements.txt), so
+``進擊的巨人`` and ``进击的巨人`` collide.
+"""
+
+import unicodedata
+from functools import lru_cache
+from typing import Callable
+
+import opencc
+
+# 只保留文字、數字與組合記號，其餘（標點、符號、空白、控制字元）一律去除
+_KEPT_CATEGORIES = ("L", "N", "M")
+
+
+@lru_cache(maxsize=1)
+def _converter() -> Callable[[str], str]:
+    """opencc 的繁轉簡函式"""
+    return opencc.OpenCC("t2s").convert
+
+
+def title_key(title: str) -> str:
+    """標題的正規化鍵（大小寫、全半形、標點與繁簡不敏感）"""
+    text = _converter()(unicodedata.normalize("NFKC", title or ""))
+    text = text.casefold()
+    key = "".join(
+        char for char in text if unicodedata.category(char)[0] in _KEPT_CATEGORIES
+    )
+    # 全為符號的標題（例如「!!!」）保留原字元，避免都變成空字串而互相衝突
+    return key or "".join(text.split())
@@ -0,0 +1,12 @@
+"""Performance benchmarks for the WatchedIt backend (run from ``backend/``).
+
+* ``datagen`` — deterministic dataset generator (10k/100k/1M works)
+* ``bench_endpoints`` — per-endpoint latency and SQL statements per request
+* ``bench_load`` — concurrent HTTP load against uvicorn
+* ``bench_startup`` — cold start: import, lifespan, first request, migrate
+* ``bench_workers`` — throughput and cache coherence for 1..N uvicorn workers
+* ``bench_works_list`` / ``bench_write_throughput`` — focused single checks
+
+Every script prints a JSON report (``--output`` also writes it to a file) so
+runs can be compared over time.
+"""
@@ -0,0 +1,168 @@
+"""Per-endpoint micro-benchmarks against a generated dataset.
+
+Each scenario issues ``--requests`` sequential requests through the ASGI app
+(no network) and reports p50/p95/p99 latency and SQL statements per request.
+Results are printed (and optionally written) as JSON so runs can be diffed::
+
+    python -m benchmarks.bench_endpoints --works 100k --output before.json
+    python -m benchmarks.bench_endpoints --works 100k --dataset /tmp/wd-100k.db \\
+        --only works_list work_detail
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+from .datagen import (
+    SCALES,
+    STATUSES,
+    TAG_WORDS,
+    TITLE_CORES,
+    TYPES,
+    open_dataset,
+    parse_works,
+    work_id_for,
+)
+from .harness import QueryCounter, environment, serve_database, summarize, write_report
+
+# 名稱 -> 依亂數產生請求路徑的函式
+Scenario = Callable[[random.Random], str]
+
+
+def build_scenarios(works: int, tags: int, seed: int) -> Dict[str, Scenario]:
+    pages = max(1, works // 20)
+    return {
+        "works_list": lambda rng: f"/works/?page={rng.randint(1, min(pages, 50))}",
+        "works_list_deep_page": lambda rng: f"/works/?page={rng.randint(1, pages)}",
+        "works_list_title": lambda rng: f"/works/?title={rng.choice(TITLE_CORES)}",
+        "works_list_type_status": lambda rng: (
+            f"/works/?type={rng.choice(TYPES)[0]}&status={rng.choice(STATUSES)[0]}"
+        ),
+        "works_list_hot_tag": lambda rng: f"/works/?tag_ids={rng.randint(1, 3)}",
+        "works_list_tail_tag": lambda rng: f"/works/?tag_ids={rng.randint(tags // 2, tags)}",
+        "work_detail": lambda rng: f"/works/{work_id_for(rng.randrange(works), seed)}",
+        "work_similar": lambda rng: (
+            f"/works/{work_id_for(rng.randrange(works), seed)}/similar"
+        ),
+        "works_stats": lambda rng: "/works/stats/overview",
+        "works_stats_extended": lambda rng: "/works/stats/extended",
+        "tags_list": lambda rng: "/tags/",
+        "tags_list_with_counts": lambda rng: "/tags/?with_counts=true",
+        "search_suggestions": lambda rng: (
+            f"/search/suggestions?query={rng.choice(TITLE_CORES + TAG_WORDS)}"
+        ),
+    }
+
+
+def run_scenario(
+    client: TestClient,
+    counter: QueryCounter,
+    scenario: Scenario,
+    requests: int,
+    seed: int,
+) -> Dict:
+    rng = random.Random(seed)
+    client.get(scenario(random.Random(seed - 1))).raise_for_status()  # warm-up
+
+    timings: List[float] = []
+    queries = 0
+    response_bytes = 0
+    for _ in range(requests):
+        path = scenario(rng)
+        before = counter.count
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        queries += counter.count - before
+        response_bytes += len(response.content)
+
+    return {
+        **summarize(timings),
+        "queries_per_request": round(queries / requests, 2),
+        "mean_response_bytes": response_bytes // requests,
+    }
+
+
+def run(
+    dataset: Path,
+    works: int,
+    tags: int,
+    requests: int,
+    only: Tuple[str, ...],
+    seed: int,
+) -> Dict:
+    started = time.perf_counter()
+    engine = open_dataset(dataset, works, tags=tags, seed=seed)
+    setup_seconds = time.perf_counter() - started
+
+    scenarios = build_scenarios(works, tags, seed)
+    unknown = set(only) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    try:
+        with serve_database(engine), TestClient(app) as client:
+            with QueryCounter(engine) as counter:
+                for name, scenario in scenarios.items():
+                    if only and name not in only:
+                        continue
+                    results[name] = run_scenario(
+                        client, counter, scenario, requests, seed
+                    )
+    finally:
+        engine.dispose()
+
+    return {
+        "benchmark": "endpoints",
+        "environment": environment(),
+        "dataset": {
+            "works": works,
+            "tags": tags,
+            "seed": seed,
+            "setup_seconds": round(setup_seconds, 2),
+        },
+        "requests_per_endpoint": requests,
+        "endpoints": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--works",
+        type=parse_works,
+        default=SCALES["10k"],
+        help="作品數或 10k/100k/1M",
+    )
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--dataset",
+        type=Path,
+        default=None,
+        help="重複使用的 SQLite 資料集檔案（筆數不符時重新產生）",
+    )
+    parser.add_argument("--only", nargs="*", default=(), help="只執行指定情境")
+    parser.add_argument("--output", type=Path, default=None, help="JSON 報告輸出路徑")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or Path(tmp) / "bench.db"
+        report = run(
+            dataset, args.works, args.tags, args.requests, tuple(args.only), args.seed
+        )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
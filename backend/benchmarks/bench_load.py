@@ -0,0 +1,200 @@
+"""Concurrent HTTP load scenario.
+
+Serves the app with uvicorn on a local port (against a generated dataset) and
+drives a mixed read/write workload from ``--concurrency`` async clients for
+``--duration`` seconds. Reports throughput, overall and per-scenario
+p50/p95/p99 latency, error counts and SQL statements per request as JSON::
+
+    python -m benchmarks.bench_load --works 100k --concurrency 32 --duration 20
+
+Pass ``--url`` to load an already running server instead (SQL statement
+counts are then unavailable)::
+
+    python -m benchmarks.bench_load --url http://localhost:8000 --works 10k
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import uvicorn
+
+from app.main import app
+
+from .datagen import SCALES, TITLE_CORES, open_dataset, parse_works, work_id_for
+from .harness import QueryCounter, environment, serve_database, summarize, write_report
+
+# (名稱, 權重)：以讀取為主，夾雜少量進度更新
+MIX = [
+    ("works_list", 35),
+    ("work_detail", 30),
+    ("works_list_title", 8),
+    ("tags_list", 10),
+    ("search_suggestions", 8),
+    ("works_stats", 4),
+    ("update_progress", 5),
+]
+
+
+def build_request(name: str, rng: random.Random, works: int, seed: int) -> Tuple:
+    """回傳 (method, path, json)"""
+    if name == "works_list":
+        return "GET", f"/works/?page={rng.randint(1, 50)}", None
+    if name == "work_detail":
+        return "GET", f"/works/{work_id_for(rng.randrange(works), seed)}", None
+    if name == "works_list_title":
+        return "GET", f"/works/?title={rng.choice(TITLE_CORES)}", None
+    if name == "tags_list":
+        return "GET", "/tags/", None
+    if name == "search_suggestions":
+        return "GET", f"/search/suggestions?query={rng.choice(TITLE_CORES)}", None
+    if name == "works_stats":
+        return "GET", "/works/stats/overview", None
+    if name == "update_progress":
+        return (
+            "PUT",
+            f"/works/{work_id_for(rng.randrange(works), seed)}",
+            {"progress": {"episode": rng.randint(0, 12), "total_episode": 12}},
+        )
+    raise ValueError(name)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server() -> Iterator[str]:
+    """在背景執行緒以 uvicorn 啟動應用程式"""
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+async def drive(
+    base_url: str, works: int, seed: int, concurrency: int, duration: float
+) -> Dict:
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int, client: httpx.AsyncClient) -> None:
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = build_request(name, rng, works, seed)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            timings[name].append((time.perf_counter() - started) * 1000)
+            if failed:
+                errors[name] += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30
+    ) as client:
+        await client.get("/health")  # warm-up
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index, client) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_timings = [value for values in timings.values() for value in values]
+    return {
+        "seconds": round(elapsed, 2),
+        "requests": len(all_timings),
+        "errors": sum(errors.values()),
+        "throughput_rps": round(len(all_timings) / elapsed, 1),
+        "latency": summarize(all_timings),
+        "scenarios": {
+            name: {**summarize(timings[name]), "errors": errors[name]}
+            for name in names
+            if timings[name]
+        },
+    }
+
+
+def run(
+    url: Optional[str],
+    dataset: Path,
+    works: int,
+    seed: int,
+    concurrency: int,
+    duration: float,
+) -> Dict:
+    report = {
+        "benchmark": "load",
+        "environment": environment(),
+        "dataset": {"works": works, "seed": seed},
+        "concurrency": concurrency,
+        "mix": dict(MIX),
+    }
+    if url:
+        result = asyncio.run(drive(url, works, seed, concurrency, duration))
+        result["queries_per_request"] = None
+        return {**report, "target": url, **result}
+
+    engine = open_dataset(dataset, works, seed=seed)
+    try:
+        with serve_database(engine), local_server() as base_url:
+            with QueryCounter(engine) as counter:
+                result = asyncio.run(
+                    drive(base_url, works, seed, concurrency, duration)
+                )
+    finally:
+        engine.dispose()
+    result["queries_per_request"] = round(counter.count / max(1, result["requests"]), 2)
+    return {**report, "target": "local uvicorn (1 worker)", **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--works", type=parse_works, default=SCALES["10k"], help="作品數或 10k/100k/1M"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="秒數")
+    parser.add_argument("--url", default=None, help="改為對既有伺服器施壓")
+    parser.add_argument("--dataset", type=Path, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or Path(tmp) / "bench.db"
+        report = run(
+            args.url, dataset, args.works, args.seed, args.concurrency, args.duration
+        )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
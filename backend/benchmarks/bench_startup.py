@@ -0,0 +1,124 @@
+"""Benchmark cold start: import, lifespan startup, first request and migrate.
+
+Every sample runs in a fresh interpreter so module caches don't hide import
+cost. Reports p50/p95 per phase and the slowest imports (``-X importtime``)::
+
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .harness import environment, summarize, write_report
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 在子行程中執行：量測匯入、lifespan 啟動與第一個請求
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    client.get("/health/ready").raise_for_status()
+    first = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "first_request_ms": (first - ready) * 1000,
+    "import_to_first_response_ms": (first - started) * 1000,
+}))
+"""
+
+
+def _run(args: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _timed(args: List[str], env: Dict[str, str]) -> float:
+    started = time.perf_counter()
+    _run(args, env)
+    return (time.perf_counter() - started) * 1000
+
+
+def slowest_imports(env: Dict[str, str], top: int) -> List[Dict]:
+    """以 -X importtime 找出累計耗時最多的頂層匯入"""
+    result = _run(["-X", "importtime", "-c", "import app.main"], env)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if cumulative.strip().isdigit() and depth <= 1:
+            rows.append(
+                {"module": name.strip(), "cumulative_ms": int(cumulative) / 1000}
+            )
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def run(runs: int, top: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'startup.db'}",
+            "LOG_FILE": str(Path(tmp) / "logs" / "watchedit.log"),
+        }
+
+        migrate_fresh = _timed(["-m", "app.db.migrate"], env)
+        migrate_noop = [_timed(["-m", "app.db.migrate"], env) for _ in range(runs)]
+
+        phases: Dict[str, List[float]] = {}
+        process_ms = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = _run(["-c", PROBE], env)
+            process_ms.append((time.perf_counter() - started) * 1000)
+            sample = json.loads(result.stdout.strip().splitlines()[-1])
+            for phase, value in sample.items():
+                phases.setdefault(phase, []).append(value)
+
+        imports = slowest_imports(env, top)
+
+    return {
+        "benchmark": "startup",
+        "environment": environment(),
+        "runs": runs,
+        "phases": {phase: summarize(values) for phase, values in phases.items()},
+        "process_to_first_response": summarize(process_ms),
+        "migrate": {
+            "fresh_database_ms": round(migrate_fresh, 1),
+            "up_to_date": summarize(migrate_noop),
+        },
+        "slowest_imports": imports,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="列出最慢的匯入數")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    write_report(run(args.runs, args.top), args.output)
+
+
+if __name__ == "__main__":
+    main()
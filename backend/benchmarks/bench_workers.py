@@ -0,0 +1,163 @@
+"""Benchmark scaling from 1 to N uvicorn workers.
+
+For each worker count, starts ``uvicorn --workers N`` against a generated
+SQLite dataset (WAL, ``CACHE_BUS=sqlite``), drives the ``bench_load`` mix and
+measures how long a tag created through one worker takes to become visible
+in all of them::
+
+    python -m benchmarks.bench_workers --works 100k --max-workers 4 --duration 15
+
+A single client process generates the load, so at high worker counts the
+client itself can become the bottleneck; compare throughput with
+``--concurrency`` raised as well.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+import httpx
+
+from .bench_load import _free_port, drive
+from .datagen import SCALES, open_dataset, parse_works
+from .harness import environment, write_report
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def start_server(workers: int, env: Dict[str, str]):
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def stop_server(process) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def measure_coherence(base_url: str, workers: int, timeout: float = 10.0) -> float:
+    """在一個 worker 新增標籤，量測所有 worker 都看得到所需的時間（毫秒）"""
+    name = f"coherence-{time.time_ns()}"
+    started = time.perf_counter()
+    httpx.post(f"{base_url}/tags/", json={"name": name}).raise_for_status()
+    while time.perf_counter() - started < timeout:
+        # 每次使用新連線，讓請求分散到不同 worker
+        seen = [
+            name in {tag["name"] for tag in httpx.get(f"{base_url}/tags/").json()}
+            for _ in range(workers * 4)
+        ]
+        if all(seen):
+            return round((time.perf_counter() - started) * 1000, 1)
+    return float("inf")
+
+
+def run(
+    dataset: Path,
+    works: int,
+    seed: int,
+    max_workers: int,
+    concurrency: int,
+    duration: float,
+) -> Dict:
+    open_dataset(dataset, works, seed=seed).dispose()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{dataset}",
+        "CACHE_BUS": os.getenv("CACHE_BUS", "sqlite"),
+        "LOG_FILE": str(dataset.parent / "logs" / "watchedit.log"),
+    }
+
+    results = {}
+    for workers in range(1, max_workers + 1):
+        process, base_url = start_server(workers, env)
+        try:
+            result = asyncio.run(drive(base_url, works, seed, concurrency, duration))
+            result["coherence_ms"] = measure_coherence(base_url, workers)
+        finally:
+            stop_server(process)
+        results[str(workers)] = result
+
+    baseline = results["1"]["throughput_rps"] or 1
+    for result in results.values():
+        result["speedup"] = round(result["throughput_rps"] / baseline, 2)
+
+    return {
+        "benchmark": "workers",
+        "environment": {**environment(), "cpu_count": os.cpu_count()},
+        "dataset": {"works": works, "seed": seed},
+        "cache_bus": env["CACHE_BUS"],
+        "concurrency": concurrency,
+        "duration_seconds": duration,
+        "workers": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--works", type=parse_works, default=SCALES["10k"], help="作品數或 10k/100k/1M"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="每種設定的秒數")
+    parser.add_argument("--dataset", type=Path, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or Path(tmp) / "bench.db"
+        report = run(
+            dataset,
+            args.works,
+            args.seed,
+            args.max_workers,
+            args.concurrency,
+            args.duration,
+        )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark ``GET /works/?size=100`` against a seeded SQLite database.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_works_list --works 2000 --requests 200
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.main import app
+
+from .datagen import generate
+from .harness import serve_database, summarize
+
+
+def run(works: int, tags: int, requests: int, size: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        generate(engine, works, tags=tags)
+
+        try:
+            with serve_database(engine), TestClient(app) as client:
+                url = f"/works/?size={size}"
+                client.get(url).raise_for_status()  # warm-up
+                timings = []
+                for index in range(requests):
+                    page = index % max(1, works // size) + 1
+                    started = time.perf_counter()
+                    response = client.get(f"{url}&page={page}")
+                    timings.append((time.perf_counter() - started) * 1000)
+                    response.raise_for_status()
+        finally:
+            engine.dispose()
+
+    return {
+        "endpoint": f"GET /works/?size={size}",
+        "works": works,
+        **summarize(timings),
+        "response_bytes": len(response.content),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--works", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--size", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run(args.works, args.tags, args.requests, args.size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Deterministic benchmark data generator.
+
+Produces the same library for the same ``--works``/``--seed`` on every run so
+benchmark results are comparable over time. The shape mimics real usage:
+
+* titles are CJK (traditional Chinese and Japanese kana/kanji), with sequels,
+  seasons and the occasional Latin subtitle;
+* types, statuses and years follow a skewed distribution (mostly anime, mostly
+  recent, mostly finished);
+* tags follow a Zipf distribution, so a handful of tags are on a large share
+  of works and the long tail is rarely used; ``usage_count`` is filled in.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.datagen --works 100000 --output /tmp/watchedit-100k.db
+
+Presets for ``--works`` accept ``10k``, ``100k`` and ``1M``.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import bindparam, create_engine, func, insert, select, update
+from sqlalchemy.engine import Engine
+
+from app.db.database import Base, get_connect_args
+from app.models.tag import Tag, WorkTag
+from app.models.work import Work
+from app.utils.title_key import title_key
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+BATCH_SIZE = 10_000
+
+TYPES = [
+    ("動畫", 45),
+    ("漫畫", 20),
+    ("小說", 15),
+    ("電影", 10),
+    ("電視劇", 8),
+    ("自定義", 2),
+]
+STATUSES = [("已完結", 55), ("進行中", 25), ("暫停", 12), ("放棄", 8)]
+SOURCES = [("AniList", 50), ("手動", 40), ("匯入", 10)]
+
+TITLE_HEADS = (
+    "進擊的 鋼之 葬送的 咒術 鬼滅之 命運 攻殼 新世紀 涼宮春日的 輕音 魔法少女 銀河 星際 夏目 紫羅蘭 とある やがて 君の 僕の 響け！ "
+    "ぼっち・ざ・ その着せ替え"
+).split()
+TITLE_CORES = (
+    "巨人 鍊金術師 芙莉蓮 迴戰 刃 石之門 機動隊 福音戰士 憂鬱 少女 小圓 英雄傳說 牛仔 友人帳 永恆花園 魔術の禁書目録 君になる 名は。 "
+    "ヒーローアカデミア ユーフォニアム ろっく！ 人形は恋をする 物語 旅人 日記"
+).split()
+TITLE_SUFFIXES = [
+    ("", 60),
+    (" 第二季", 10),
+    (" 第三季", 5),
+    (" 劇場版", 6),
+    (" 續", 4),
+    (" Final Season", 3),
+    (" -Reboot-", 2),
+    (" 外傳", 4),
+    (" OVA", 3),
+    (" 完結篇", 3),
+]
+TAG_WORDS = (
+    "冒險 奇幻 科幻 愛情 喜劇 動作 懸疑 恐怖 日常 校園 職場 音樂 運動 戰爭 歷史 推理 異世界 機器人 偶像 百合 治癒 熱血 黑暗 "
+    "美食 神作 補番 重溫 京阿尼 MAPPA ufotable"
+).split()
+TAG_COLORS = ["#3b82f6", "#ef4444", "#10b981", "#f59e0b", "#8b5cf6", "#ec4899"]
+
+
+def parse_works(value: str) -> int:
+    return SCALES.get(value, None) or int(value)
+
+
+def work_id_for(index: int, seed: int = 42) -> str:
+    """第 index 筆作品的 ID（可由基準測試直接推算）"""
+    return f"{seed:04d}-{index:08d}"
+
+
+def _weighted(rng: random.Random, choices):
+    values = [value for value, _ in choices]
+    cum_weights = list(accumulate(weight for _, weight in choices))
+    return lambda: rng.choices(values, cum_weights=cum_weights)[0]
+
+
+def _tag_names(count: int) -> List[str]:
+    names = []
+    for index in range(count):
+        word = TAG_WORDS[index % len(TAG_WORDS)]
+        names.append(
+            word if index < len(TAG_WORDS) else f"{word}{index // len(TAG_WORDS)}"
+        )
+    return names
+
+
+def generate(engine: Engine, works: int, tags: int = 200, seed: int = 42) -> Dict:
+    """建立資料表並寫入 works 筆作品；回傳資料集摘要"""
+    rng = random.Random(seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    pick_type = _weighted(rng, TYPES)
+    pick_status = _weighted(rng, STATUSES)
+    pick_source = _weighted(rng, SOURCES)
+    pick_suffix = _weighted(rng, TITLE_SUFFIXES)
+
+    # Zipf 分布：第 k 個標籤的權重為 1 / k^1.1
+    tag_ids = list(range(1, tags + 1))
+    tag_cum_weights = list(accumulate(1 / rank**1.1 for rank in tag_ids))
+    tag_counts = dict.fromkeys(tag_ids, 0)
+    epoch = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+    started = time.perf_counter()
+    link_count = 0
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Tag),
+            [
+                {
+                    "id": tag_id,
+                    "name": name,
+                    "color": TAG_COLORS[tag_id % len(TAG_COLORS)],
+                    "usage_count": 0,
+                }
+                for tag_id, name in zip(tag_ids, _tag_names(tags))
+            ],
+        )
+
+        work_rows, link_rows = [], []
+        for index in range(works):
+            work_id = work_id_for(index, seed)
+            work_type = pick_type()
+            total = rng.choice([12, 13, 24, 25, 26, 50]) if work_type != "電影" else 1
+            status = pick_status()
+            episode = total if status == "已完結" else rng.randint(0, total)
+            added = epoch + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 10))
+            title = f"{rng.choice(TITLE_HEADS)}{rng.choice(TITLE_CORES)}{pick_suffix()}"
+            work_rows.append(
+                {
+                    "id": work_id,
+                    "title": title,
+                    "title_key": title_key(title),
+                    "type": work_type,
+                    "status": status,
+                    "year": min(2025, int(2026 - rng.expovariate(1 / 6))),
+                    "progress": {
+                        "episode": episode,
+                        "total_episode": total,
+                        "duration": rng.choice([24, 24, 24, 30, 45, 110]),
+                    },
+                    "date_added": added,
+                    "date_updated": added + timedelta(days=rng.randint(0, 90)),
+                    "rating": (
+                        round(min(10.0, max(0.0, rng.gauss(7.2, 1.5))), 1)
+                        if rng.random() < 0.7
+                        else None
+                    ),
+                    "review": (
+                        "還不錯，" * rng.randint(1, 30) if rng.random() < 0.3 else None
+                    ),
+                    "note": None,
+                    "source": pick_source(),
+                    "reminder_enabled": status == "進行中" and rng.random() < 0.3,
+                    "reminder_frequency": None,
+                }
+            )
+
+            tag_count = min(tags, int(rng.expovariate(1 / 2.2)))
+            chosen = set()
+            while len(chosen) < tag_count:
+                chosen.add(rng.choices(tag_ids, cum_weights=tag_cum_weights)[0])
+            for tag_id in chosen:
+                tag_counts[tag_id] += 1
+                link_rows.append({"work_id": work_id, "tag_id": tag_id})
+
+            if len(work_rows) >= BATCH_SIZE:
+                conn.execute(insert(Work), work_rows)
+                conn.execute(insert(WorkTag), link_rows)
+                link_count += len(link_rows)
+                work_rows, link_rows = [], []
+
+        if work_rows:
+            conn.execute(insert(Work), work_rows)
+        if link_rows:
+            conn.execute(insert(WorkTag), link_rows)
+        link_count += len(link_rows)
+
+        conn.execute(
+            update(Tag)
+            .where(Tag.id == bindparam("tag_id"))
+            .values(usage_count=bindparam("usage_count")),
+            [
+                {"tag_id": tag_id, "usage_count": count}
+                for tag_id, count in tag_counts.items()
+            ],
+        )
+
+    return {
+        "works": works,
+        "tags": tags,
+        "work_tags": link_count,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def open_dataset(path: Path, works: int, tags: int = 200, seed: int = 42) -> Engine:
+    """開啟 SQLite 資料集；檔案不存在或筆數不符時重新產生"""
+    database_url = f"sqlite:///{path}"
+    engine = create_engine(database_url, connect_args=get_connect_args(database_url))
+    if path.exists():
+        try:
+            with engine.connect() as conn:
+                existing = conn.execute(select(func.count()).select_from(Work)).scalar()
+            if existing == works:
+                return engine
+        except Exception:
+            pass
+    generate(engine, works, tags=tags, seed=seed)
+    return engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--works", type=parse_works, default=SCALES["10k"])
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, required=True, help="SQLite 檔案路徑")
+    args = parser.parse_args()
+
+    args.output.unlink(missing_ok=True)
+    database_url = f"sqlite:///{args.output}"
+    engine = create_engine(database_url, connect_args=get_connect_args(database_url))
+    try:
+        summary = generate(engine, args.works, tags=args.tags, seed=args.seed)
+    finally:
+        engine.dispose()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
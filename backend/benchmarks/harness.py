@@ -0,0 +1,108 @@
+"""Shared helpers for the benchmark scripts: latency summaries, SQL statement
+counting and serving the app against a benchmark database."""
+
+import json
+import math
+import platform
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import get_db
+from app.main import app
+from app.services.similarity import clear_similarity_indexes
+from app.services.stats_service import clear_stats_cache
+from app.services.tag_cache import clear_tag_registries
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """最近秩（nearest-rank）百分位數"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(timings_ms: List[float]) -> Dict[str, float]:
+    timings = sorted(timings_ms)
+    return {
+        "count": len(timings),
+        "mean_ms": round(sum(timings) / len(timings), 3) if timings else 0.0,
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3) if timings else 0.0,
+    }
+
+
+class QueryCounter:
+    """計算某個 Engine 上執行的 SQL 數量"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.count = 0
+
+    def _after_cursor_execute(self, *args) -> None:
+        self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+
+@contextmanager
+def serve_database(engine: Engine) -> Iterator[None]:
+    """讓應用程式的 get_db 改用指定的 Engine"""
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        clear_tag_registries()
+        clear_stats_cache()
+        clear_similarity_indexes()
+
+
+def environment() -> Dict[str, Optional[str]]:
+    """記錄執行環境，方便比較不同時間的結果"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def write_report(report: Dict, output: Optional[Path]) -> None:
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        output.write_text(text + "\n", encoding="utf-8")
+    print(text)
@@ -3,6 +3,10 @@ import asyncio
 import pytest
 from app.db.database import Base, get_db
 from app.main import app
+from app.services.jobs import get_job_runner
+from app.services.similarity import clear_similarity_indexes
+from app.services.stats_service import clear_stats_cache
+from app.services.tag_cache import clear_tag_registries
 from httpx import AsyncClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -50,6 +54,9 @@ async def client():
     # 清理
     Base.metadata.drop_all(bind=engine)
     app.dependency_overrides.clear()
+    clear_tag_registries()
+    clear_stats_cache()
+    clear_similarity_indexes()
 
 
 @pytest.fixture(scope="function")
@@ -63,6 +70,50 @@ def db():
     finally:
         session.close()
         Base.metadata.drop_all(bind=engine)
+        clear_tag_registries()
+        clear_stats_cache()
+        clear_similarity_indexes()
+
+
+@pytest.fixture(scope="function")
+async def file_client(tmp_path):
+    """Client backed by a SQLite file, for tests that run background jobs.
+
+    Jobs use their own sessions from worker threads, which must not share the
+    single in-memory connection of the default client.
+    """
+    file_engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=file_engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+
+    def override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        ac.session_factory = session_factory
+        yield ac
+
+    assert get_job_runner().wait_idle(timeout=10)
+    app.dependency_overrides.clear()
+    file_engine.dispose()
+    clear_tag_registries()
+    clear_stats_cache()
+    clear_similarity_indexes()
+
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    """設定 ADMIN_TOKEN 並回傳呼叫 /admin 端點所需的標頭"""
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    return {"Authorization": "Bearer test-admin-token"}
 
 
 @pytest.fixture
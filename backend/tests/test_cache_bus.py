@@ -0,0 +1,110 @@
+import sqlite3
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.db.database import configure_sqlite
+from app.models.tag import Tag
+from app.schemas.tag import TagCreate
+from app.services import cache_bus
+from app.services.cache_bus import (
+    CacheBus,
+    SQLiteDataVersionBus,
+    start_cache_bus,
+    stop_cache_bus,
+    subscribe,
+    unsubscribe,
+)
+from app.services.change_log import ENTITY_TAG, ENTITY_WORK, record_change
+from app.services.tag_cache import TagRegistry
+from app.services.tag_service import TagService
+
+
+class RecordingBus(CacheBus):
+    name = "recording"
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, entities):
+        self.published.append(entities)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestCacheBus:
+    """測試跨行程快取失效通知"""
+
+    def test_sqlite_bus_notices_commits_from_other_connections(self, tmp_path):
+        """其他連線提交後，輪詢 data_version 的執行緒會發出通知"""
+        path = tmp_path / "bus.db"
+        other = sqlite3.connect(path)
+        other.execute("CREATE TABLE t (x INTEGER)")
+        other.commit()
+
+        received = []
+        subscribe(received.append)
+        bus = SQLiteDataVersionBus(str(path), interval=0.01)
+        bus.start()
+        try:
+            time.sleep(0.05)
+            other.execute("INSERT INTO t VALUES (1)")
+            other.commit()
+
+            assert wait_for(lambda: received == [None])
+        finally:
+            bus.stop()
+            unsubscribe(received.append)
+            other.close()
+
+    def test_changed_entities_are_published_after_commit(
+        self, db: Session, monkeypatch
+    ):
+        """提交後才發布變更的實體，回滾則不發布"""
+        bus = RecordingBus()
+        monkeypatch.setattr(cache_bus, "create_cache_bus", lambda *args: bus)
+        start_cache_bus(db.get_bind())
+        try:
+            TagService(db).create_tag(TagCreate(name="奇幻"))
+
+            record_change(db, ENTITY_WORK, "w1")
+            db.rollback()
+
+            assert bus.published == [frozenset({ENTITY_TAG})]
+        finally:
+            stop_cache_bus()
+
+    def test_registry_revalidates_on_notification(self, db: Session):
+        """收到標籤相關通知後，快取立即重新比對資料版本"""
+        registry = TagRegistry(check_interval=3600)
+        assert registry.tags(db) == []
+
+        db.add(Tag(id=5, name="科幻"))
+        record_change(db, ENTITY_TAG, 5)
+        db.commit()
+
+        registry.invalidate(frozenset({ENTITY_WORK}))
+        assert registry.tags(db) == []
+
+        registry.invalidate(None)
+        assert [tag.name for tag in registry.tags(db)] == ["科幻"]
+
+
+def test_sqlite_file_databases_use_wal_and_busy_timeout(tmp_path):
+    """SQLite 檔案資料庫啟用 WAL 與 busy_timeout"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    configure_sqlite(engine)
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    finally:
+        engine.dispose()
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 import pytest
 from httpx import AsyncClient
 
@@ -78,3 +80,124 @@ async def test_upload_backup_rejects_invalid_backup_date(client):
 
     assert response.status_code == 400
     assert response.json() == {"detail": "backupDate 格式無效"}
+
+
+def backup_payload(works, tags=None, device_id="device-1"):
+    return {
+        "works": works,
+        "tags": tags or [],
+        "backupDate": "2026-06-23T00:00:00Z",
+        "version": "1.0.0",
+        "deviceId": device_id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_backup_versions_can_be_listed_and_restored(client):
+    await client.post(
+        "/cloud/backup", json=backup_payload([{"id": "w1", "title": "A"}])
+    )
+    await client.post(
+        "/cloud/backup",
+        json=backup_payload([{"id": "w1", "title": "A"}, {"id": "w2", "title": "B"}]),
+    )
+
+    response = await client.get("/cloud/backup/versions?device_id=device-1")
+    assert response.status_code == 200
+    versions = response.json()["versions"]
+    assert [version["worksCount"] for version in versions] == [2, 1]
+
+    oldest_id = versions[-1]["id"]
+    response = await client.post(
+        f"/cloud/backup/versions/{oldest_id}/restore?device_id=device-1"
+    )
+    assert response.status_code == 200
+    assert response.json()["works"] == [{"id": "w1", "title": "A"}]
+
+    response = await client.get("/cloud/backup?device_id=device-1")
+    assert response.json()["works"] == [{"id": "w1", "title": "A"}]
+
+
+@pytest.mark.asyncio
+async def test_backup_version_of_other_device_is_not_found(client):
+    await client.post("/cloud/backup", json=backup_payload([{"id": "w1"}]))
+    versions = (await client.get("/cloud/backup/versions?device_id=device-1")).json()
+
+    response = await client.get(
+        f"/cloud/backup/versions/{versions['versions'][0]['id']}?device_id=device-2"
+    )
+
+    assert response.status_code == 404
+
+
+def test_backup_chunks_are_shared_and_pruned_by_retention(db, monkeypatch):
+    from app.models import BackupChunk, BackupVersion
+    from app.services.backup_service import BackupService
+
+    monkeypatch.setenv("BACKUP_RETENTION", "2")
+    backup_service = BackupService(db)
+    backup_date = datetime(2026, 6, 23)
+
+    shared = {"id": "w1", "title": "共用作品"}
+    backup_service.save_backup("device-1", [shared, {"id": "w2"}], [], backup_date, "1")
+    backup_service.save_backup(
+        "device-2", [{"title": "共用作品", "id": "w1"}], [], backup_date, "1"
+    )
+    assert db.query(BackupChunk).count() == 2
+
+    backup_service.save_backup("device-1", [shared], [], backup_date, "1")
+    backup_service.save_backup("device-1", [shared, {"id": "w3"}], [], backup_date, "1")
+
+    assert db.query(BackupVersion).filter_by(device_id="device-1").count() == 2
+    # w2 只被已淘汰的版本引用，應被清除
+    assert {chunk.data.get("id") for chunk in db.query(BackupChunk)} == {"w1", "w3"}
+
+
+@pytest.mark.parametrize("dialect_name", ["sqlite", "generic"])
+def test_concurrent_upload_of_same_chunk_is_skipped(db, monkeypatch, dialect_name):
+    """並行上傳剛寫入相同區塊時略過，而不是違反主鍵回傳 500"""
+    from app.models import BackupChunk
+    from app.services.backup_service import BackupService, chunk_hash
+
+    monkeypatch.setattr(db.get_bind().dialect, "name", dialect_name)
+    item = {"id": "w1", "title": "共用作品"}
+    row = {"hash": chunk_hash(item), "data": item, "size": 1}
+    backup_service = BackupService(db)
+
+    backup_service._insert_chunks([row])
+    # 模擬另一個請求在查詢既有區塊之後、寫入之前搶先寫入
+    backup_service._insert_chunks([row, {**row, "hash": "other"}])
+    db.commit()
+
+    assert sorted(hash_ for (hash_,) in db.query(BackupChunk.hash)) == sorted(
+        [row["hash"], "other"]
+    )
+
+
+def test_prune_keeps_chunks_linked_by_a_version_in_flight(db):
+    """清理時以 NOT EXISTS 重新確認：剛被其他版本連結的區塊不會被刪除"""
+    from app.models import BackupChunk, BackupVersion, BackupVersionChunk
+    from app.services.backup_service import BackupService, chunk_hash
+
+    backup_service = BackupService(db)
+    backup_date = datetime(2026, 6, 23)
+    shared = {"id": "w1"}
+    backup_service.save_backup("device-1", [shared], [], backup_date, "1")
+
+    # 另一個設備的新版本已連結此區塊，尚未提交
+    in_flight = BackupVersion(device_id="device-2", backup_date=backup_date)
+    db.add(in_flight)
+    db.flush()
+    db.add(
+        BackupVersionChunk(
+            version_id=in_flight.id,
+            kind="work",
+            position=0,
+            chunk_hash=chunk_hash(shared),
+        )
+    )
+    db.flush()
+
+    backup_service.delete_versions("device-1")
+    db.commit()
+    assert [chunk.data for chunk in db.query(BackupChunk)] == [shared]
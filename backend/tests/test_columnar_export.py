@@ -0,0 +1,115 @@
+import io
+
+import pytest
+
+from app.services import columnar_export
+from app.services.columnar_export import export_to_directory, stream_table
+from app.services.jobs import get_job_runner
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+async def create_library(client):
+    tag = (await client.post("/tags/", json={"name": "奇幻"})).json()
+    await client.post(
+        "/works/",
+        json={
+            "title": "葬送的芙莉蓮",
+            "type": "動畫",
+            "status": "進行中",
+            "year": 2023,
+            "progress": {"episode": 10, "total_episode": 28, "duration": 24},
+            "rating": 9.5,
+            "tag_ids": [tag["id"]],
+        },
+    )
+    await client.post(
+        "/works/", json={"title": "三體", "type": "小說", "status": "暫停"}
+    )
+    return tag
+
+
+class TestColumnarExport:
+    """測試 Parquet / Arrow 匯出"""
+
+    async def test_parquet_download(self, client):
+        """works 的 progress 展開為整數欄位，標籤關聯另成一個資料表"""
+        tag = await create_library(client)
+
+        response = await client.get("/works/export/works")
+        assert response.status_code == 200
+        assert 'filename="works.parquet"' in response.headers["content-disposition"]
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.schema.field("episode").type == pa.int32()
+        assert table.schema.field("date_added").type == pa.timestamp("us", tz="UTC")
+        rows = {row["title"]: row for row in table.to_pylist()}
+        assert (
+            rows["葬送的芙莉蓮"]["episode"],
+            rows["葬送的芙莉蓮"]["total_episode"],
+            rows["葬送的芙莉蓮"]["duration"],
+            rows["葬送的芙莉蓮"]["rating"],
+        ) == (10, 28, 24, 9.5)
+        assert rows["三體"]["episode"] is None
+
+        response = await client.get("/works/export/work_tags")
+        links = pq.read_table(io.BytesIO(response.content)).to_pylist()
+        assert links == [{"work_id": rows["葬送的芙莉蓮"]["id"], "tag_id": tag["id"]}]
+
+    async def test_arrow_download_and_validation(self, client, monkeypatch):
+        """Arrow IPC 檔可直接讀取；未知的資料表或格式回傳 400，未安裝 pyarrow 時 501"""
+        await create_library(client)
+        response = await client.get("/works/export/tags", params={"format": "arrow"})
+        assert response.status_code == 200
+        table = pa.ipc.open_file(pa.BufferReader(response.content)).read_all()
+        assert table.to_pylist()[0]["name"] == "奇幻"
+
+        assert (await client.get("/works/export/users")).status_code == 400
+        response = await client.get("/works/export/works", params={"format": "csv"})
+        assert response.status_code == 400
+
+        monkeypatch.setattr(columnar_export, "pyarrow_available", lambda: False)
+        response = await client.get("/works/export/works")
+        assert response.status_code == 501
+        assert "pyarrow" in response.json()["detail"]
+
+    async def test_streams_one_row_group_per_batch(self, client, db):
+        """每批游標資料各寫成一個 row group，串流逐批送出"""
+        for i in range(5):
+            await client.post(
+                "/works/",
+                json={"title": f"作品 {i}", "type": "動畫", "status": "進行中"},
+            )
+        chunks = list(stream_table(db, "works", batch_size=2))
+        assert len(chunks) > 3
+        metadata = pq.ParquetFile(io.BytesIO(b"".join(chunks))).metadata
+        assert (metadata.num_rows, metadata.num_row_groups) == (5, 3)
+
+    def test_export_to_directory(self, db, tmp_path):
+        """寫入目錄時三個資料表各一個檔案，空資料表仍有 schema"""
+        result = export_to_directory(db, tmp_path, "arrow")
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "tags.arrow",
+            "work_tags.arrow",
+            "works.arrow",
+        ]
+        assert result["tables"]["works"]["rows"] == 0
+        with pa.memory_map(result["tables"]["works"]["path"]) as source:
+            assert "total_episode" in pa.ipc.open_file(source).schema.names
+
+    async def test_export_job(self, file_client, tmp_path, monkeypatch):
+        """works.export 工作寫到 EXPORT_DIR 並回報各資料表的列數"""
+        monkeypatch.setenv("EXPORT_DIR", str(tmp_path / "exports"))
+        await create_library(file_client)
+        response = await file_client.post("/jobs/", json={"type": "works.export"})
+        assert get_job_runner().wait_idle(timeout=5)
+
+        job = (await file_client.get(f"/jobs/{response.json()['id']}")).json()
+        assert job["status"] == "succeeded"
+        tables = job["result"]["tables"]
+        assert {name: info["rows"] for name, info in tables.items()} == {
+            "works": 2,
+            "tags": 1,
+            "work_tags": 1,
+        }
+        assert pq.read_table(tables["works"]["path"]).num_rows == 2
@@ -0,0 +1,167 @@
+from sqlalchemy import update
+
+from app.models.work import Work
+from app.schemas.work import WorkCreate, WorkUpdate
+from app.services.duplicates import DuplicateService, find_existing
+from app.services.jobs import get_job_runner
+from app.services.work_service import WorkService
+from app.utils.title_key import title_key
+
+
+def work_data(title, work_type="動畫", **fields):
+    return {"title": title, "type": work_type, "status": "進行中", **fields}
+
+
+class TestTitleKey:
+    """測試標題正規化"""
+
+    def test_ignores_case_width_and_punctuation(self):
+        """大小寫、全半形、標點與空白不影響鍵值"""
+        assert title_key("ＳＰＹ×ＦＡＭＩＬＹ") == title_key("spy family")
+        assert title_key("「進擊的巨人」 ") == title_key("進擊的巨人！")
+        assert title_key("Re:ゼロから始める異世界生活") == title_key(
+            "re ゼロから始める異世界生活"
+        )
+        assert title_key("進擊的巨人") != title_key("進擊的巨人 2")
+
+    def test_folds_traditional_to_simplified(self):
+        """繁體與簡體標題得到相同的鍵"""
+        assert title_key("進擊的巨人") == title_key("进击的巨人")
+        assert title_key("「鋼之鍊金術師」") == title_key("钢之炼金术师")
+
+    def test_symbol_only_titles_keep_a_key(self):
+        """全為符號的標題不會變成空字串"""
+        assert title_key("!!!") == "!!!"
+        assert title_key("!!!") != title_key("???")
+
+
+class TestDuplicateWorks:
+    """測試重複作品檢查、合併與掃描"""
+
+    async def test_create_rejects_duplicate_title(self, client):
+        """同類型的正規化標題重複時回傳 409，不同類型不受影響"""
+        response = await client.post("/works/", json=work_data("Steins;Gate"))
+        assert response.status_code == 201
+
+        response = await client.post("/works/", json=work_data("STEINS GATE"))
+        assert response.status_code == 409
+        assert "Steins;Gate" in response.json()["detail"]
+
+        response = await client.post("/works/", json=work_data("Steins Gate", "小說"))
+        assert response.status_code == 201
+
+        response = await client.post(
+            "/works/", params={"on_duplicate": "allow"}, json=work_data("steins;gate")
+        )
+        assert response.status_code == 201
+
+        response = await client.post(
+            "/works/", params={"on_duplicate": "skip"}, json=work_data("新作品")
+        )
+        assert response.status_code == 400
+
+    async def test_merge_fills_missing_fields(self, client):
+        """合併時只補上空白欄位與缺少的標籤"""
+        tag_ids = [
+            (await client.post("/tags/", json={"name": name})).json()["id"]
+            for name in ("科幻", "懸疑")
+        ]
+        original = (
+            await client.post(
+                "/works/", json=work_data("三體", rating=9.0, tag_ids=[tag_ids[0]])
+            )
+        ).json()
+
+        response = await client.post(
+            "/works/",
+            params={"on_duplicate": "merge"},
+            json=work_data("三體。", rating=5.0, year=2023, tag_ids=tag_ids),
+        )
+        assert response.status_code == 201
+        merged = response.json()
+        assert merged["id"] == original["id"]
+        assert merged["title"] == "三體"
+        assert merged["rating"] == 9.0
+        assert merged["year"] == 2023
+        assert sorted(tag["id"] for tag in merged["tags"]) == sorted(tag_ids)
+
+        works = (await client.get("/works/")).json()
+        assert works["total"] == 1
+        tags = (await client.get("/tags/", params={"with_counts": True})).json()
+        assert {tag["id"]: tag["usage_count"] for tag in tags} == {
+            tag_ids[0]: 1,
+            tag_ids[1]: 1,
+        }
+
+    def test_find_existing_and_rename(self, db):
+        """批次查詢既有作品；改名後鍵值跟著更新"""
+        service = WorkService(db)
+        first = service.create_work(WorkCreate(**work_data("孤獨搖滾！")))
+        service.create_work(WorkCreate(**work_data("葬送的芙莉蓮")))
+
+        found = find_existing(
+            db,
+            [
+                (title_key("孤獨搖滾"), "動畫"),
+                (title_key("孤獨搖滾"), "漫畫"),
+                (title_key("不存在"), "動畫"),
+            ],
+        )
+        assert found == {(title_key("孤獨搖滾"), "動畫"): first.id}
+
+        service.update_work(first.id, WorkUpdate(title="我推的孩子"))
+        assert find_existing(db, [(title_key("我推的孩子"), "動畫")]) == {
+            (title_key("我推的孩子"), "動畫"): first.id
+        }
+
+    def test_rekey_and_clusters(self, db):
+        """掃描會補上缺少的鍵值並依 (鍵值, 類型) 分群"""
+        service = WorkService(db)
+        ids = [
+            service.create_work(WorkCreate(**work_data(title)), "allow").id
+            for title in (
+                "BanG Dream!",
+                "bang dream",
+                "ＢＡＮＧ　ＤＲＥＡＭ",
+                "獨立作品",
+            )
+        ]
+        # 模擬欄位新增前的舊資料
+        db.execute(update(Work).where(Work.id == ids[0]).values(title_key=None))
+        db.commit()
+
+        duplicates = DuplicateService(db)
+        assert duplicates.rekey(batch_size=2) == 1
+        assert duplicates.rekey() == 0
+
+        clusters = duplicates.clusters()
+        assert len(clusters) == 1
+        assert clusters[0]["title_key"] == "bangdream"
+        assert {work["id"] for work in clusters[0]["works"]} == set(ids[:3])
+
+    async def test_background_scan(self, file_client, admin_headers):
+        """掃描以背景工作執行，完成後可讀取結果"""
+        client = file_client
+        response = await client.get("/admin/duplicates", headers=admin_headers)
+        assert response.status_code == 404
+
+        for title in ("咒術迴戰", "咒術迴戰 "):
+            await client.post(
+                "/works/", params={"on_duplicate": "allow"}, json=work_data(title)
+            )
+
+        response = await client.post("/admin/duplicates/scan", headers=admin_headers)
+        assert response.status_code == 202
+        assert response.json()["started"] is True
+        job_id = response.json()["id"]
+        assert get_job_runner().wait_idle(timeout=5)
+
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        assert job["status"] == "succeeded"
+        assert job["progress"] == {"current": 2, "total": 2, "message": None}
+
+        scan = (await client.get("/admin/duplicates", headers=admin_headers)).json()
+        assert scan["id"] == job_id
+        assert scan["rekeyed"] == 0
+        assert len(scan["clusters"]) == 1
+        assert len(scan["clusters"][0]["works"]) == 2
@@ -0,0 +1,198 @@
+import json
+
+import httpx
+
+from app.schemas.work import WorkCreate
+from app.services.enrichment import (
+    Candidate,
+    EnrichmentService,
+    EnrichmentWorker,
+    RateBudget,
+    build_query,
+    pick_match,
+)
+from app.services.work_service import WorkService
+
+
+def media(anilist_id, romaji, year=2023, episodes=28, synonyms=()):
+    return {
+        "id": anilist_id,
+        "title": {"romaji": romaji, "english": None, "native": None},
+        "synonyms": list(synonyms),
+        "episodes": episodes,
+        "chapters": None,
+        "seasonYear": year,
+        "startDate": {"year": year},
+        "coverImage": {"large": f"https://img.example/{anilist_id}.jpg"},
+        "genres": ["Adventure", "Fantasy"],
+    }
+
+
+CATALOGUE = {
+    "Sousou no Frieren": media(154587, "Sousou no Frieren", synonyms=["葬送的芙莉蓮"]),
+    "Bocchi the Rock!": media(130003, "Bocchi the Rock!", year=2022, episodes=12),
+}
+
+
+def anilist_handler(calls):
+    """依別名回傳搜尋結果的假 AniList"""
+
+    def handle(request):
+        body = json.loads(request.content)
+        calls.append(body)
+        data = {}
+        for name, value in body["variables"].items():
+            alias = "m" + name.lstrip("qid")
+            if name.startswith("q"):
+                found = [
+                    m
+                    for title, m in CATALOGUE.items()
+                    if any(value in name for name in [title, *m["synonyms"]])
+                ]
+                data[alias] = {"media": found}
+            else:
+                data[alias] = next(
+                    (m for m in CATALOGUE.values() if m["id"] == value), None
+                )
+        return httpx.Response(200, json={"data": data})
+
+    return handle
+
+
+def make_worker(db, handler, **options):
+    return EnrichmentWorker(
+        db,
+        budget=RateBudget(60_000),
+        transport=httpx.MockTransport(handler),
+        **options,
+    )
+
+
+class TestEnrichmentMatching:
+    """測試查詢組裝與比對規則"""
+
+    def test_build_query_uses_aliases_and_variables(self):
+        """每部作品一個別名欄位，標題以變數傳入"""
+        query, variables = build_query(
+            [
+                Candidate("a", 'Title "quoted"', "ANIME", None, None),
+                Candidate("b", "Known", "MANGA", None, 42),
+            ]
+        )
+        assert "m0: Page(perPage: 3)" in query
+        assert "type: ANIME" in query
+        assert "m1: Media(id: $id1)" in query
+        assert variables == {"q0": 'Title "quoted"', "id1": 42}
+
+    def test_pick_match_prefers_title_then_year(self):
+        """標題或別名相符優先，其次同年份，都不符則不比對"""
+        results = [media(1, "Other", year=2020), media(2, "Target!", year=2019)]
+        assert (
+            pick_match(Candidate("w", "target", "ANIME", 2020, None), results)["id"]
+            == 2
+        )
+        assert (
+            pick_match(Candidate("w", "別名", "ANIME", 2020, None), results)["id"] == 1
+        )
+        assert pick_match(Candidate("w", "別名", "ANIME", None, None), results) is None
+
+    async def test_rate_budget_spaces_requests(self):
+        """請求依額度平均分配，暫停時全部延後"""
+        now = [0.0]
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        budget = RateBudget(60, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            await budget.acquire()
+        budget.pause(10)
+        await budget.acquire()
+        assert sleeps == [1.0, 1.0, 10.0]
+
+
+class TestEnrichmentWorker:
+    """測試背景補充作品資料"""
+
+    async def test_enriches_in_batches(self, db):
+        """比對成功者補上封面、類型與總集數，失敗者也標記已處理"""
+        service = WorkService(db)
+        frieren = service.create_work(
+            WorkCreate(
+                title="葬送的芙莉蓮",
+                type="動畫",
+                status="進行中",
+                progress={"episode": 3},
+            )
+        )
+        bocchi = service.create_work(
+            WorkCreate(title="Bocchi the Rock", type="動畫", status="進行中", year=2021)
+        )
+        missing = service.create_work(
+            WorkCreate(title="不存在的作品", type="漫畫", status="進行中")
+        )
+        service.create_work(WorkCreate(title="自訂", type="自定義", status="進行中"))
+        assert EnrichmentService(db).pending_count() == 3
+
+        calls = []
+        progress = await make_worker(db, anilist_handler(calls), batch_size=2).run()
+
+        assert len(calls) == 2
+        assert progress.to_dict()["eta_seconds"] is None
+        assert (progress.total, progress.matched, progress.unmatched) == (3, 2, 1)
+
+        db.expire_all()
+        enriched = service.get_work(frieren.id)
+        assert enriched.anilist_id == 154587
+        assert enriched.genres == ["Adventure", "Fantasy"]
+        assert enriched.cover_image.endswith("154587.jpg")
+        assert enriched.progress == {"episode": 3, "total_episode": 28}
+        assert enriched.year == 2023
+        assert enriched.enriched_at is not None
+
+        # 使用者已填的年份不被覆寫
+        assert service.get_work(bocchi.id).year == 2021
+        unmatched = service.get_work(missing.id)
+        assert unmatched.anilist_id is None
+        assert unmatched.enriched_at is not None
+        assert EnrichmentService(db).pending_count() == 0
+
+    async def test_retries_after_rate_limit(self, db):
+        """429 時依 Retry-After 暫停後重試；持續失敗的批次留待下次"""
+        WorkService(db).create_work(
+            WorkCreate(title="Sousou no Frieren", type="動畫", status="進行中")
+        )
+        calls = []
+        succeed = anilist_handler(calls)
+
+        def limited(request):
+            if not calls:
+                calls.append(None)
+                return httpx.Response(429, headers={"Retry-After": "0"})
+            return succeed(request)
+
+        progress = await make_worker(db, limited).run()
+        assert progress.requests == 2
+        assert progress.matched == 1
+
+        WorkService(db).create_work(
+            WorkCreate(title="Bocchi the Rock!", type="動畫", status="進行中")
+        )
+        progress = await make_worker(
+            db, lambda request: httpx.Response(400, json={"errors": []})
+        ).run()
+        assert (progress.failed, progress.processed) == (1, 0)
+        assert EnrichmentService(db).pending_count() == 1
+
+    async def test_progress_endpoint(self, client, admin_headers):
+        """未執行時回報待處理數量"""
+        await client.post(
+            "/works/", json={"title": "作品", "type": "動畫", "status": "進行中"}
+        )
+        response = await client.get("/admin/enrichment", headers=admin_headers)
+        assert response.json() == {"status": "idle", "pending": 1}
+
+        response = await client.delete("/admin/enrichment", headers=admin_headers)
+        assert response.status_code == 404
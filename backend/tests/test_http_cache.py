@@ -0,0 +1,54 @@
+from httpx import AsyncClient
+
+
+class TestHTTPCache:
+    """測試 ETag 條件式請求"""
+
+    async def test_list_responses_carry_weak_etag(self, client: AsyncClient):
+        response = await client.get("/works/")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    async def test_matching_if_none_match_returns_304(
+        self, client: AsyncClient, sample_tag_data: dict
+    ):
+        await client.post("/tags/", json=sample_tag_data)
+        etag = (await client.get("/tags/")).headers["etag"]
+
+        response = await client.get("/tags/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    async def test_writes_invalidate_etag(
+        self, client: AsyncClient, sample_work_data: dict
+    ):
+        etag = (await client.get("/works/stats/overview")).headers["etag"]
+        await client.post("/works/", json=sample_work_data)
+
+        response = await client.get(
+            "/works/stats/overview", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["total_works"] == 1
+
+    async def test_etag_depends_on_query_parameters(self, client: AsyncClient):
+        first = await client.get("/works/?page=1")
+        second = await client.get("/works/?page=2")
+
+        assert first.headers["etag"] != second.headers["etag"]
+
+    async def test_tag_changes_invalidate_work_list(
+        self, client: AsyncClient, sample_tag_data: dict
+    ):
+        etag = (await client.get("/works/")).headers["etag"]
+        await client.post("/tags/", json=sample_tag_data)
+
+        response = await client.get("/works/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
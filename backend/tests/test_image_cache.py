@@ -0,0 +1,169 @@
+import asyncio
+import io
+import os
+
+import httpx
+import pytest
+from sqlalchemy import update
+
+from app.models.work import Work
+from app.schemas.work import WorkCreate
+from app.services.image_cache import CoverCache, set_cover_cache
+from app.services.work_service import WorkService
+
+COVER_URL = "https://s4.anilist.co/file/anilistcdn/media/anime/cover/large/{}.jpg"
+
+
+def cdn(calls, delay=0.0):
+    """假的 AniList CDN：每個 ID 回傳不同內容"""
+
+    async def handle(request):
+        calls.append(str(request.url))
+        await asyncio.sleep(delay)
+        cover_id = request.url.path.rsplit("/", 1)[-1].split(".")[0]
+        return httpx.Response(
+            200,
+            content=f"jpeg-{cover_id}".encode() * 100,
+            headers={"Content-Type": "image/jpeg"},
+        )
+
+    return handle
+
+
+def add_cover(db, anilist_id, url=None):
+    work = WorkService(db).create_work(
+        WorkCreate(title=f"作品{anilist_id}", type="動畫", status="進行中")
+    )
+    db.execute(
+        update(Work)
+        .where(Work.id == work.id)
+        .values(anilist_id=anilist_id, cover_image=url or COVER_URL.format(anilist_id))
+    )
+    db.commit()
+
+
+async def resolve(cover_id):
+    return COVER_URL.format(cover_id)
+
+
+@pytest.fixture
+def cover_cache(tmp_path):
+    calls = []
+    cache = CoverCache(
+        tmp_path / "covers",
+        max_bytes=1024 * 1024,
+        transport=httpx.MockTransport(cdn(calls)),
+        thumbnails=False,
+    )
+    cache.calls = calls
+    set_cover_cache(cache)
+    yield cache
+    set_cover_cache(None)
+
+
+class TestCoverEndpoint:
+    """測試封面代理端點"""
+
+    async def test_downloads_once_and_revalidates(self, client, db, cover_cache):
+        """首次下載後由磁碟回應，帶長效快取標頭並支援 If-None-Match"""
+        add_cover(db, 101)
+
+        first = await client.get("/images/cover/101", params={"size": "small"})
+        second = await client.get("/images/cover/101", params={"size": "original"})
+        assert first.status_code == second.status_code == 200
+        assert first.content == b"jpeg-101" * 100
+        assert first.headers["content-type"] == "image/jpeg"
+        assert first.headers["cache-control"].startswith("public, max-age=")
+        assert "content-encoding" not in first.headers
+        assert len(cover_cache.calls) == 1
+
+        response = await client.get(
+            "/images/cover/101", headers={"If-None-Match": first.headers["etag"]}
+        )
+        assert response.status_code == 304
+
+    async def test_accel_redirect(self, client, db, cover_cache, monkeypatch):
+        """設定前綴時交由 nginx 以 X-Accel-Redirect 傳送"""
+        monkeypatch.setenv("COVER_CACHE_ACCEL_PREFIX", "/_covers/")
+        add_cover(db, 102)
+
+        response = await client.get("/images/cover/102")
+        assert response.status_code == 200
+        assert response.content == b""
+        redirect = response.headers["x-accel-redirect"]
+        assert redirect.startswith("/_covers/originals/")
+        assert (cover_cache.directory / redirect.removeprefix("/_covers/")).exists()
+
+    async def test_rejects_unknown_hosts_and_sizes(self, client, db, cover_cache):
+        """非 AniList 主機不下載，尺寸不合法回傳 400"""
+        add_cover(db, 103, url="http://169.254.169.254/latest/meta-data")
+
+        response = await client.get("/images/cover/103")
+        assert response.status_code == 404
+        assert cover_cache.calls == []
+
+        response = await client.get("/images/cover/103", params={"size": "huge"})
+        assert response.status_code == 400
+
+
+class TestCoverCache:
+    """測試快取目錄的去重與淘汰"""
+
+    async def test_concurrent_requests_share_download(self, tmp_path):
+        """同時請求同一封面只下載一次"""
+        calls = []
+        cache = CoverCache(
+            tmp_path,
+            1024 * 1024,
+            transport=httpx.MockTransport(cdn(calls, delay=0.05)),
+            thumbnails=False,
+        )
+        images = await asyncio.gather(
+            *(cache.get(7, "original", lambda: resolve(7)) for _ in range(5))
+        )
+        assert len(calls) == 1
+        assert len({image.path for image in images}) == 1
+
+    async def test_lru_eviction(self, tmp_path):
+        """超過上限時刪除最久未使用的檔案，被淘汰的封面會重新下載"""
+        calls = []
+        cache = CoverCache(
+            tmp_path,
+            max_bytes=1500,
+            transport=httpx.MockTransport(cdn(calls)),
+            thumbnails=False,
+        )
+        paths = {}
+        for index, cover_id in enumerate((1, 2)):
+            paths[cover_id] = (
+                await cache.get(cover_id, "original", lambda c=cover_id: resolve(c))
+            ).path
+            os.utime(paths[cover_id], (1000 + index, 1000 + index))
+        assert cache.size() == 1200
+
+        # 讀取 1 使其成為最近使用，再加入 3 觸發淘汰
+        await cache.get(1, "original", lambda: resolve(1))
+        await cache.get(3, "original", lambda: resolve(3))
+        assert paths[1].exists()
+        assert not paths[2].exists()
+        assert cache.size() == 1200
+
+        await cache.get(2, "original", lambda: resolve(2))
+        assert len(calls) == 4
+
+    async def test_webp_thumbnails(self, tmp_path):
+        """安裝 Pillow 時依寬度產生 WebP 縮圖"""
+        image_module = pytest.importorskip("PIL.Image")
+        buffer = io.BytesIO()
+        image_module.new("RGB", (460, 650), "red").save(buffer, "JPEG")
+
+        def handle(request):
+            return httpx.Response(
+                200, content=buffer.getvalue(), headers={"Content-Type": "image/jpeg"}
+            )
+
+        cache = CoverCache(tmp_path, 1024 * 1024, transport=httpx.MockTransport(handle))
+        image = await cache.get(9, "small", lambda: resolve(9))
+        assert image.media_type == "image/webp"
+        with image_module.open(image.path) as thumbnail:
+            assert thumbnail.size == (160, 226)
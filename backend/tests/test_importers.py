@@ -0,0 +1,267 @@
+import gzip
+import io
+import json
+
+from app.services.importers import WorkImporter, iter_json_entries
+from app.services.jobs import get_job_runner, submit_job
+from app.services.work_service import WorkService
+
+MAL_XML = """<?xml version="1.0" encoding="UTF-8" ?>
+<myanimelist>
+  <myinfo><user_name>someone</user_name></myinfo>
+  <anime>
+    <series_animedb_id>52991</series_animedb_id>
+    <series_title><![CDATA[Sousou no Frieren]]></series_title>
+    <series_type>TV</series_type>
+    <series_episodes>28</series_episodes>
+    <my_watched_episodes>10</my_watched_episodes>
+    <my_score>9</my_score>
+    <my_status>Watching</my_status>
+    <my_tags><![CDATA[奇幻, 冒險]]></my_tags>
+    <my_comments><![CDATA[]]></my_comments>
+  </anime>
+  <anime>
+    <series_title><![CDATA[Kimi no Na wa.]]></series_title>
+    <series_type>Movie</series_type>
+    <series_episodes>1</series_episodes>
+    <my_watched_episodes>1</my_watched_episodes>
+    <my_score>0</my_score>
+    <my_status>Completed</my_status>
+    <my_tags></my_tags>
+  </anime>
+  <anime>
+    <series_title><![CDATA[]]></series_title>
+    <my_status>Dropped</my_status>
+  </anime>
+  <anime>
+    <series_title><![CDATA[SOUSOU NO FRIEREN]]></series_title>
+    <series_type>TV</series_type>
+    <my_status>6</my_status>
+  </anime>
+</myanimelist>
+"""
+
+
+def anilist_export():
+    def entry(media_id, title, status, progress, **media):
+        return {
+            "status": status,
+            "progress": progress,
+            "score": 85,
+            "notes": "重看",
+            "customLists": {"收藏": True, "其他": False},
+            "media": {
+                "id": media_id,
+                "type": media.pop("type", "ANIME"),
+                "format": media.pop("format", "TV"),
+                "title": {"userPreferred": title, "native": "原題"},
+                "episodes": 12,
+                "chapters": None,
+                "startDate": {"year": 2022},
+                "coverImage": {"large": f"https://img.example/{media_id}.jpg"},
+                "genres": ["Music"],
+                **media,
+            },
+        }
+
+    return {
+        "data": {
+            "MediaListCollection": {
+                "lists": [
+                    {
+                        "name": "Watching",
+                        "entries": [entry(130003, "Bocchi the Rock!", "CURRENT", 5)],
+                    },
+                    {
+                        "name": 'Planning "entries"',
+                        "entries": [
+                            entry(
+                                86635,
+                                "三體",
+                                "PLANNING",
+                                0,
+                                type="MANGA",
+                                format="NOVEL",
+                                chapters=30,
+                            ),
+                            {"status": "CURRENT", "media": {"type": "ANIME"}},
+                        ],
+                    },
+                ]
+            }
+        }
+    }
+
+
+async def upload(client, content, filename, **params):
+    return await client.post(
+        "/works/import", params=params, files={"file": (filename, content)}
+    )
+
+
+class TestExportParsing:
+    """測試匯出檔的逐筆解析"""
+
+    def test_json_entries_across_chunk_boundaries(self):
+        """區塊邊界切在物件或多位元組字元中間時仍能逐筆解析"""
+        data = json.dumps(anilist_export(), ensure_ascii=False).encode()
+        for read_size in (1, 7, 64, len(data)):
+            entries = list(iter_json_entries(io.BytesIO(data), read_size=read_size))
+            assert [entry.get("media", {}).get("id") for entry in entries] == [
+                130003,
+                86635,
+                None,
+            ]
+
+        # 最外層就是 entries 陣列
+        bare = json.dumps([{"status": "CURRENT"}, {"status": "DROPPED"}]).encode()
+        assert len(list(iter_json_entries(io.BytesIO(bare), read_size=5))) == 2
+
+    def test_batches_and_report(self, db):
+        """分批寫入，每列錯誤（驗證失敗、重複）都列在報告中"""
+        report = WorkImporter(db, batch_size=2).import_file(
+            io.BytesIO(MAL_XML.encode())
+        )
+        assert (report.total, report.created, report.skipped, report.failed) == (
+            4,
+            2,
+            1,
+            1,
+        )
+        assert [error["row"] for error in report.errors] == [3, 4]
+        assert report.completed is True
+
+        works = {work.title: work for work in WorkService(db).get_works().works}
+        frieren = works["Sousou no Frieren"]
+        assert (frieren.type, frieren.status, frieren.rating) == ("動畫", "進行中", 9)
+        assert frieren.progress == {"episode": 10, "total_episode": 28}
+        assert sorted(tag.name for tag in frieren.tags) == ["冒險", "奇幻"]
+        movie = works["Kimi no Na wa."]
+        assert (movie.type, movie.status, movie.rating) == ("電影", "已完結", None)
+
+
+class TestImportEndpoint:
+    """測試匯入端點"""
+
+    async def test_gzipped_mal_export(self, client):
+        """MAL 下載的 .xml.gz 直接上傳；重複匯入時全部略過"""
+        content = gzip.compress(MAL_XML.encode())
+        response = await upload(client, content, "animelist.xml.gz")
+        assert response.status_code == 200
+        assert response.json()["created"] == 2
+
+        report = (await upload(client, content, "animelist.xml.gz")).json()
+        assert (report["created"], report["skipped"]) == (0, 3)
+
+        tags = (await client.get("/tags/", params={"with_counts": True})).json()
+        assert {tag["name"]: tag["usage_count"] for tag in tags} == {
+            "奇幻": 1,
+            "冒險": 1,
+        }
+
+    async def test_anilist_export_with_merge(self, client):
+        """AniList 匯出帶入封面與類型；merge 時補上既有作品的空白欄位"""
+        await client.post(
+            "/works/", json={"title": "三體", "type": "小說", "status": "進行中"}
+        )
+        content = json.dumps(anilist_export(), ensure_ascii=False).encode()
+        response = await upload(client, content, "anilist.json", on_duplicate="merge")
+        report = response.json()
+        assert (report["created"], report["merged"], report["failed"]) == (1, 1, 1)
+        assert report["errors"][0]["row"] == 3
+
+        works = {w["title"]: w for w in (await client.get("/works/")).json()["works"]}
+        bocchi = works["Bocchi the Rock!"]
+        assert bocchi["anilist_id"] == 130003
+        assert bocchi["genres"] == ["Music"]
+        assert bocchi["rating"] == 8.5
+        assert [tag["name"] for tag in bocchi["tags"]] == ["收藏"]
+        novel = works["三體"]
+        assert novel["status"] == "進行中"
+        assert novel["progress"] == {"total_episode": 30}
+        assert novel["note"] == "重看"
+
+    async def test_rejects_unknown_content(self, client):
+        """無法辨識的檔案或格式參數回傳 400"""
+        response = await upload(client, b"title,status\n", "list.csv")
+        assert response.status_code == 400
+        response = await upload(client, b"<x/>", "list.xml", format="csv")
+        assert response.status_code == 400
+
+    async def test_background_import(self, file_client, tmp_path, monkeypatch):
+        """背景匯入以工作執行，結束後刪除暫存檔"""
+        monkeypatch.setenv("IMPORT_UPLOAD_DIR", str(tmp_path / "uploads"))
+        response = await upload(file_client, MAL_XML.encode(), "animelist.xml")
+        assert response.status_code == 200
+
+        response = await upload(
+            file_client, MAL_XML.encode(), "animelist.xml", background=True
+        )
+        assert response.status_code == 202
+        assert get_job_runner().wait_idle(timeout=5)
+
+        job = (await file_client.get(f"/jobs/{response.json()['id']}")).json()
+        assert job["status"] == "succeeded"
+        assert job["result"]["skipped"] == 3
+        assert list((tmp_path / "uploads").iterdir()) == []
+
+    async def test_import_job_rejects_paths(self, file_client, tmp_path, monkeypatch):
+        """工作參數只接受上傳 ID；指向其他檔案時工作失敗且不刪除該檔"""
+        monkeypatch.setenv("IMPORT_UPLOAD_DIR", str(tmp_path / "uploads"))
+        victim = tmp_path / "victim.txt"
+        victim.write_text("keep me")
+
+        db = file_client.session_factory()
+        try:
+            ids = [
+                submit_job(db, "works.import", {"upload_id": upload_id})[0].id
+                for upload_id in (str(victim), "../victim", None)
+            ]
+        finally:
+            db.close()
+        assert get_job_runner().wait_idle(timeout=5)
+
+        for job_id in ids:
+            job = (await file_client.get(f"/jobs/{job_id}")).json()
+            assert (job["status"], job["error"]) == ("failed", "Invalid upload ID")
+        assert victim.read_text() == "keep me"
+
+
+class TestImportResume:
+    """測試中斷後續跑"""
+
+    def test_interrupted_import_resumes_after_checkpoint(self, db):
+        """關閉服務中斷後重跑：已提交的批次不重複匯入，報告接續"""
+        import threading
+
+        from sqlalchemy.orm import sessionmaker
+
+        from app.services.importers import ON_DUPLICATE_ALLOW
+        from app.services.jobs import JobContext, JobService, job_to_dict
+
+        session_factory = sessionmaker(bind=db.get_bind())
+        job = JobService(db).create("works.import", {})
+
+        shutdown = threading.Event()
+        shutdown.set()
+        context = JobContext(session_factory, job.id, threading.Event(), shutdown)
+        report = WorkImporter(
+            db, ON_DUPLICATE_ALLOW, batch_size=1, context=context
+        ).import_file(io.BytesIO(MAL_XML.encode()))
+        assert (report.total, report.created, report.completed) == (1, 1, False)
+
+        db.refresh(job)
+        assert "checkpoint" not in job_to_dict(job)["progress"]
+        context = JobContext(
+            session_factory,
+            job.id,
+            threading.Event(),
+            threading.Event(),
+            job.progress["checkpoint"],
+        )
+        report = WorkImporter(
+            db, ON_DUPLICATE_ALLOW, batch_size=1, context=context
+        ).import_file(io.BytesIO(MAL_XML.encode()))
+        assert (report.total, report.created, report.failed) == (4, 3, 1)
+        assert report.completed is True
+        assert WorkService(db).get_works().total == 3
@@ -0,0 +1,267 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.job import Job
+from app.services import jobs
+from app.services.jobs import JobRunner, JobService, get_job_runner
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def blocking_job(monkeypatch):
+    """註冊測試用工作類型：等待 release 或取消後才結束"""
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def handler(db, params, context):
+        started.release()
+        while not release.wait(0.01):
+            context.progress(1, 2)
+            if context.cancelled:
+                return {"stopped": True}
+        return {"value": params.get("value")}
+
+    monkeypatch.setitem(
+        jobs._job_types,
+        "test.block",
+        jobs.JobType("test.block", handler, 1, public=True),
+    )
+    yield release, started
+    release.set()
+
+
+def job_status(session_factory, job_id):
+    db = session_factory()
+    try:
+        return JobService(db).get(job_id).status
+    finally:
+        db.close()
+
+
+def create_job(session_factory, type_name, params=None):
+    db = session_factory()
+    try:
+        return JobService(db).create(type_name, params).id
+    finally:
+        db.close()
+
+
+class TestJobEndpoints:
+    """測試背景工作 API"""
+
+    async def test_create_and_poll(self, file_client):
+        """建立後立即回傳 202 與工作 ID，完成後可取得結果"""
+        await file_client.post(
+            "/works/", json={"title": "作品", "type": "動畫", "status": "進行中"}
+        )
+        response = await file_client.post("/jobs/", json={"type": "stats.refresh"})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] in ("queued", "running", "succeeded")
+
+        assert get_job_runner().wait_idle(timeout=5)
+        job = (await file_client.get(f"/jobs/{job['id']}")).json()
+        assert job["status"] == "succeeded"
+        assert job["attempts"] == 1
+        assert job["result"]["total_works"] == 1
+
+        jobs_list = (
+            await file_client.get("/jobs/", params={"type": "stats.refresh"})
+        ).json()
+        assert [item["id"] for item in jobs_list] == [job["id"]]
+
+        response = await file_client.post("/jobs/", json={"type": "unknown"})
+        assert response.status_code == 400
+        response = await file_client.post(
+            "/jobs/", json={"type": "stats.refresh", "params": {"extra": 1}}
+        )
+        assert response.status_code == 400
+
+    async def test_internal_types_are_not_public(self, file_client):
+        """只能經由各自端點送出的工作類型無法由 POST /jobs/ 建立"""
+        for type_name, params in (
+            ("works.import", {"upload_id": "0" * 32}),
+            ("backup.upload", {"deviceId": "someone-else"}),
+            ("works.enrich", {"limit": 100000}),
+            ("duplicates.scan", {}),
+        ):
+            response = await file_client.post(
+                "/jobs/", json={"type": type_name, "params": params}
+            )
+            assert response.status_code == 400
+            assert "cannot be created here" in response.json()["detail"]
+        assert (await file_client.get("/jobs/")).json() == []
+        response = await file_client.get("/jobs/missing")
+        assert response.status_code == 404
+
+    async def test_background_backup_upload(self, file_client):
+        """background=true 時備份由工作儲存，完成後不保留整份參數"""
+        backup = {
+            "works": [{"id": "w1", "title": "作品"}],
+            "tags": [],
+            "backupDate": "2024-01-01T00:00:00Z",
+            "version": "1.0.0",
+            "deviceId": "device-1",
+        }
+        response = await file_client.post(
+            "/cloud/backup", params={"background": True}, json=backup
+        )
+        assert response.status_code == 202
+        job_id = response.json()["jobId"]
+
+        assert get_job_runner().wait_idle(timeout=5)
+        job = (await file_client.get(f"/jobs/{job_id}")).json()
+        assert job["status"] == "succeeded"
+        assert job["result"]["worksCount"] == 1
+
+        restored = (
+            await file_client.get("/cloud/backup", params={"device_id": "device-1"})
+        ).json()
+        assert restored["works"] == backup["works"]
+        assert job_status(file_client.session_factory, job_id) == "succeeded"
+        db = file_client.session_factory()
+        assert db.get(Job, job_id).params is None
+        db.close()
+
+    async def test_cancel_endpoint(self, file_client, blocking_job):
+        """取消執行中的工作，處理函式在檢查點停止"""
+        release, started = blocking_job
+        response = await file_client.post("/jobs/", json={"type": "test.block"})
+        job_id = response.json()["id"]
+        assert started.acquire(timeout=5)
+
+        response = await file_client.post(f"/jobs/{job_id}/cancel")
+        assert response.status_code == 200
+        assert response.json()["cancel_requested"] is True
+
+        assert get_job_runner().wait_idle(timeout=5)
+        job = (await file_client.get(f"/jobs/{job_id}")).json()
+        assert job["status"] == "cancelled"
+        assert job["result"] == {"stopped": True}
+
+
+class TestJobRunner:
+    """測試執行緒池、類型並行上限與重新啟動後的復原"""
+
+    def test_concurrency_limit_per_type(self, session_factory, blocking_job):
+        """同類型超過上限時排隊；排隊中的工作可直接取消"""
+        release, started = blocking_job
+        runner = JobRunner(workers=4, heartbeat_interval=0.05)
+        ids = [
+            create_job(session_factory, "test.block", {"value": i}) for i in range(3)
+        ]
+        for job_id in ids:
+            runner.submit(session_factory, job_id, "test.block")
+        try:
+            assert started.acquire(timeout=5)
+            assert [job_status(session_factory, job_id) for job_id in ids] == [
+                "running",
+                "queued",
+                "queued",
+            ]
+
+            db = session_factory()
+            JobService(db).request_cancel(ids[2])
+            db.close()
+            release.set()
+            assert runner.wait_idle(timeout=5)
+        finally:
+            runner.stop(timeout=5)
+
+        assert [job_status(session_factory, job_id) for job_id in ids] == [
+            "succeeded",
+            "succeeded",
+            "cancelled",
+        ]
+
+    def test_failure_is_recorded(self, session_factory, monkeypatch):
+        """處理函式拋出例外時工作標記為失敗並保留錯誤訊息"""
+
+        def broken(db, params, context):
+            raise RuntimeError("boom")
+
+        monkeypatch.setitem(
+            jobs._job_types, "test.broken", jobs.JobType("test.broken", broken)
+        )
+        runner = JobRunner(workers=1)
+        job_id = create_job(session_factory, "test.broken")
+        runner.submit(session_factory, job_id, "test.broken")
+        assert runner.wait_idle(timeout=5)
+        runner.stop(timeout=5)
+
+        db = session_factory()
+        job = JobService(db).get(job_id)
+        assert (job.status, job.error) == ("failed", "boom")
+        db.close()
+
+    def test_stop_releases_cancelled_futures(
+        self, session_factory, blocking_job, monkeypatch
+    ):
+        """關閉時執行緒池中尚未執行的工作被取消，不會讓 stop 等到逾時"""
+        release, started = blocking_job
+        monkeypatch.setitem(
+            jobs._job_types,
+            "test.other",
+            jobs.JobType("test.other", lambda db, params, context: None),
+        )
+        runner = JobRunner(workers=1, heartbeat_interval=0.05)
+        runner.submit(
+            session_factory, create_job(session_factory, "test.block"), "test.block"
+        )
+        queued = create_job(session_factory, "test.other")
+        runner.submit(session_factory, queued, "test.other")
+        assert started.acquire(timeout=5)
+
+        begin = time.monotonic()
+        runner.stop(timeout=10)
+        assert time.monotonic() - begin < 5
+        assert runner.wait_idle(timeout=0)
+        assert job_status(session_factory, queued) == "queued"
+
+    def test_recover_after_restart(self, session_factory, blocking_job):
+        """心跳過期的工作重新排隊，超過嘗試上限者失敗；關閉時中斷的工作放回佇列"""
+        release, started = blocking_job
+        stale = datetime.now(timezone.utc) - timedelta(hours=1)
+        ids = [create_job(session_factory, "test.block") for _ in range(3)]
+        db = session_factory()
+        db.execute(
+            update(Job)
+            .where(Job.id.in_(ids[:2]))
+            .values(status="running", heartbeat_at=stale, attempts=1)
+        )
+        db.execute(update(Job).where(Job.id == ids[1]).values(attempts=3))
+        db.commit()
+        db.close()
+
+        runner = JobRunner(workers=2, heartbeat_interval=0.05)
+        assert runner.recover([session_factory]) == 2
+        assert started.acquire(timeout=5)
+        assert job_status(session_factory, ids[1]) == "failed"
+
+        # 關閉時執行中與排隊中的工作都回到佇列
+        runner.stop(timeout=5)
+        assert job_status(session_factory, ids[0]) == "queued"
+        assert job_status(session_factory, ids[2]) == "queued"
+
+        release.set()
+        runner = JobRunner(workers=2)
+        assert runner.recover([session_factory]) == 2
+        assert runner.wait_idle(timeout=5)
+        runner.stop(timeout=5)
+        assert job_status(session_factory, ids[0]) == "succeeded"
+        assert job_status(session_factory, ids[2]) == "succeeded"
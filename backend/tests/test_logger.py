@@ -0,0 +1,73 @@
+import json
+import logging
+import sys
+
+from httpx import AsyncClient
+
+from app.utils.logger import (
+    DebugSamplingFilter,
+    JsonFormatter,
+    RequestIdFilter,
+    _QueueHandler,
+    request_id_var,
+)
+
+
+def make_record(level=logging.INFO, msg="Creating work: %s", args=("進擊的巨人",)):
+    return logging.LogRecord("watchedit", level, __file__, 1, msg, args, None)
+
+
+class TestJsonLogging:
+    def test_json_formatter_includes_request_id_and_extra(self):
+        """JSON 輸出包含請求 ID 與 extra 欄位"""
+        token = request_id_var.set("req-123")
+        try:
+            record = make_record()
+            RequestIdFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+        record.work_id = "abc"
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        assert payload["message"] == "Creating work: 進擊的巨人"
+        assert payload["level"] == "INFO"
+        assert payload["request_id"] == "req-123"
+        assert payload["work_id"] == "abc"
+
+    def test_queue_handler_keeps_exception_text(self):
+        """入列時合併訊息參數並保留例外堆疊"""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = make_record(level=logging.ERROR)
+            record.exc_info = sys.exc_info()
+
+        prepared = _QueueHandler(None).prepare(record)
+        payload = json.loads(JsonFormatter().format(prepared))
+
+        assert prepared.args is None and prepared.exc_info is None
+        assert payload["message"] == "Creating work: 進擊的巨人"
+        assert "ValueError: boom" in payload["exception"]
+
+    def test_debug_sampling_only_drops_debug(self):
+        """抽樣只影響 DEBUG 紀錄"""
+        sampler = DebugSamplingFilter(0.0)
+
+        assert sampler.filter(make_record(level=logging.DEBUG)) is False
+        assert sampler.filter(make_record(level=logging.INFO)) is True
+        assert DebugSamplingFilter(1.0).filter(make_record(level=logging.DEBUG))
+
+
+class TestRequestId:
+    async def test_generates_request_id(self, client: AsyncClient):
+        """未帶 X-Request-ID 時自動產生"""
+        response = await client.get("/health")
+
+        assert len(response.headers["x-request-id"]) == 32
+
+    async def test_echoes_incoming_request_id(self, client: AsyncClient):
+        """沿用客戶端提供的 X-Request-ID"""
+        response = await client.get("/health", headers={"X-Request-ID": "trace-42"})
+
+        assert response.headers["x-request-id"] == "trace-42"
@@ -1,6 +1,6 @@
 from httpx import AsyncClient
 
-from app.main import parse_allowed_origins
+from app.main import app, parse_allowed_origins
 
 
 def test_parse_allowed_origins_trims_whitespace_and_empty_entries():
@@ -27,6 +27,53 @@ class TestMainApp:
         data = response.json()
         assert data["status"] == "healthy"
 
+    async def test_liveness_probe(self, client: AsyncClient):
+        """存活探針不依賴資料庫"""
+        response = await client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+
+    async def test_readiness_probe_checks_database(self, client: AsyncClient):
+        """就緒探針確認資料庫可連線"""
+        response = await client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready", "database": "ok"}
+
+    async def test_readiness_probe_reports_unreachable_database(
+        self, client: AsyncClient
+    ):
+        """資料庫無法連線時回傳 503"""
+        from sqlalchemy import create_engine
+
+        from app.db.database import get_engine
+
+        broken = create_engine("sqlite:////nonexistent-dir/watchedit.db")
+        app.dependency_overrides[get_engine] = lambda: broken
+        response = await client.get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json() == {"status": "unavailable", "database": "unreachable"}
+
+    async def test_admin_requires_token(self, client: AsyncClient, monkeypatch):
+        """管理端點需要 ADMIN_TOKEN；未設定時整個路由停用"""
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        response = await client.post("/admin/reminders/run")
+        assert response.status_code == 403
+
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        response = await client.post("/admin/reminders/run")
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+        response = await client.post(
+            "/admin/reminders/run", headers={"Authorization": "Bearer wrong"}
+        )
+        assert response.status_code == 401
+
+        response = await client.get(
+            "/admin/slow-queries", headers={"Authorization": "Bearer s3cret"}
+        )
+        assert response.status_code == 200
+
     async def test_cors_headers(self, client: AsyncClient):
         """測試 CORS 標頭"""
         response = await client.options(
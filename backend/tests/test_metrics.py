@@ -0,0 +1,77 @@
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.utils import metrics
+from app.utils.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    install_instrumentation,
+    render_metrics,
+    track_upstream,
+    uninstall_instrumentation,
+)
+
+
+@pytest.fixture
+async def metrics_client(client):
+    """以 MetricsMiddleware 包裝應用程式（沿用 client fixture 的測試資料庫）"""
+    install_instrumentation()
+    try:
+        async with AsyncClient(
+            app=MetricsMiddleware(app), base_url="http://test"
+        ) as ac:
+            yield ac
+    finally:
+        uninstall_instrumentation()
+
+
+def test_histogram_renders_prometheus_text():
+    histogram = Histogram("demo_seconds", "Demo.", labels=("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, "/works/")
+    histogram.observe(0.5, "/works/")
+
+    assert histogram.render().splitlines() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{route="/works/",le="0.1"} 1',
+        'demo_seconds_bucket{route="/works/",le="1"} 2',
+        'demo_seconds_bucket{route="/works/",le="+Inf"} 2',
+        'demo_seconds_sum{route="/works/"} 0.55',
+        'demo_seconds_count{route="/works/"} 2',
+    ]
+
+
+def test_track_upstream_is_noop_when_disabled():
+    with track_upstream("anilist"):
+        pass
+
+    assert ("anilist",) not in metrics.UPSTREAM_DURATION._series
+
+
+async def test_server_timing_reports_sql_statements(
+    metrics_client: AsyncClient, sample_work_data: dict
+):
+    await metrics_client.post("/works/", json=sample_work_data)
+
+    response = await metrics_client.get("/works/")
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    assert 'queries"' in timing and 'desc="0 queries"' not in timing
+
+
+async def test_requests_are_labelled_by_route_template(metrics_client: AsyncClient):
+    await metrics_client.get("/works/does-not-exist")
+
+    rendered = render_metrics()
+    assert 'route="/works/{work_id}",status="404"' in rendered
+    assert "does-not-exist" not in rendered
+
+
+async def test_upstream_latency_is_recorded(metrics_client: AsyncClient):
+    with track_upstream("anilist"):
+        pass
+
+    assert "watchedit_upstream_request_duration_seconds_count" in render_metrics()
@@ -0,0 +1,59 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from app.db.migrate import migrate
+
+
+def make_engine():
+    return create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+class TestMigrate:
+    def test_creates_schema_on_empty_database(self):
+        """空資料庫會建立所有資料表"""
+        engine = make_engine()
+
+        changes = migrate(engine)
+
+        assert {"works", "tags", "work_tags", "change_log"} <= set(changes["tables"])
+        assert "works" in inspect(engine).get_table_names()
+
+    def test_is_idempotent(self):
+        """重複執行不做任何變更"""
+        engine = make_engine()
+        migrate(engine)
+
+        assert migrate(engine) == {"tables": [], "columns": [], "indexes": []}
+
+    def test_adds_missing_columns_and_backfills_usage_counts(self):
+        """既有資料表補上新欄位，並回填標籤使用次數"""
+        engine = make_engine()
+        migrate(engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE tags"))
+            conn.execute(
+                text(
+                    "CREATE TABLE tags (id INTEGER PRIMARY KEY, "
+                    "name VARCHAR NOT NULL UNIQUE, color VARCHAR)"
+                )
+            )
+            conn.execute(text("INSERT INTO tags (id, name) VALUES (1, '奇幻')"))
+            conn.execute(
+                text(
+                    "INSERT INTO works (id, title, type, status) "
+                    "VALUES ('w1', '葬送的芙莉蓮', '動畫', '進行中')"
+                )
+            )
+            conn.execute(text("INSERT INTO work_tags VALUES ('w1', 1)"))
+
+        changes = migrate(engine)
+
+        assert changes["columns"] == ["tags.usage_count"]
+        assert "ix_tags_name" in changes["indexes"]
+        with engine.connect() as conn:
+            usage = conn.execute(text("SELECT usage_count FROM tags")).scalar()
+        assert usage == 1
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app.models.work import Work
+from app.schemas.work import WorkCreate, WorkUpdate
+from app.services.reminder_service import (
+    Notifier,
+    ReminderService,
+    as_utc,
+    next_occurrence,
+)
+from app.services.work_service import WorkService
+
+
+class RecordingNotifier(Notifier):
+    name = "recording"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminders):
+        self.sent.extend(reminders)
+
+
+def create_work(db, title, frequency="daily", enabled=True):
+    return WorkService(db).create_work(
+        WorkCreate(
+            title=title,
+            type="動畫",
+            status="進行中",
+            reminder_enabled=enabled,
+            reminder_frequency=frequency if enabled else None,
+        )
+    )
+
+
+class TestReminders:
+    """測試提醒排程"""
+
+    def test_next_occurrence(self):
+        """每月提醒在較短的月份取月底，並能跨年"""
+        jan31 = datetime(2024, 1, 31, 9, 0, tzinfo=timezone.utc)
+        assert next_occurrence("monthly", jan31) == datetime(
+            2024, 2, 29, 9, 0, tzinfo=timezone.utc
+        )
+        dec = datetime(2024, 12, 15, tzinfo=timezone.utc)
+        assert next_occurrence("monthly", dec) == datetime(
+            2025, 1, 15, tzinfo=timezone.utc
+        )
+        assert next_occurrence("weekly", dec) == dec + timedelta(days=7)
+
+    def test_create_and_update_schedule(self, db):
+        """啟用提醒時排程，停用後清除"""
+        work = create_work(db, "每日提醒")
+        assert work.next_reminder_at is not None
+
+        updated = WorkService(db).update_work(
+            work.id, WorkUpdate(reminder_enabled=False)
+        )
+        assert updated.next_reminder_at is None
+        assert create_work(db, "無提醒", enabled=False).next_reminder_at is None
+
+    def test_run_due_dispatches_once_and_reschedules(self, db):
+        """到期提醒只送出一次，並排到現在之後的下一次"""
+        due = create_work(db, "已到期")
+        create_work(db, "尚未到期", frequency="weekly")
+        create_work(db, "未啟用", enabled=False)
+
+        now = as_utc(db.get(Work, due.id).next_reminder_at) + timedelta(days=3)
+        notifier = RecordingNotifier()
+        service = ReminderService(db)
+
+        assert service.run_due(notifier, now=now) == 1
+        assert [reminder.title for reminder in notifier.sent] == ["已到期"]
+        db.expire_all()
+        next_at = as_utc(db.get(Work, due.id).next_reminder_at)
+        assert now < next_at <= now + timedelta(days=1)
+
+        # 已重新排程，同一時間再跑一次不會重送
+        assert service.run_due(notifier, now=now) == 0
+
+    def test_claim_skips_reminders_taken_by_another_worker(self, db):
+        """條件式 UPDATE 讓已被其他 worker 處理的提醒不會重複送出"""
+        work = create_work(db, "競爭")
+        now = as_utc(db.get(Work, work.id).next_reminder_at) + timedelta(minutes=1)
+        service = ReminderService(db)
+        rows = service.due(now, limit=10)
+
+        assert len(service.claim(rows, now)) == 1
+        assert service.claim(rows, now) == []
+
+    def test_due_query_uses_index(self, db):
+        """到期查詢以索引範圍掃描，不掃描整張表"""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("SELECT"):
+                plan = conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ).all()
+                statements.append(" ".join(row[-1] for row in plan))
+
+        bind = db.get_bind()
+        event.listen(bind, "before_cursor_execute", capture)
+        try:
+            ReminderService(db).due(datetime.now(timezone.utc), limit=10)
+        finally:
+            event.remove(bind, "before_cursor_execute", capture)
+
+        assert "ix_works_next_reminder_at" in statements[0]
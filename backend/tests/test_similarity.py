@@ -0,0 +1,89 @@
+from app.schemas.tag import TagCreate
+from app.schemas.work import WorkCreate, WorkUpdate
+from app.services.similarity import SimilarityIndex, get_similarity_index
+from app.services.tag_service import TagService
+from app.services.work_service import WorkService
+
+
+def create_tags(db, *names):
+    tag_service = TagService(db)
+    return [tag_service.create_tag(TagCreate(name=name)).id for name in names]
+
+
+def create_work(db, title, tag_ids, work_type="動畫", year=2020):
+    return WorkService(db).create_work(
+        WorkCreate(
+            title=title, type=work_type, status="進行中", year=year, tag_ids=tag_ids
+        )
+    )
+
+
+class TestSimilarityIndex:
+    """測試相似作品索引"""
+
+    def test_cosine_ranking(self):
+        """共同標籤越多分數越高，自己不列入結果"""
+        index = SimilarityIndex()
+        index.upsert("a", "動畫", 2020, [1, 2, 3])
+        index.upsert("b", "動畫", 2020, [1, 2, 3])
+        index.upsert("c", "動畫", 2021, [1, 2])
+        index.upsert("d", "電影", 1999, [9])
+
+        results = index.similar("a", limit=5)
+        assert [work_id for work_id, _ in results] == ["b", "c"]
+        assert results[0][1] == 1.0
+        assert 0 < results[1][1] < 1
+
+        index.remove("b")
+        index.upsert("c", "動畫", 2020, [1, 2, 3])
+        assert index.similar("a", limit=1) == [("c", 1.0)]
+
+    def test_index_follows_change_log(self, db):
+        """新增、修改標籤與刪除作品都會在下次查詢時反映"""
+        action, romance, scifi = create_tags(db, "動作", "戀愛", "科幻")
+        base = create_work(db, "基準", [action, scifi])
+        near = create_work(db, "相近", [action, scifi])
+        far = create_work(db, "不相關", [romance], work_type="小說", year=1990)
+
+        index = get_similarity_index(db)
+        assert [work_id for work_id, _ in index.similar(base.id)] == [near.id]
+
+        WorkService(db).update_work(far.id, WorkUpdate(tag_ids=[action]))
+        index = get_similarity_index(db)
+        assert [work_id for work_id, _ in index.similar(base.id)] == [near.id, far.id]
+
+        WorkService(db).delete_work(near.id)
+        index = get_similarity_index(db)
+        assert near.id not in index
+        assert [work_id for work_id, _ in index.similar(base.id)] == [far.id]
+
+    async def test_similar_endpoint(self, client):
+        """相似作品端點回傳標題與分數，作品不存在時 404"""
+        tag_ids = [
+            (await client.post("/tags/", json={"name": name})).json()["id"]
+            for name in ("冒險", "奇幻")
+        ]
+        works = [
+            (
+                await client.post(
+                    "/works/",
+                    json={
+                        "title": title,
+                        "type": "動畫",
+                        "status": "進行中",
+                        "tag_ids": tag_ids,
+                    },
+                )
+            ).json()["id"]
+            for title in ("甲", "乙")
+        ]
+
+        response = await client.get(f"/works/{works[0]}/similar")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["work_id"] == works[0]
+        assert [item["title"] for item in data["similar"]] == ["乙"]
+        assert data["similar"][0]["score"] == 1.0
+
+        response = await client.get("/works/missing/similar")
+        assert response.status_code == 404
@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+
+from app.utils.slow_query import (
+    _explain,
+    install_slow_query_log,
+    normalize_sql,
+    parameter_shape,
+    uninstall_slow_query_log,
+)
+
+
+@pytest.fixture
+def slow_query_log():
+    """門檻設為 0，記錄所有查詢"""
+    log = install_slow_query_log(threshold_ms=0, size=5)
+    try:
+        yield log
+    finally:
+        uninstall_slow_query_log()
+
+
+class TestSlowQueryHelpers:
+    def test_normalize_sql_strips_literals_and_collapses_in_lists(self):
+        """正規化會去除字面值並合併 IN 清單"""
+        statement = """SELECT works.id FROM works
+            WHERE works.title = 'Frieren' AND works.year = 2023
+            AND works.id IN (?, ?, ?)"""
+
+        assert normalize_sql(statement) == (
+            "SELECT works.id FROM works WHERE works.title = ? "
+            "AND works.year = ? AND works.id IN (...)"
+        )
+
+    def test_parameter_shape_keeps_types_not_values(self):
+        """參數只記錄型別"""
+        assert parameter_shape(("secret", 3)) == ["str", "int"]
+        assert parameter_shape({"title": "secret"}) == {"title": "str"}
+        assert parameter_shape([(1,), (2,)], executemany=True) == {
+            "rows": 2,
+            "row": ["int"],
+        }
+
+
+class FakeCursor:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement)
+        if statement.startswith("EXPLAIN"):
+            raise RuntimeError("syntax error")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """模擬 PostgreSQL 的 SQLAlchemy Connection 與底層 DBAPI 連線"""
+
+    def __init__(self, autocommit=False):
+        self.executed = []
+        self.dialect = SimpleNamespace(name="postgresql")
+        dbapi_connection = SimpleNamespace(
+            autocommit=autocommit, cursor=lambda: FakeCursor(self.executed)
+        )
+        self.connection = SimpleNamespace(dbapi_connection=dbapi_connection)
+
+
+class TestExplain:
+    def test_failed_explain_rolls_back_to_savepoint(self, caplog):
+        """交易中 EXPLAIN 失敗時回滾到 SAVEPOINT，交易仍可繼續使用，並記錄警告"""
+        conn = FakeConnection()
+        plan = _explain(conn, "SELECT 1", ())
+
+        assert plan == ["EXPLAIN failed: syntax error"]
+        assert conn.executed == [
+            "SAVEPOINT watchedit_explain",
+            "EXPLAIN SELECT 1",
+            "ROLLBACK TO SAVEPOINT watchedit_explain",
+            "RELEASE SAVEPOINT watchedit_explain",
+        ]
+        assert "EXPLAIN failed for slow query" in caplog.text
+
+    def test_autocommit_connection_skips_savepoint(self):
+        """autocommit 連線沒有交易可中止，不使用 SAVEPOINT"""
+        conn = FakeConnection(autocommit=True)
+        _explain(conn, "SELECT 1", ())
+        assert conn.executed == ["EXPLAIN SELECT 1"]
+
+
+class TestSlowQueryAPI:
+    async def test_disabled_by_default(self, client: AsyncClient, admin_headers):
+        """未設定門檻時不記錄"""
+        response = await client.get("/admin/slow-queries", headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.json()["enabled"] is False
+        assert response.json()["entries"] == []
+
+    async def test_records_caller_and_plan(
+        self, client: AsyncClient, slow_query_log, sample_work_data: dict, admin_headers
+    ):
+        """記錄查詢來源的服務方法與查詢計畫"""
+        await client.post("/works/", json=sample_work_data)
+        slow_query_log.clear()
+
+        await client.get("/works/", params={"title": "進擊"})
+
+        data = (await client.get("/admin/slow-queries", headers=admin_headers)).json()
+        assert data["enabled"] is True
+        assert data["threshold_ms"] == 0
+        callers = {entry["caller"] for entry in data["entries"]}
+        assert "WorkService.get_works" in callers
+
+        select_entry = next(
+            entry
+            for entry in data["entries"]
+            if entry["sql"].startswith("SELECT works.id")
+        )
+        assert "進擊" not in select_entry["sql"]
+        assert "str" in select_entry["parameters"]
+        assert select_entry["plan"]
+        assert select_entry["duration_ms"] >= 0
+
+    async def test_ring_buffer_keeps_latest_entries(
+        self, client: AsyncClient, slow_query_log, admin_headers
+    ):
+        """超過容量時只保留最新的紀錄"""
+        for _ in range(5):
+            await client.get("/works/")
+
+        entries = (
+            await client.get("/admin/slow-queries", headers=admin_headers)
+        ).json()["entries"]
+        assert len(entries) == 5
+
+        response = await client.delete("/admin/slow-queries", headers=admin_headers)
+        assert response.status_code == 200
+        assert slow_query_log.entries() == []
@@ -0,0 +1,97 @@
+from sqlalchemy import event
+
+from app.schemas.tag import TagCreate
+from app.schemas.work import WorkCreate
+from app.services.stats_service import StatsService
+from app.services.tag_service import TagService
+from app.services.work_service import WorkService
+
+
+def create_works(db):
+    tag = TagService(db).create_tag(TagCreate(name="熱血", color="#ff0000"))
+    works = [
+        ("甲", "動畫", "已完結", 9.5, {"episode": 12, "total_episode": 12}, [tag.id]),
+        ("乙", "動畫", "進行中", 7.0, {"episode": 3, "total_episode": 12}, [tag.id]),
+        ("丙", "漫畫", "進行中", None, {"episode": 10, "total_episode": 30}, []),
+        ("丁", "電影", "放棄", 4.2, None, []),
+    ]
+    work_service = WorkService(db)
+    for title, work_type, status, rating, progress, tag_ids in works:
+        work_service.create_work(
+            WorkCreate(
+                title=title,
+                type=work_type,
+                status=status,
+                year=2024,
+                rating=rating,
+                progress=progress,
+                tag_ids=tag_ids,
+            )
+        )
+    return tag
+
+
+class TestStats:
+    """測試擴充統計"""
+
+    def test_extended_stats(self, db):
+        """單次彙總計算評分分佈、平均評分、標籤、完成率與待看數量"""
+        tag = create_works(db)
+        stats = StatsService(db).extended()
+
+        assert stats["total_works"] == 4
+        assert stats["type_stats"] == {"動畫": 2, "漫畫": 1, "電影": 1}
+        assert stats["rating"]["histogram"]["9"] == 1
+        assert stats["rating"]["histogram"]["7"] == 1
+        assert stats["rating"]["histogram"]["4"] == 1
+        assert stats["rating"]["rated"] == 3
+        assert stats["rating"]["unrated"] == 1
+        assert stats["rating"]["average"] == round((9.5 + 7.0 + 4.2) / 3, 2)
+        assert stats["rating"]["average_by_type"] == {"動畫": 8.25, "電影": 4.2}
+        assert stats["tag_stats"] == [
+            {"id": tag.id, "name": "熱血", "color": "#ff0000", "count": 2}
+        ]
+        assert stats["completion"] == {"completed": 1, "total": 4, "rate": 0.25}
+        assert stats["backlog"] == {"in_progress": 2, "remaining_episodes": 29}
+        assert stats["episode_stats"]["watched_episodes"] == 25
+        assert stats["episode_stats"]["total_episodes"] == 54
+
+    def test_stats_are_cached_until_data_changes(self, db):
+        """資料版本未變時只查詢版本，寫入後重新計算"""
+        create_works(db)
+        service = StatsService(db)
+        service.extended()
+
+        statements = []
+        bind = db.get_bind()
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(bind, "before_cursor_execute", capture)
+        try:
+            assert service.overview()["total_works"] == 4
+            assert len(statements) == 1
+
+            WorkService(db).create_work(
+                WorkCreate(title="戊", type="小說", status="進行中")
+            )
+            statements.clear()
+            assert service.extended()["total_works"] == 5
+            assert len(statements) == 3
+        finally:
+            event.remove(bind, "before_cursor_execute", capture)
+
+    async def test_extended_stats_endpoint(self, client, sample_work_data):
+        """擴充統計端點支援條件式請求"""
+        await client.post("/works/", json=sample_work_data)
+
+        response = await client.get("/works/stats/extended")
+        assert response.status_code == 200
+        assert response.json()["total_works"] == 1
+
+        etag = response.headers["etag"]
+        response = await client.get(
+            "/works/stats/extended", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
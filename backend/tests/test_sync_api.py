@@ -0,0 +1,130 @@
+from httpx import AsyncClient
+
+
+class TestSyncAPI:
+    """測試增量同步 API"""
+
+    async def test_changes_start_empty(self, client: AsyncClient):
+        response = await client.get("/sync/changes")
+
+        assert response.status_code == 200
+        assert response.json() == {"changes": [], "next_cursor": 0, "has_more": False}
+
+    async def test_changes_include_upserts_with_latest_data(
+        self, client: AsyncClient, sample_work_data: dict, sample_tag_data: dict
+    ):
+        tag_id = (await client.post("/tags/", json=sample_tag_data)).json()["id"]
+        work = (
+            await client.post("/works/", json={**sample_work_data, "tag_ids": [tag_id]})
+        ).json()
+        await client.put(f"/works/{work['id']}", json={"title": "更新後的標題"})
+
+        response = await client.get("/sync/changes?since=0")
+        data = response.json()
+
+        assert [(c["entity"], c["op"]) for c in data["changes"]] == [
+            ("tag", "upsert"),
+            ("work", "upsert"),
+        ]
+        assert data["changes"][1]["data"]["title"] == "更新後的標題"
+        assert data["changes"][1]["data"]["tags"][0]["id"] == tag_id
+
+        # 以游標續取，沒有新變更
+        follow_up = await client.get(f"/sync/changes?since={data['next_cursor']}")
+        assert follow_up.json()["changes"] == []
+
+    async def test_deletes_are_returned_as_tombstones(
+        self, client: AsyncClient, sample_work_data: dict
+    ):
+        work_id = (await client.post("/works/", json=sample_work_data)).json()["id"]
+        cursor = (await client.get("/sync/changes")).json()["next_cursor"]
+        await client.delete(f"/works/{work_id}")
+
+        response = await client.get(f"/sync/changes?since={cursor}")
+
+        assert response.json()["changes"] == [
+            {
+                "cursor": cursor + 1,
+                "entity": "work",
+                "id": work_id,
+                "op": "delete",
+                "data": None,
+            }
+        ]
+
+    async def test_changes_are_paginated_by_limit(
+        self, client: AsyncClient, sample_work_data: dict
+    ):
+        for index in range(3):
+            await client.post(
+                "/works/", json={**sample_work_data, "title": f"作品{index}"}
+            )
+
+        first = (await client.get("/sync/changes?limit=2")).json()
+        second = (
+            await client.get(f"/sync/changes?since={first['next_cursor']}&limit=2")
+        ).json()
+
+        assert first["has_more"] is True
+        assert len(first["changes"]) == 2
+        assert second["has_more"] is False
+        assert second["changes"][0]["data"]["title"] == "作品2"
+
+    def test_batch_loads_tags_in_one_query(self, db, sample_work_data: dict):
+        """同一批次的作品標籤一次載入，查詢數與作品數量無關"""
+        from sqlalchemy import event
+
+        from app.schemas.tag import TagCreate
+        from app.schemas.work import WorkCreate
+        from app.services.sync_service import SyncService
+        from app.services.tag_service import TagService
+        from app.services.work_service import WorkService
+
+        tag = TagService(db).create_tag(TagCreate(name="熱血"))
+        for i in range(5):
+            WorkService(db).create_work(
+                WorkCreate(
+                    **{**sample_work_data, "title": f"作品 {i}"}, tag_ids=[tag.id]
+                )
+            )
+
+        statements = []
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.get_bind(), "before_cursor_execute", capture)
+        try:
+            changes = SyncService(db).get_changes().changes
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", capture)
+
+        assert [c.data["tags"][0]["id"] for c in changes if c.entity == "work"] == [
+            tag.id
+        ] * 5
+        assert len(statements) <= 4
+
+    def test_postgresql_writes_take_the_change_log_lock(self):
+        """PostgreSQL 寫入變更紀錄前先取得 advisory lock，ID 才會依提交順序遞增"""
+        from types import SimpleNamespace
+
+        from app.services.change_log import ENTITY_WORK, record_change, record_changes
+
+        executed, added = [], []
+        db = SimpleNamespace(
+            get_bind=lambda: SimpleNamespace(
+                dialect=SimpleNamespace(name="postgresql")
+            ),
+            execute=lambda statement, *args: executed.append(str(statement)),
+            add=added.append,
+            info={},
+        )
+        record_change(db, ENTITY_WORK, "w1")
+        record_changes(db, ENTITY_WORK, ["w2", "w3"])
+
+        assert len(added) == 1
+        assert ["pg_advisory_xact_lock" in sql for sql in executed] == [
+            True,
+            True,
+            False,
+        ]
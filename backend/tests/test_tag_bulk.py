@@ -0,0 +1,115 @@
+from httpx import AsyncClient
+
+
+async def create_tag(client: AsyncClient, name: str) -> int:
+    response = await client.post("/tags/", json={"name": name, "color": "#ff0000"})
+    return response.json()["id"]
+
+
+async def create_work(client: AsyncClient, title: str, tag_ids=None) -> str:
+    response = await client.post(
+        "/works/",
+        json={"title": title, "type": "動畫", "status": "進行中", "tag_ids": tag_ids},
+    )
+    return response.json()["id"]
+
+
+async def usage_counts(client: AsyncClient) -> dict:
+    response = await client.get("/tags/?with_counts=true")
+    return {tag["name"]: tag["usage_count"] for tag in response.json()}
+
+
+class TestTagBulkAPI:
+    """測試標籤使用次數與批次操作"""
+
+    async def test_counts_follow_work_writes(self, client: AsyncClient):
+        action = await create_tag(client, "動作")
+        comedy = await create_tag(client, "喜劇")
+        first = await create_work(client, "作品1", [action, comedy])
+        await create_work(client, "作品2", [action])
+
+        assert await usage_counts(client) == {"動作": 2, "喜劇": 1}
+
+        await client.put(f"/works/{first}", json={"tag_ids": [comedy]})
+        assert await usage_counts(client) == {"動作": 1, "喜劇": 1}
+
+        await client.delete(f"/works/{first}")
+        assert await usage_counts(client) == {"動作": 1, "喜劇": 0}
+
+    async def test_plain_list_has_no_counts(self, client: AsyncClient):
+        await create_tag(client, "動作")
+
+        response = await client.get("/tags/")
+
+        assert "usage_count" not in response.json()[0]
+
+    async def test_delete_tag_cascades_to_works(self, client: AsyncClient):
+        action = await create_tag(client, "動作")
+        work_id = await create_work(client, "作品1", [action])
+
+        await client.delete(f"/tags/{action}")
+
+        response = await client.get(f"/works/{work_id}")
+        assert response.json()["tags"] == []
+
+    async def test_merge_moves_links_without_duplicates(self, client: AsyncClient):
+        action = await create_tag(client, "動作")
+        fight = await create_tag(client, "戰鬥")
+        both = await create_work(client, "作品1", [action, fight])
+        await create_work(client, "作品2", [fight])
+
+        response = await client.post(
+            "/tags/merge", json={"source_ids": [fight], "target_id": action}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "tag": {"id": action, "name": "動作", "color": "#ff0000", "usage_count": 2},
+            "affected_works": 2,
+        }
+        assert await usage_counts(client) == {"動作": 2}
+        work = (await client.get(f"/works/{both}")).json()
+        assert [tag["id"] for tag in work["tags"]] == [action]
+
+    async def test_merge_rejects_target_in_sources(self, client: AsyncClient):
+        action = await create_tag(client, "動作")
+
+        response = await client.post(
+            "/tags/merge", json={"source_ids": [action], "target_id": action}
+        )
+
+        assert response.status_code == 400
+
+    async def test_rename_to_existing_name_merges(self, client: AsyncClient):
+        action = await create_tag(client, "動作")
+        typo = await create_tag(client, "動做")
+        await create_work(client, "作品1", [typo])
+
+        response = await client.post(f"/tags/{typo}/rename", json={"name": "動作"})
+
+        assert response.json()["tag"]["id"] == action
+        assert await usage_counts(client) == {"動作": 1}
+
+    async def test_apply_and_remove_on_many_works(self, client: AsyncClient):
+        action = await create_tag(client, "動作")
+        tagged = await create_work(client, "作品1", [action])
+        untagged = await create_work(client, "作品2")
+
+        response = await client.post(
+            f"/tags/{action}/works/apply",
+            json={"work_ids": [tagged, untagged, "missing"]},
+        )
+        assert response.json()["affected_works"] == 1
+        assert response.json()["tag"]["usage_count"] == 2
+
+        response = await client.post(
+            f"/tags/{action}/works/remove", json={"work_ids": [tagged]}
+        )
+        assert response.json()["affected_works"] == 1
+        assert await usage_counts(client) == {"動作": 1}
+
+    async def test_bulk_operations_unknown_tag(self, client: AsyncClient):
+        response = await client.post("/tags/999/works/apply", json={"work_ids": ["x"]})
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Tag with ID 999 not found"
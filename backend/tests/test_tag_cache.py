@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.tag import Tag
+from app.schemas.tag import TagCreate, TagUpdate
+from app.services.change_log import ENTITY_TAG, record_change
+from app.services.tag_cache import TagRegistry, get_tag_registry
+from app.services.tag_service import TagService
+from app.services.work_service import WorkService
+
+
+@contextmanager
+def count_queries(db: Session):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestTagRegistry:
+    """測試標籤快取"""
+
+    def test_hot_path_lookups_do_not_query(self, db: Session):
+        tag_service = TagService(db)
+        tag = tag_service.create_tag(TagCreate(name="冒險", color="#ff0000"))
+        tag_service.get_tags()  # 載入快取
+
+        with count_queries(db) as statements:
+            assert tag_service.get_tags()[0].name == "冒險"
+            assert tag_service.get_tag(tag.id).color == "#ff0000"
+            assert WorkService(db)._validate_tag_ids([tag.id, tag.id]) == [tag.id]
+
+        assert statements == []
+
+    def test_writes_update_registry(self, db: Session):
+        tag_service = TagService(db)
+        tag = tag_service.create_tag(TagCreate(name="冒險"))
+        registry = get_tag_registry(db)
+
+        assert registry.id_for_name(db, "冒險") == tag.id
+
+        tag_service.delete_tag(tag.id)
+        assert registry.get(db, tag.id) is None
+        assert registry.id_for_name(db, "冒險") is None
+
+    def test_changes_from_other_processes_are_picked_up(self, db: Session):
+        registry = TagRegistry(check_interval=0)
+        assert registry.tags(db) == []
+
+        # 模擬其他 worker 直接寫入資料庫
+        db.add(Tag(id=7, name="奇幻", color="#00ff00"))
+        record_change(db, ENTITY_TAG, 7)
+        db.commit()
+
+        assert [tag.name for tag in registry.tags(db)] == ["奇幻"]
+
+    def test_validation_reloads_on_miss(self, db: Session):
+        registry = TagRegistry(check_interval=3600)
+        registry.tags(db)
+
+        db.add(Tag(id=3, name="科幻"))
+        db.commit()
+
+        assert registry.missing(db, [3, 4]) == [4]
+
+    def test_own_writes_advance_version(self, db: Session):
+        """自己的寫入直接前進資料版本，下次檢查只比對版本、不重新載入"""
+        registry = get_tag_registry(db)
+        registry.check_interval = 0
+        tag_service = TagService(db)
+        tag = tag_service.create_tag(TagCreate(name="冒險"))
+        registry.tags(db)
+
+        tag_service.update_tag(tag.id, TagUpdate(color="#0000ff"))
+        with count_queries(db) as statements:
+            assert registry.get(db, tag.id).color == "#0000ff"
+        assert len(statements) == 1  # 只有 change_log 版本查詢
+
+        # 其他行程在兩次寫入之間的變更不會被跳過
+        db.add(Tag(id=42, name="奇幻"))
+        record_change(db, ENTITY_TAG, 42)
+        db.commit()
+        tag_service.update_tag(tag.id, TagUpdate(color="#ff0000"))
+        assert registry.id_for_name(db, "奇幻") == 42
@@ -0,0 +1,161 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import create_engine
+
+from app.db.database import get_engine
+from app.db.tenancy import TenantEngines, close_tenant_engines
+from app.main import app
+from app.models.work import Work
+from app.services.tag_cache import _registries, clear_tag_registries, get_tag_registry
+
+
+@pytest.fixture
+async def tenant_client(tmp_path, monkeypatch):
+    """不覆寫 get_db，依 X-Device-ID 路由到 tmp_path 下的租戶資料庫"""
+    monkeypatch.setenv("TENANCY_ENABLED", "true")
+    monkeypatch.setenv("TENANT_DATABASE_DIR", str(tmp_path))
+    close_tenant_engines()
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+    close_tenant_engines()
+    clear_tag_registries()
+
+
+class TestTenancy:
+    """測試每個裝置獨立的 SQLite 資料庫"""
+
+    async def test_devices_are_isolated(
+        self, tenant_client, tmp_path, sample_work_data
+    ):
+        """不同裝置的作品寫入各自的資料庫檔案"""
+        response = await tenant_client.post(
+            "/works/", json=sample_work_data, headers={"X-Device-ID": "device-a"}
+        )
+        assert response.status_code == 201
+
+        works_a = await tenant_client.get(
+            "/works/", headers={"X-Device-ID": "device-a"}
+        )
+        works_b = await tenant_client.get(
+            "/works/", headers={"X-Device-ID": "device-b"}
+        )
+        assert works_a.json()["total"] == 1
+        assert works_b.json()["total"] == 0
+        assert works_a.headers["etag"] != works_b.headers["etag"]
+        assert (tmp_path / "device-a.db").exists()
+        assert (tmp_path / "device-b.db").exists()
+
+    async def test_missing_or_invalid_device_id_is_rejected(self, tenant_client):
+        """缺少或含路徑字元的裝置 ID 回傳 400"""
+        assert (await tenant_client.get("/works/")).status_code == 400
+        response = await tenant_client.get(
+            "/works/", headers={"X-Device-ID": "../watchedit"}
+        )
+        assert response.status_code == 400
+
+    async def test_readiness_without_device_id(
+        self, tenant_client, tmp_path, monkeypatch
+    ):
+        """就緒探針不需 X-Device-ID；租戶目錄無法使用時回傳 503"""
+        main = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+        app.dependency_overrides[get_engine] = lambda: main
+        try:
+            response = await tenant_client.get("/health/ready")
+            assert response.status_code == 200
+            assert response.json() == {
+                "status": "ready",
+                "database": "ok",
+                "tenants": "ok",
+            }
+
+            blocker = tmp_path / "not-a-directory"
+            blocker.write_text("")
+            monkeypatch.setenv("TENANT_DATABASE_DIR", str(blocker))
+            response = await tenant_client.get("/health/ready")
+            assert response.status_code == 503
+            assert response.json()["tenants"] == "unwritable"
+        finally:
+            app.dependency_overrides.pop(get_engine, None)
+            main.dispose()
+
+    async def test_admin_maintenance(
+        self, tenant_client, sample_work_data, admin_headers
+    ):
+        """管理端點可列出並整理租戶資料庫"""
+        await tenant_client.post(
+            "/works/", json=sample_work_data, headers={"X-Device-ID": "device-a"}
+        )
+
+        tenants = (
+            await tenant_client.get("/admin/tenants", headers=admin_headers)
+        ).json()
+        assert [tenant["tenant_id"] for tenant in tenants["tenants"]] == ["device-a"]
+
+        response = await tenant_client.post(
+            "/admin/tenants/device-a/maintenance",
+            params={"vacuum": "true"},
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert result["integrity"] == "ok"
+        assert result["vacuumed"] is True
+
+        missing = await tenant_client.post(
+            "/admin/tenants/device-z/maintenance", headers=admin_headers
+        )
+        assert missing.status_code == 400
+
+    def test_lru_evicts_least_recently_used_engine(self, tmp_path):
+        """超過容量時關閉最久未使用的 Engine 與其標籤快取"""
+        tenants = TenantEngines(tmp_path, capacity=2)
+        try:
+            db = tenants.session("a")
+            db.query(Work).count()
+            get_tag_registry(db)
+            db.close()
+            url_a = tenants.database_url("a")
+            assert url_a in _registries
+
+            tenants.get("b")
+            tenants.get("a")  # a 變成最近使用
+            tenants.get("c")
+
+            assert tenants.is_open("a")
+            assert not tenants.is_open("b")
+            assert tenants.is_open("c")
+            assert tenants.tenant_ids() == ["a", "b", "c"]
+
+            tenants.get("b")
+            assert not tenants.is_open("a")
+            assert url_a not in _registries
+        finally:
+            tenants.close_all()
+
+    async def test_new_tenants_are_capped(
+        self, tenant_client, monkeypatch, sample_work_data
+    ):
+        """達到 TENANT_MAX_COUNT 後新的裝置 ID 回傳 403，不再建立檔案；既有裝置不受影響"""
+        monkeypatch.setenv("TENANT_MAX_COUNT", "2")
+        for device in ("device-a", "device-b"):
+            response = await tenant_client.get(
+                "/works/", headers={"X-Device-ID": device}
+            )
+            assert response.status_code == 200
+
+        response = await tenant_client.get(
+            "/works/", headers={"X-Device-ID": "device-c"}
+        )
+        assert response.status_code == 403
+        close_tenant_engines()
+        response = await tenant_client.post(
+            "/works/", json=sample_work_data, headers={"X-Device-ID": "device-a"}
+        )
+        assert response.status_code == 201
+
+    async def test_admin_tenants_requires_tenancy(self, client, admin_headers):
+        """未啟用租戶時管理端點回傳 404"""
+        response = await client.get("/admin/tenants", headers=admin_headers)
+        assert response.status_code == 404
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.models.watch_event import WatchDaily, WatchEvent, WatchMonthly
+from app.services.watch_history import WatchHistoryService, record_watch
+
+
+def rollup_rows(db, rollup):
+    return db.execute(
+        select(rollup.period, rollup.episodes, rollup.minutes, rollup.events).order_by(
+            rollup.period
+        )
+    ).all()
+
+
+class TestWatchHistory:
+    """測試觀看紀錄與時間軸彙總"""
+
+    async def test_progress_changes_are_recorded(self, client, db, sample_work_data):
+        """進度端點與 PUT 都會寫入觀看事件並累加彙總"""
+        response = await client.post(
+            "/works/",
+            json={**sample_work_data, "progress": {"episode": 0, "duration": 24}},
+        )
+        work_id = response.json()["id"]
+
+        await client.post(f"/works/{work_id}/progress:increment")
+        await client.post(f"/works/{work_id}/progress:increment", json={"by": 2})
+        await client.put(
+            f"/works/{work_id}", json={"progress": {"episode": 5, "duration": 24}}
+        )
+        # 集數不變不記錄
+        await client.post(f"/works/{work_id}/progress:set", json={"episode": 5})
+
+        events = db.execute(select(WatchEvent.episodes, WatchEvent.minutes)).all()
+        assert [tuple(event) for event in events] == [(1, 24), (2, 48), (2, 48)]
+
+        today = datetime.now(timezone.utc)
+        assert rollup_rows(db, WatchDaily) == [(today.strftime("%Y-%m-%d"), 5, 120, 3)]
+        assert rollup_rows(db, WatchMonthly) == [(today.strftime("%Y-%m"), 5, 120, 3)]
+
+        timeline = (await client.get("/works/stats/timeline")).json()
+        assert timeline["granularity"] == "day"
+        assert timeline["points"] == [
+            {
+                "period": today.strftime("%Y-%m-%d"),
+                "episodes": 5,
+                "minutes": 120,
+                "events": 3,
+            }
+        ]
+        assert timeline["totals"] == {"episodes": 5, "minutes": 120, "events": 3}
+
+    async def test_timeline_ranges(self, client, db):
+        """依粒度與日期範圍讀取彙總"""
+        for month, day, episodes in ((1, 1, 2), (1, 15, 3), (2, 9, 1)):
+            moment = datetime(2024, month, day, tzinfo=timezone.utc)
+            record_watch(db, "w", episodes, episodes * 20, watched_at=moment)
+        db.commit()
+
+        response = await client.get(
+            "/works/stats/timeline",
+            params={"granularity": "month", "start": "2024-01-01", "end": "2024-12-31"},
+        )
+        points = response.json()["points"]
+        assert [(p["period"], p["episodes"]) for p in points] == [
+            ("2024-01", 5),
+            ("2024-02", 1),
+        ]
+
+        response = await client.get(
+            "/works/stats/timeline", params={"start": "2024-01-10", "end": "2024-01-31"}
+        )
+        assert [p["period"] for p in response.json()["points"]] == ["2024-01-15"]
+
+        response = await client.get(
+            "/works/stats/timeline", params={"granularity": "week"}
+        )
+        assert response.status_code == 400
+
+    def test_rebuild_matches_incremental_rollups(self, db):
+        """由事件重算的彙總與增量維護的結果一致"""
+        record_watch(db, "a", 3, 72, datetime(2024, 3, 1, 23, 0, tzinfo=timezone.utc))
+        record_watch(db, "b", 1, 24, datetime(2024, 3, 2, 1, 0, tzinfo=timezone.utc))
+        record_watch(db, "a", -1, -24, datetime(2024, 4, 1, tzinfo=timezone.utc))
+        db.commit()
+        incremental = (rollup_rows(db, WatchDaily), rollup_rows(db, WatchMonthly))
+
+        assert WatchHistoryService(db).rebuild_rollups() == 3
+        assert (rollup_rows(db, WatchDaily), rollup_rows(db, WatchMonthly)) == (
+            incremental
+        )
@@ -42,3 +42,21 @@ async def test_update_work_rejects_unknown_tag_ids(client: AsyncClient):
 
     assert response.status_code == 404
     assert response.json()["detail"] == "Tag with ID 999 not found"
+
+
+async def test_work_list_includes_tags_and_is_gzip_compressed(client: AsyncClient):
+    tag_response = await client.post("/tags/", json={"name": "冒險", "color": "#ff0000"})
+    tag = tag_response.json()
+    for index in range(10):
+        await client.post(
+            "/works/",
+            json=valid_work_data(title=f"作品{index}", tag_ids=[tag["id"]]),
+        )
+
+    response = await client.get("/works/?size=10", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    works = response.json()["works"]
+    assert len(works) == 10
+    assert all(work["tags"] == [tag] for work in works)
@@ -211,3 +211,165 @@ class TestWorksService:
         assert stats["total_works"] >= 2
         assert "type_stats" in stats
         assert "status_stats" in stats
+
+    def test_writes_commit_once_and_return_server_defaults(
+        self, db: Session, sample_work_data: dict
+    ):
+        """測試寫入路徑只提交一次並取回伺服器預設值"""
+        from sqlalchemy import event
+
+        from app.services.work_service import WorkService
+
+        commits = []
+        event.listen(db, "after_commit", lambda session: commits.append(session))
+        work_service = WorkService(db)
+
+        created_work = work_service.create_work(WorkCreate(**sample_work_data))
+        assert created_work.date_added is not None
+        assert len(commits) == 1
+
+        updated_work = work_service.update_work(
+            created_work.id, WorkUpdate(progress={"episode": 3})
+        )
+        assert updated_work.progress == {"episode": 3}
+        assert updated_work.date_updated is not None
+        assert len(commits) == 2
+
+
+class TestWorkProgress:
+    """測試進度更新端點"""
+
+    async def _create(self, client: AsyncClient, data: dict, progress) -> str:
+        response = await client.post("/works/", json={**data, "progress": progress})
+        return response.json()["id"]
+
+    async def test_increment_progress(self, client: AsyncClient, sample_work_data: dict):
+        """集數 +1 並保留其他進度欄位，回傳精簡資料"""
+        work_id = await self._create(
+            client,
+            sample_work_data,
+            {"episode": 3, "total_episode": 12, "duration": 24},
+        )
+
+        response = await client.post(f"/works/{work_id}/progress:increment")
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"id", "progress", "status", "date_updated"}
+        assert data["progress"] == {"episode": 4, "total_episode": 12, "duration": 24}
+        assert data["status"] == "進行中"
+        assert data["date_updated"] is not None
+
+        response = await client.post(
+            f"/works/{work_id}/progress:increment", json={"by": -10}
+        )
+        assert response.json()["progress"]["episode"] == 0
+
+    async def test_final_episode_completes_work(
+        self, client: AsyncClient, sample_work_data: dict
+    ):
+        """到最後一集自動轉為已完結，且不超過總集數"""
+        work_id = await self._create(
+            client, sample_work_data, {"episode": 11, "total_episode": 12}
+        )
+
+        data = (await client.post(f"/works/{work_id}/progress:increment")).json()
+        assert data["progress"]["episode"] == 12
+        assert data["status"] == "已完結"
+
+        data = (await client.post(f"/works/{work_id}/progress:increment")).json()
+        assert data["progress"]["episode"] == 12
+
+        work = (await client.get(f"/works/{work_id}")).json()
+        assert work["status"] == "已完結"
+
+    async def test_set_and_complete_progress(
+        self, client: AsyncClient, sample_work_data: dict
+    ):
+        """設定集數與標記看完；沒有進度資料時從空物件開始"""
+        work_id = await self._create(client, sample_work_data, None)
+
+        data = (
+            await client.post(f"/works/{work_id}/progress:set", json={"episode": 5})
+        ).json()
+        assert data["progress"] == {"episode": 5}
+        assert data["status"] == "進行中"
+
+        data = (await client.post(f"/works/{work_id}/progress:complete")).json()
+        assert data["progress"] == {"episode": 5}
+        assert data["status"] == "已完結"
+
+    async def test_progress_not_found(self, client: AsyncClient):
+        """作品不存在時回傳 404"""
+        response = await client.post("/works/missing/progress:increment")
+        assert response.status_code == 404
+
+    def test_increment_is_a_single_update(self, db: Session, sample_work_data: dict):
+        """進度更新不先載入作品：觀看事件、UPDATE、彙總 upsert 與變更紀錄，沒有 SELECT"""
+        from sqlalchemy import event
+
+        from app.services.work_service import WorkService
+
+        work_service = WorkService(db)
+        work = work_service.create_work(
+            WorkCreate(**sample_work_data, progress={"episode": 1})
+        )
+
+        statements = []
+        bind = db.get_bind()
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(bind, "before_cursor_execute", capture)
+        try:
+            result = work_service.increment_progress(work.id)
+        finally:
+            event.remove(bind, "before_cursor_execute", capture)
+
+        assert result.progress == {"episode": 2}
+        assert [statement.split()[0] for statement in statements] == [
+            "INSERT",  # watch_events（INSERT ... SELECT）
+            "UPDATE",
+            "INSERT",  # watch_daily upsert
+            "INSERT",  # watch_monthly upsert
+            "INSERT",  # change_log
+        ]
+
+    async def test_non_numeric_progress_is_ignored(
+        self, client: AsyncClient, sample_work_data: dict
+    ):
+        """progress 中非數字的集數視為未填，不讓進度更新或統計失敗"""
+        work_id = await self._create(
+            client,
+            sample_work_data,
+            {"episode": "第三集", "total_episode": "12", "duration": "abc"},
+        )
+
+        response = await client.post(f"/works/{work_id}/progress:increment")
+        assert response.status_code == 200
+        assert response.json()["progress"]["episode"] == 1
+        stats = (await client.get("/works/stats/extended")).json()
+        assert stats["backlog"]["remaining_episodes"] == 11
+
+    def test_progress_without_returning(
+        self, db: Session, sample_work_data: dict, monkeypatch
+    ):
+        """資料庫不支援 RETURNING 時改為先讀後寫，觀看事件照常記錄"""
+        from sqlalchemy import select
+
+        from app.models.watch_event import WatchEvent
+        from app.services.work_service import WorkService
+
+        dialect = db.get_bind().dialect
+        monkeypatch.setattr(dialect, "insert_returning", False)
+        monkeypatch.setattr(dialect, "update_returning", False)
+
+        work_service = WorkService(db)
+        work = work_service.create_work(
+            WorkCreate(**sample_work_data, progress={"episode": 1, "duration": 24})
+        )
+        result = work_service.increment_progress(work.id, 2)
+
+        assert result.progress == {"episode": 3, "duration": 24}
+        events = db.execute(select(WatchEvent.episodes, WatchEvent.minutes)).all()
+        assert [tuple(event) for event in events] == [(2, 48)]
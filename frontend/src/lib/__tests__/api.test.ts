@@ -39,4 +39,19 @@ describe("apiClient", () => {
     );
     expect(logSpy).not.toHaveBeenCalled();
   });
+
+  it("sends a device ID even before anything else created one", async () => {
+    localStorage.clear();
+
+    await apiClient.getWorks();
+
+    const deviceId = localStorage.getItem("watchedit_device_id");
+    expect(deviceId).toBeTruthy();
+    expect(global.fetch).toHaveBeenCalledWith(
+      expect.any(String),
+      expect.objectContaining({
+        headers: expect.objectContaining({ "X-Device-ID": deviceId }),
+      })
+    );
+  });
 });
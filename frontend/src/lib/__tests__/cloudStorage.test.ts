@@ -139,4 +139,25 @@ describe("cloudStorage", () => {
     });
     expect(mockedFetch).toHaveBeenCalledTimes(1);
   });
+
+  it("creates a device ID on first use and sends it with every cloud request", async () => {
+    cloudStorage.setConfig({ endpoint: "https://sync.example.test" });
+    mockedFetch.mockResolvedValue({
+      ok: true,
+      json: async () => ({ works: [], tags: [] }),
+    });
+
+    await cloudStorage.uploadData([], []);
+    await cloudStorage.downloadData();
+
+    const deviceId = localStorage.getItem("watchedit_device_id");
+    expect(deviceId).toBeTruthy();
+    const [[, upload], [downloadUrl, download]] = mockedFetch.mock.calls;
+    expect(upload.headers["X-Device-ID"]).toBe(deviceId);
+    expect(JSON.parse(upload.body).deviceId).toBe(deviceId);
+    expect(downloadUrl).toBe(
+      `https://sync.example.test/backup?device_id=${deviceId}`
+    );
+    expect(download.headers["X-Device-ID"]).toBe(deviceId);
+  });
 });
@@ -3,11 +3,16 @@ import {
   WorkCreate,
   WorkUpdate,
   WorkList,
+  WorkProgress,
   Tag,
   AnimeSearchResult,
   Stats,
+  ExtendedStats,
+  WatchTimeline,
+  Job,
 } from "@/types";
 import { getApiBaseUrl } from "./config";
+import { getDeviceHeaders } from "./device";
 
 const API_BASE_URL = getApiBaseUrl();
 
@@ -28,6 +33,7 @@ class ApiClient {
       const response = await fetch(url, {
         headers: {
           "Content-Type": "application/json",
+          ...getDeviceHeaders(),
           ...options?.headers,
         },
         ...options,
@@ -76,8 +82,12 @@ class ApiClient {
     return this.request<Work>(`/works/${id}`);
   }
 
-  async createWork(work: WorkCreate): Promise<Work> {
-    return this.request<Work>("/works", {
+  async createWork(
+    work: WorkCreate,
+    onDuplicate?: "error" | "merge" | "allow",
+  ): Promise<Work> {
+    const query = onDuplicate ? `?on_duplicate=${onDuplicate}` : "";
+    return this.request<Work>(`/works${query}`, {
       method: "POST",
       body: JSON.stringify(work),
     });
@@ -90,6 +100,27 @@ class ApiClient {
     });
   }
 
+  // 進度更新只回傳精簡資料（id、progress、status、date_updated）
+  async incrementProgress(id: string, by = 1): Promise<WorkProgress> {
+    return this.request<WorkProgress>(`/works/${id}/progress:increment`, {
+      method: "POST",
+      body: JSON.stringify({ by }),
+    });
+  }
+
+  async setProgress(id: string, episode: number): Promise<WorkProgress> {
+    return this.request<WorkProgress>(`/works/${id}/progress:set`, {
+      method: "POST",
+      body: JSON.stringify({ episode }),
+    });
+  }
+
+  async completeProgress(id: string): Promise<WorkProgress> {
+    return this.request<WorkProgress>(`/works/${id}/progress:complete`, {
+      method: "POST",
+    });
+  }
+
   async deleteWork(id: string): Promise<void> {
     return this.request<void>(`/works/${id}`, {
       method: "DELETE",
@@ -100,6 +131,25 @@ class ApiClient {
     return this.request<Stats>("/works/stats/overview");
   }
 
+  async getExtendedStats(): Promise<ExtendedStats> {
+    return this.request<ExtendedStats>("/works/stats/extended");
+  }
+
+  async getTimeline(params?: {
+    granularity?: "day" | "month";
+    start?: string;
+    end?: string;
+  }): Promise<WatchTimeline> {
+    const searchParams = new URLSearchParams();
+    if (params?.granularity) searchParams.append("granularity", params.granularity);
+    if (params?.start) searchParams.append("start", params.start);
+    if (params?.end) searchParams.append("end", params.end);
+    const query = searchParams.toString();
+    return this.request<WatchTimeline>(
+      `/works/stats/timeline${query ? `?${query}` : ""}`
+    );
+  }
+
   // 標籤相關 API
   async getTags(): Promise<Tag[]> {
     return this.request<Tag[]>("/tags");
@@ -140,6 +190,33 @@ class ApiClient {
       `/search/suggestions?query=${encodeURIComponent(query)}`
     );
   }
+
+  // 背景工作 API
+  async createJob<T = unknown>(
+    type: string,
+    params: Record<string, unknown> = {},
+  ): Promise<Job<T>> {
+    return this.request<Job<T>>("/jobs/", {
+      method: "POST",
+      body: JSON.stringify({ type, params }),
+    });
+  }
+
+  async getJob<T = unknown>(id: string): Promise<Job<T>> {
+    return this.request<Job<T>>(`/jobs/${id}`);
+  }
+
+  async cancelJob(id: string): Promise<Job> {
+    return this.request<Job>(`/jobs/${id}/cancel`, { method: "POST" });
+  }
 }
 
 export const apiClient = new ApiClient(API_BASE_URL);
+
+// 後端快取的 AniList 封面（small 160px、medium 320px WebP，original 為原圖）
+export function getCoverUrl(
+  anilistId: number,
+  size: "small" | "medium" | "original" = "medium",
+): string {
+  return `${API_BASE_URL}/images/cover/${anilistId}?size=${size}`;
+}
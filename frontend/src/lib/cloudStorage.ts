@@ -1,4 +1,5 @@
 import { Work, Tag } from "@/types";
+import { getDeviceHeaders, getDeviceId } from "./device";
 
 export interface CloudConfig {
   endpoint: string;
@@ -27,28 +28,6 @@ export interface BackupData {
 
 class CloudStorageService {
   private config: CloudConfig | null = null;
-  private deviceId: string;
-
-  constructor() {
-    // 生成或取得設備 ID
-    this.deviceId = this.getDeviceId();
-  }
-
-  private getDeviceId(): string {
-    // 檢查是否在客戶端環境
-    if (typeof window === "undefined") {
-      return `device_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
-    }
-
-    let deviceId = localStorage.getItem("watchedit_device_id");
-    if (!deviceId) {
-      deviceId = `device_${Date.now()}_${Math.random()
-        .toString(36)
-        .substr(2, 9)}`;
-      localStorage.setItem("watchedit_device_id", deviceId);
-    }
-    return deviceId;
-  }
 
   private getErrorMessage(error: unknown): string {
     return error instanceof Error ? error.message : "未知錯誤";
@@ -110,6 +89,7 @@ class CloudStorageService {
         method: "GET",
         headers: {
           "Content-Type": "application/json",
+          ...getDeviceHeaders(),
         },
       });
 
@@ -151,13 +131,14 @@ class CloudStorageService {
         tags,
         backupDate: new Date().toISOString(),
         version: "1.0.0",
-        deviceId: this.deviceId,
+        deviceId: getDeviceId(),
       };
 
       const response = await fetch(`${config.endpoint}/backup`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...getDeviceHeaders(),
           ...(config.apiKey && {
             Authorization: `Bearer ${config.apiKey}`,
           }),
@@ -205,11 +186,12 @@ class CloudStorageService {
 
     try {
       const response = await fetch(
-        `${config.endpoint}/backup?device_id=${this.deviceId}`,
+        `${config.endpoint}/backup?device_id=${encodeURIComponent(getDeviceId())}`,
         {
           method: "GET",
           headers: {
             "Content-Type": "application/json",
+            ...getDeviceHeaders(),
             ...(config.apiKey && {
               Authorization: `Bearer ${config.apiKey}`,
             }),
@@ -0,0 +1,27 @@
+// 裝置 ID：後端啟用 TENANCY_ENABLED 時依 X-Device-ID 標頭選擇裝置專屬的資料庫，
+// 雲端備份也以它區分裝置。所有請求都經由這裡取得，第一次使用時建立並保存。
+export const DEVICE_ID_KEY = "watchedit_device_id";
+export const DEVICE_ID_HEADER = "X-Device-ID";
+
+function createDeviceId(): string {
+  return `device_${Date.now()}_${Math.random().toString(36).slice(2, 11)}`;
+}
+
+export function getDeviceId(): string {
+  // 伺服器端渲染時沒有 localStorage，只產生暫時的 ID
+  if (typeof window === "undefined") {
+    return createDeviceId();
+  }
+
+  let deviceId = localStorage.getItem(DEVICE_ID_KEY);
+  if (!deviceId) {
+    deviceId = createDeviceId();
+    localStorage.setItem(DEVICE_ID_KEY, deviceId);
+  }
+  return deviceId;
+}
+
+export function getDeviceHeaders(): Record<string, string> {
+  if (typeof window === "undefined") return {};
+  return { [DEVICE_ID_HEADER]: getDeviceId() };
+}
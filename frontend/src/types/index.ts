@@ -15,6 +15,11 @@ export interface Work {
   source?: string;
   reminder_enabled: boolean;
   reminder_frequency?: ReminderFrequency;
+  next_reminder_at?: string;
+  anilist_id?: number;
+  cover_image?: string;
+  genres?: string[];
+  enriched_at?: string;
   tags: Tag[];
   date_added: string;
   date_updated?: string;
@@ -178,6 +183,18 @@ export interface WorkUpdate {
   tags?: Tag[];
 }
 
+// 進度更新的精簡回應
+export interface WorkProgress {
+  id: string;
+  progress?: {
+    episode?: number;
+    total_episode?: number;
+    duration?: number;
+  };
+  status: Work["status"];
+  date_updated?: string;
+}
+
 // 作品列表
 export interface WorkList {
   works: Work[];
@@ -206,6 +223,36 @@ export interface Stats {
   };
 }
 
+// 擴充統計（評分分佈、標籤使用次數、完成率與待看數量）
+export interface ExtendedStats extends Stats {
+  rating: {
+    histogram: Record<string, number>;
+    rated: number;
+    unrated: number;
+    average: number | null;
+    average_by_type: Record<string, number>;
+  };
+  tag_stats: { id: number; name: string; color: string; count: number }[];
+  completion: { completed: number; total: number; rate: number };
+  backlog: { in_progress: number; remaining_episodes: number };
+}
+
+// 觀看時間軸（UTC 的每日或每月彙總）
+export interface WatchTimelinePoint {
+  period: string;
+  episodes: number;
+  minutes: number;
+  events: number;
+}
+
+export interface WatchTimeline {
+  granularity: "day" | "month";
+  start: string;
+  end: string;
+  points: WatchTimelinePoint[];
+  totals: Omit<WatchTimelinePoint, "period">;
+}
+
 // 動畫搜尋結果
 export interface AnimeSearchResult {
   id: number;
@@ -225,3 +272,25 @@ export interface AnimeSearchResult {
   };
   description?: string;
 }
+
+// 背景工作（POST /jobs 後以 GET /jobs/{id} 輪詢）
+export type JobStatus =
+  | "queued"
+  | "running"
+  | "succeeded"
+  | "failed"
+  | "cancelled";
+
+export interface Job<T = unknown> {
+  id: string;
+  type: string;
+  status: JobStatus;
+  progress?: { current: number; total?: number; message?: string } | null;
+  result?: T | null;
+  error?: string | null;
+  attempts: number;
+  cancel_requested: boolean;
+  created_at?: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+}